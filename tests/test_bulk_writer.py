@@ -0,0 +1,122 @@
+"""The bulk writer against bw2io's ``write_database`` on a synthetic tree."""
+
+import bw2data as bd
+import numpy as np
+import pytest
+
+from wmlci import jsonld_loader
+from wmlci.benchmark.synthetic import generate_synthetic_jsonld, synthetic_method_config
+from wmlci.extract import extract_common, source_store
+from wmlci.lca import (
+    prepare_inventory,
+    prepare_lcia,
+    write_inventory,
+    write_lcia_methods,
+)
+from wmlci.openlca import calculate_lca_results, resolve_processes
+
+WRITERS = ("bw2io", "bulk")
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """Synthetic tree with uncertain exchanges in a temporary source tree."""
+    data = tmp_path / "source_data"
+    for module in (extract_common, jsonld_loader):
+        monkeypatch.setattr(module, "source_data_path", data)
+    monkeypatch.setattr(source_store, "store_enabled", lambda: False)
+    generate_synthetic_jsonld(
+        "bulk_test", n_processes=80, uncertainty_share=0.5, seed=3, output_dir=data
+    )
+    return "bulk_test"
+
+
+@pytest.fixture
+def imported(source):
+    """Project, database and LCA results written by each writer."""
+    results = {}
+    current = bd.projects.current
+    try:
+        for writer in WRITERS:
+            config = synthetic_method_config(source)
+            config["bw_project_name"] = f"wmlci_test_{writer}_writer"
+            config["database_writer"] = writer
+            if config["bw_project_name"] in bd.projects:
+                bd.projects.delete_project(config["bw_project_name"], delete_dir=True)
+            bd.projects.set_current(config["bw_project_name"])
+            write_inventory(prepare_inventory(config), config)
+            write_lcia_methods(prepare_lcia(config), config)
+            db = bd.Database(config["inventory_database"])
+            summary, _ = calculate_lca_results(db, resolve_processes(db, config), config)
+            results[writer] = {
+                "resources": datapackage_by_key(db),
+                "scores": summary.set_index("process")["score"],
+            }
+        yield results
+    finally:
+        bd.projects.set_current(current)
+        for writer in WRITERS:
+            name = f"wmlci_test_{writer}_writer"
+            if name in bd.projects:
+                bd.projects.delete_project(name, delete_dir=True)
+
+
+def datapackage_by_key(db):
+    """
+    Resources of the processed datapackage of ``db``, with matrix indices
+    as node keys (ids differ between projects) and entries in key order.
+    """
+    keys = {
+        node.id: node.key
+        for name in bd.databases
+        for node in bd.Database(name)
+    }
+    dp = db.datapackage()
+    resources = {}
+    for group in sorted({r["group"] for r in dp.resources}):
+        indices = dp.get_resource(f"{group}.indices")[0]
+        rows = [keys.get(int(i), int(i)) for i in indices["row"]]
+        # geomapping columns are location ids, not nodes
+        cols = [
+            keys.get(int(i), int(i)) if "geomapping" not in group else None
+            for i in indices["col"]
+        ]
+        order = sorted(range(len(rows)), key=lambda i: (str(rows[i]), str(cols[i])))
+        entry = {"indices": [(rows[i], cols[i]) for i in order]}
+        for kind in ("data", "flip", "distributions"):
+            name = f"{group}.{kind}"
+            if any(r["name"] == name for r in dp.resources):
+                entry[kind] = dp.get_resource(name)[0][order]
+        resources[group] = entry
+    return resources
+
+
+def test_bulk_writer_matches_write_database(imported):
+    expected, actual = imported["bw2io"], imported["bulk"]
+
+    assert sorted(actual["resources"]) == sorted(expected["resources"])
+    for group, resource in expected["resources"].items():
+        written = actual["resources"][group]
+        assert sorted(written) == sorted(resource), group
+        assert written["indices"] == resource["indices"], group
+        np.testing.assert_allclose(written["data"], resource["data"], rtol=1e-6)
+        if "flip" in resource:
+            np.testing.assert_array_equal(written["flip"], resource["flip"])
+        if "distributions" in resource:
+            ours, theirs = written["distributions"], resource["distributions"]
+            assert ours.dtype == theirs.dtype
+            np.testing.assert_array_equal(
+                ours["uncertainty_type"], theirs["uncertainty_type"]
+            )
+            for field in ("loc", "scale", "shape", "minimum", "maximum"):
+                np.testing.assert_allclose(ours[field], theirs[field], rtol=1e-6)
+
+    uncertain = next(
+        r["distributions"] for g, r in expected["resources"].items()
+        if g.endswith("biosphere_matrix")
+    )
+    assert (uncertain["uncertainty_type"] > 0).any()
+    assert len(expected["scores"]) == 3
+    np.testing.assert_allclose(
+        actual["scores"].sort_index(), expected["scores"].sort_index(), rtol=1e-9
+    )
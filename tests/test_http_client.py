@@ -0,0 +1,188 @@
+"""DownloadClient against a local http.server stand-in."""
+
+import hashlib
+import json
+import os
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import urllib3
+
+from wmlci.extract import http_client
+from wmlci.extract.http_client import ChecksumError, DownloadClient, DownloadError
+
+DATA = os.urandom(3 * http_client.CHUNK_SIZE + 123)
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves ``DATA`` with ranges; ``server.state`` injects failures."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _empty(self, status, headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        state = self.server.state
+        state["ranges"].append(self.headers.get("Range"))
+        if state["unavailable"]:
+            state["unavailable"] -= 1
+            return self._empty(503, [("Retry-After", "0")])
+        start = 0
+        requested = self.headers.get("Range")
+        if requested and not state["ignore_range"]:
+            start = int(requested.split("=")[1].rstrip("-"))
+            if start >= len(DATA):
+                return self._empty(416, [("Content-Range", f"bytes */{len(DATA)}")])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(DATA) - 1}/{len(DATA)}")
+        else:
+            self.send_response(200)
+        body = DATA[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        if state["drop"]:
+            # close the connection a third into the body
+            state["drop"] -= 1
+            self.wfile.write(body[: len(body) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.state = {"unavailable": 0, "drop": 0, "ignore_range": False, "ranges": []}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def url(server):
+    return f"http://127.0.0.1:{server.server_port}/source.zip"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_client, "PROGRESS_INTERVAL", 0.0)
+    return DownloadClient(backoff=0.001)
+
+
+def test_download_resumes_dropped_connections(server, url, client, tmp_path):
+    server.state["drop"] = 2
+    path = tmp_path / "source.zip"
+    result = client.download(url, path, sha256=SHA256)
+
+    assert path.read_bytes() == DATA
+    assert result["bytes"] == len(DATA)
+    ranges = server.state["ranges"]
+    assert ranges[0] is None and all(r.startswith("bytes=") for r in ranges[1:])
+    assert len(ranges) == 3
+    assert not (tmp_path / "source.zip.part").exists()
+    assert not (tmp_path / "source.zip.part.json").exists()
+
+
+def test_download_retries_unavailable_server(server, url, client, tmp_path):
+    server.state["unavailable"] = 2
+    path = tmp_path / "source.zip"
+    client.download(url, path, sha256=SHA256)
+
+    assert path.read_bytes() == DATA
+    assert len(server.state["ranges"]) == 3
+
+
+def test_download_gives_up_after_retries(server, url, tmp_path):
+    server.state["unavailable"] = 10
+    client = DownloadClient(retries=2, backoff=0.001)
+    with pytest.raises(DownloadError):
+        client.download(url, tmp_path / "source.zip")
+    assert len(server.state["ranges"]) == 3
+
+
+def test_complete_part_file_is_accepted_on_416(server, url, client, tmp_path):
+    path = tmp_path / "source.zip"
+    (tmp_path / "source.zip.part").write_bytes(DATA)
+    (tmp_path / "source.zip.part.json").write_text(
+        json.dumps({"url": url, "etag": '"v1"'}), encoding="utf-8"
+    )
+    result = client.download(url, path, sha256=SHA256)
+
+    assert path.read_bytes() == DATA
+    assert result["resumed"] == len(DATA)
+    assert server.state["ranges"] == [f"bytes={len(DATA)}-"]
+
+
+def test_server_ignoring_ranges_restarts_the_file(server, url, client, tmp_path):
+    server.state["drop"] = 1
+    server.state["ignore_range"] = True
+    path = tmp_path / "source.zip"
+    client.download(url, path, sha256=SHA256)
+
+    assert path.read_bytes() == DATA
+    assert server.state["ranges"][1].startswith("bytes=")
+
+
+def test_part_file_of_an_earlier_run_is_resumed(server, url, tmp_path):
+    server.state["drop"] = 1
+    path = tmp_path / "source.zip"
+    with pytest.raises(DownloadError):
+        DownloadClient(retries=0).download(url, path)
+    offset = (tmp_path / "source.zip.part").stat().st_size
+    assert 0 < offset < len(DATA)
+
+    # a new download token in the URL; the ETag guards the resume
+    result = DownloadClient(backoff=0.001).download(
+        url + "?token=2", path, sha256=SHA256
+    )
+    assert path.read_bytes() == DATA
+    assert result["resumed"] == offset
+
+
+def test_checksum_failure_removes_the_part_file(server, url, client, tmp_path):
+    path = tmp_path / "source.zip"
+    with pytest.raises(ChecksumError):
+        client.download(url, path, sha256="0" * 64)
+
+    assert not path.exists()
+    assert not (tmp_path / "source.zip.part").exists()
+    assert not (tmp_path / "source.zip.part.json").exists()
+
+
+def test_verify_is_per_call_and_warnings_stay_on(monkeypatch, client, tmp_path):
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(kwargs["verify"])
+        raise http_client.requests.ConnectionError("offline")
+
+    monkeypatch.setattr(client.session, "get", get)
+    client.retries = 0
+    for kwargs in ({}, {"verify": False}):
+        with pytest.raises(DownloadError):
+            client.get("https://example.invalid/", **kwargs)
+        with pytest.raises(DownloadError):
+            client.download("https://example.invalid/x", tmp_path / "x", **kwargs)
+
+    assert calls == [True, True, False, False]
+    DownloadClient(verify=False)
+    assert not any(
+        action == "ignore"
+        and issubclass(urllib3.exceptions.InsecureRequestWarning, category)
+        for action, _, category, _, _ in warnings.filters
+    )
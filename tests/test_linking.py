@@ -0,0 +1,108 @@
+"""Relinking foreground exchanges to a second synthetic source."""
+
+import pytest
+import yaml
+
+from wmlci import jsonld_loader, linking
+from wmlci.benchmark.synthetic import (
+    foreground_process_name,
+    generate_synthetic_jsonld,
+    synthetic_method_config,
+)
+from wmlci.errorLogging import validate_default_provider_metadata
+from wmlci.extract import extract_common, source_store
+from wmlci.lca import prepare_inventory, prepare_lcia
+from wmlci.matrices import build_matrices
+
+PROVIDER = {"process": "Synthetic process 30", "product": "Synthetic product 30"}
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Synthetic ``lk_a`` (inventory) and ``lk_b`` (linked) in a temporary tree."""
+    data, updates = tmp_path / "source_data", tmp_path / "updates"
+    updates.mkdir()
+    for module in (extract_common, jsonld_loader):
+        monkeypatch.setattr(module, "source_data_path", data)
+    monkeypatch.setattr(linking, "TECHNOSPHERE_UPDATES_DIR", updates)
+    monkeypatch.setattr(linking, "link_index_path", tmp_path / "link_index")
+    monkeypatch.setattr(linking, "_SOURCES", {})
+    monkeypatch.setattr(source_store, "store_enabled", lambda: False)
+    generate_synthetic_jsonld("lk_a", n_processes=40, seed=1, output_dir=data)
+    generate_synthetic_jsonld("lk_b", n_processes=60, seed=2, output_dir=data)
+    return updates
+
+
+def foreground(jsonld):
+    name = foreground_process_name(0)
+    return next(p for p in jsonld.data["processes"].values() if p["name"] == name)
+
+
+def relinked_config(updates, target):
+    (updates / "to_lk_b.yaml").write_text(
+        yaml.safe_dump({
+            "technosphere_exchanges": {target: {"data_source": "lk_b", **PROVIDER}},
+        }),
+        encoding="utf-8",
+    )
+    config = synthetic_method_config("lk_a")
+    config["processes"][foreground_process_name(0)]["technosphere_updates"] = "to_lk_b"
+    return config
+
+
+def test_relinked_input_brings_its_supply_chain(sources):
+    base = prepare_inventory(synthetic_method_config("lk_a"))
+    target = next(e for e in foreground(base)["exchanges"] if e.get("isInput"))
+    target = target["flow"]["name"]
+
+    config = relinked_config(sources, target)
+    jsonld = prepare_inventory(config)
+    source = linking.prepared_source("lk_b", None)
+    provider = next(
+        p for p in source.data["processes"].values() if p["name"] == PROVIDER["process"]
+    )
+    index = linking.ProviderIndex.load_or_build("lk_b", None, source.data)
+    chain = linking.upstream_processes(source.data, index, [provider["@id"]])
+
+    # the provider and its supply chain are merged
+    assert len(chain) > 1
+    assert set(chain) <= set(jsonld.data["processes"])
+    assert len(jsonld.data["processes"]) == len(base.data["processes"]) + len(chain)
+
+    # the relinked exchange points to the provider with a full reference
+    process = foreground(jsonld)
+    exchange = next(
+        e for e in process["exchanges"]
+        if e.get("isInput") and e["defaultProvider"]["@id"] == provider["@id"]
+    )
+    assert exchange["defaultProvider"]["category"] == provider["category"]
+    assert exchange["defaultProvider"]["flowType"] == "PRODUCT_FLOW"
+    assert validate_default_provider_metadata(
+        process["@id"], exchange["flow"]["@id"], jsonld
+    ) is None
+
+    # lk_a supplies the same products, so the merged ones are renamed
+    reference = linking._reference_exchange(provider)["flow"]
+    assert reference["@id"] in base.data["flows"]
+    assert exchange["flow"]["@id"] != reference["@id"]
+    assert exchange["flow"]["@id"] in jsonld.data["flows"]
+
+    matrices = build_matrices(jsonld, prepare_lcia(config), tuple(config["lcia_method"]))
+    rows, columns = matrices.technosphere.shape
+    assert rows == columns == len(jsonld.data["processes"])
+
+
+def test_index_is_rebuilt_when_the_source_changes(sources):
+    data = linking.prepared_source("lk_b", None).data
+    index = linking.ProviderIndex.load_or_build("lk_b", None, data)
+    removed = index.lookup(**PROVIDER)[0]
+
+    smaller = {**data, "processes": dict(data["processes"])}
+    del smaller["processes"][removed]
+    rebuilt = linking.ProviderIndex.load_or_build("lk_b", None, smaller)
+
+    assert rebuilt.fingerprint != index.fingerprint
+    assert rebuilt.lookup(**PROVIDER) == []
+    assert linking.ProviderIndex.load_or_build("lk_b", None, data).lookup(
+        **PROVIDER
+    ) == [removed]
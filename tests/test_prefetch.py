@@ -0,0 +1,222 @@
+"""Prefetch of method sources against a mock FLCAC API."""
+
+import io
+import json
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from wmlci import jsonld_loader, linking
+from wmlci.extract import extract_common, prefetch, source_store
+
+SOURCES = ("src_a", "src_b", "src_c", "src_fail")
+# seconds each request takes, so concurrent downloads overlap
+LATENCY = 0.2
+
+
+def jsonld_zip(name):
+    """Zip with the layout of an FLCAC JSON-LD export."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for i in range(3):
+            zf.writestr(f"processes/{name}-{i}.json", json.dumps({"@id": f"{name}-{i}"}))
+    return buffer.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """``/prepare/<source>`` returns a token, ``/<token>`` the source zip."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server.state
+        path = self.path.split("?")[0]
+        with state["lock"]:
+            state["paths"].append(path)
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            time.sleep(LATENCY)
+            name = path.rsplit("/", 1)[1]
+            if "/prepare/" in path:
+                status, body = 200, json.dumps({"token": f"token-{name}"}).encode()
+            elif name == "token-src_fail":
+                status, body = 404, b""
+            else:
+                status, body = 200, jsonld_zip(name.removeprefix("token-"))
+        finally:
+            with state["lock"]:
+                state["active"] -= 1
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.state = {"lock": threading.Lock(), "paths": [], "active": 0, "max_active": 0}
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def sources(server, tmp_path, monkeypatch):
+    """Extract yamls of ``SOURCES`` on the mock API, in a temporary tree."""
+    extract, data, updates = tmp_path / "extract", tmp_path / "source_data", tmp_path / "updates"
+    for directory in (extract, data, updates):
+        directory.mkdir()
+    for module in (prefetch, extract_common, jsonld_loader):
+        monkeypatch.setattr(module, "extractpath", extract)
+    for module in (extract_common, jsonld_loader):
+        monkeypatch.setattr(module, "source_data_path", data)
+    monkeypatch.setattr(linking, "TECHNOSPHERE_UPDATES_DIR", updates)
+    monkeypatch.setattr(source_store, "store_enabled", lambda: False)
+    monkeypatch.setenv("FLCAC", "test-key")
+
+    for name in SOURCES:
+        (extract / f"{name}.yaml").write_text(
+            f"""source_name: {name}
+api_name: FLCAC
+format: json-ld
+url:
+  base_url: http://127.0.0.1:{server.server_port}/api
+download_steps:
+  - url:
+      api_path: /download/json/prepare/{name}
+      url_params:
+        api_key: __apiKey__
+    response_as: token
+  - url:
+      api_path: /download/json/__token__
+      url_params:
+        api_key: __apiKey__
+    unzip: true
+""",
+            encoding="utf-8",
+        )
+    (updates / "to_src_c.yaml").write_text(
+        "technosphere_exchanges:\n  x:\n    data_source: src_c\n    product: p\n",
+        encoding="utf-8",
+    )
+    return data
+
+
+def method_config(lcia_input="src_b"):
+    return {
+        "inventory_source": "src_a",
+        "lcia_input": lcia_input,
+        "processes": {"P": {"technosphere_updates": "to_src_c"}, "Q": None},
+    }
+
+
+def test_sources_of_a_method(sources):
+    assert prefetch.source_dependencies(method_config()) == [
+        ("src_a", None), ("src_b", None), ("src_c", None),
+    ]
+
+
+def test_prefetch_uses_prepare_token_and_zip_endpoints(server, sources):
+    fetched = prefetch.prefetch_sources(method_config(), workers=3)
+
+    assert sorted(path.name for path in fetched) == ["src_a", "src_b", "src_c"]
+    for name in ("src_a", "src_b", "src_c"):
+        files = sorted(p.name for p in (sources / name / name / "processes").iterdir())
+        assert files == [f"{name}-{i}.json" for i in range(3)]
+        assert f"/api/download/json/prepare/{name}" in server.state["paths"]
+        assert f"/api/download/json/token-{name}" in server.state["paths"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_prefetch_bounds_concurrent_sources(server, sources, workers):
+    prefetch.prefetch_sources(method_config(), workers=workers)
+
+    assert server.state["max_active"] == workers
+
+
+def test_second_prefetch_is_a_no_op(server, sources):
+    prefetch.prefetch_sources(method_config(), workers=3)
+    requests = len(server.state["paths"])
+
+    assert prefetch.prefetch_sources(method_config(), workers=3) == []
+    assert len(server.state["paths"]) == requests
+
+
+def test_failed_source_leaves_the_others_downloaded(server, sources):
+    with pytest.raises(RuntimeError, match="src_fail"):
+        prefetch.prefetch_sources(method_config("src_fail"), workers=3)
+
+    for name in ("src_a", "src_c"):
+        assert (sources / name / name / "processes").is_dir()
+
+
+def test_derived_source_waits_for_its_base(sources, monkeypatch):
+    events = []
+    lock = threading.Lock()
+
+    def fetch(source, version):
+        with lock:
+            events.append(("start", source))
+        time.sleep(LATENCY)
+        path = extract_common.jsonld_source_dir(source, version)
+        path.mkdir(parents=True)
+        with lock:
+            events.append(("end", source))
+        return path
+
+    monkeypatch.setattr(prefetch, "_fetch", fetch)
+    monkeypatch.setattr(
+        prefetch, "_base_sources", lambda source: ["src_a"] if source == "src_c" else []
+    )
+    prefetch.prefetch_sources(method_config(), workers=3)
+
+    assert events.index(("start", "src_c")) > events.index(("end", "src_a"))
+    # independent sources do not wait
+    assert events.index(("start", "src_b")) < events.index(("end", "src_a"))
+
+
+def test_sources_built_from_a_failed_base_are_skipped(sources, monkeypatch):
+    attempted = []
+
+    def fetch(source, version):
+        attempted.append(source)
+        if source == "src_a":
+            raise RuntimeError("download failed")
+        path = extract_common.jsonld_source_dir(source, version)
+        path.mkdir(parents=True)
+        return path
+
+    monkeypatch.setattr(prefetch, "_fetch", fetch)
+    monkeypatch.setattr(
+        prefetch, "_base_sources", lambda source: ["src_a"] if source == "src_c" else []
+    )
+    with pytest.raises(RuntimeError, match="src_a, src_c|src_c, src_a"):
+        prefetch.prefetch_sources(method_config(), workers=3)
+
+    assert sorted(attempted) == ["src_a", "src_b"]
+
+
+def test_failed_base_alone_reports_both_sources(sources, monkeypatch):
+    def fetch(source, version):
+        raise RuntimeError("download failed")
+
+    monkeypatch.setattr(prefetch, "_fetch", fetch)
+    monkeypatch.setattr(
+        prefetch, "_base_sources", lambda source: ["src_a"] if source == "src_c" else []
+    )
+    config = {
+        "inventory_source": "src_c",
+        "lcia_input": "src_c",
+        "processes": {},
+    }
+    with pytest.raises(RuntimeError, match="Prefetch failed for src_a, src_c"):
+        prefetch.prefetch_sources(config, workers=2)
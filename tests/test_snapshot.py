@@ -0,0 +1,51 @@
+"""Snapshot keys follow the source data, not only its version."""
+
+import json
+
+import pytest
+
+from wmlci import snapshot
+from wmlci.benchmark.synthetic import generate_synthetic_jsonld, synthetic_method_config
+from wmlci.extract import extract_common
+from wmlci.extract.integrity import record_integrity
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    data = tmp_path / "source_data"
+    for module in (extract_common, snapshot):
+        monkeypatch.setattr(module, "source_data_path", data)
+    return generate_synthetic_jsonld("snap_test", n_processes=20, output_dir=data)
+
+
+def edit_a_process(directory):
+    path = sorted((directory / "processes").glob("*.json"))[0]
+    process = json.loads(path.read_text(encoding="utf-8"))
+    process["exchanges"][0]["amount"] *= 2
+    path.write_text(json.dumps(process), encoding="utf-8")
+
+
+def test_key_changes_with_the_source_data(paths):
+    config = synthetic_method_config("snap_test")
+    key = snapshot.snapshot_key(config)
+    assert snapshot.snapshot_key(config) == key
+
+    edit_a_process(paths["inventory"])
+    assert snapshot.snapshot_key(config) != key
+
+
+def test_key_uses_the_recorded_tree_hash(paths):
+    config = synthetic_method_config("snap_test")
+    meta = paths["inventory"] / "snap_test_metadata.json"
+    meta.write_text(json.dumps({"name_data": "snap_test"}), encoding="utf-8")
+    recorded = record_integrity(paths["inventory"])["tree"]
+
+    inputs = snapshot.snapshot_inputs(config)
+    assert inputs["source_hashes"]["snap_test"] == recorded
+    assert inputs["source_hashes"]["snap_test_lcia"] is not None
+
+    # a re-extracted version records a new hash
+    key = snapshot.snapshot_key(config)
+    edit_a_process(paths["inventory"])
+    record_integrity(paths["inventory"])
+    assert snapshot.snapshot_key(config) != key
@@ -0,0 +1,30 @@
+"""Refactorization of PARDISO factorizations."""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from wmlci import solvers
+
+
+def matrix(scale=1.0):
+    n = 50
+    a = sparse.identity(n, format="lil")
+    for i in range(n):
+        a[i, (i + 1) % n] = -0.3 * scale
+        a[(i + 7) % n, i] = -0.1 * scale
+    return a.tocsr()
+
+
+@pytest.mark.skipif(solvers.PyPardisoSolver is None, reason="needs pypardiso")
+@pytest.mark.parametrize("internals", [True, False])
+def test_pardiso_refactor_solves_new_values(monkeypatch, internals):
+    if not internals:
+        # a pypardiso release without the internals refactor uses
+        monkeypatch.setattr(solvers, "_PARDISO_INTERNALS", ("_no_such_attribute",))
+    factorization = solvers.Factorization(matrix(), backend="pardiso")
+    updated = matrix(scale=2.0)
+    factorization.refactor(updated)
+
+    b = np.arange(1.0, 51.0)
+    np.testing.assert_allclose(updated @ factorization.solve(b), b, atol=1e-10)
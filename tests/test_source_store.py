@@ -0,0 +1,86 @@
+"""Source store objects stay intact while version directories are rewritten."""
+
+import json
+
+from wmlci.extract.integrity import (
+    file_hash,
+    record_integrity,
+    verify_tree,
+    write_text_atomic,
+)
+from wmlci.extract.source_store import SourceStore
+from wmlci.metadata import set_meta, write_metadata
+
+
+def make_version(root):
+    directory = root / "source_data" / "demo_v1"
+    (directory / "processes").mkdir(parents=True)
+    for i in range(3):
+        (directory / "processes" / f"{i}.json").write_text(
+            json.dumps({"@id": str(i)}), encoding="utf-8"
+        )
+    (directory / "demo_metadata.json").write_text(
+        json.dumps({"name_data": "demo"}), encoding="utf-8"
+    )
+    record_integrity(directory)
+    return directory
+
+
+def assert_objects_intact(store):
+    objects = list(store.objects.glob("*/*"))
+    assert objects
+    for path in objects:
+        assert file_hash(path) == path.parent.name + path.name
+
+
+def test_ingest_links_data_and_keeps_metadata_out(tmp_path):
+    directory = make_version(tmp_path)
+    store = SourceStore(tmp_path / "store")
+    manifest = store.ingest(directory)
+
+    assert sorted(manifest["files"]) == [f"processes/{i}.json" for i in range(3)]
+    assert list(manifest["metadata"]) == ["demo_metadata.json"]
+    assert (directory / "processes" / "0.json").stat().st_nlink == 2
+    assert (directory / "demo_metadata.json").stat().st_nlink == 1
+
+
+def test_writes_into_version_directory_keep_objects_intact(tmp_path):
+    directory = make_version(tmp_path)
+    store = SourceStore(tmp_path / "store")
+    store.ingest(directory)
+
+    record_integrity(directory)
+    write_metadata("demo", {}, set_meta("demo"), str(directory))
+    write_text_atomic(directory / "processes" / "0.json", "{}")
+
+    assert_objects_intact(store)
+    assert (directory / "processes" / "0.json").read_text(encoding="utf-8") == "{}"
+    assert json.loads(
+        (directory / "processes" / "1.json").read_text(encoding="utf-8")
+    ) == {"@id": "1"}
+
+
+def test_metadata_linked_by_older_store_is_detached(tmp_path):
+    directory = make_version(tmp_path)
+    store = SourceStore(tmp_path / "store")
+    meta = directory / "demo_metadata.json"
+    store._add_object(meta, file_hash(meta))
+    store.ingest(directory)
+
+    assert meta.stat().st_nlink == 1
+    record_integrity(directory)
+    assert_objects_intact(store)
+
+
+def test_materialize_restores_a_verifiable_version(tmp_path):
+    directory = make_version(tmp_path)
+    store = SourceStore(tmp_path / "store")
+    store.ingest(directory)
+
+    copy = tmp_path / "materialized" / "demo_v1"
+    copy.parent.mkdir()
+    assert store.materialize("demo_v1", copy)
+    assert (copy / "demo_metadata.json").read_text(encoding="utf-8") == (
+        directory / "demo_metadata.json"
+    ).read_text(encoding="utf-8")
+    assert verify_tree(copy, "full")
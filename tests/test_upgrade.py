@@ -0,0 +1,159 @@
+"""Incremental node upgrades against a fresh import of the new release."""
+
+import copy
+import json
+
+import bw2data as bd
+import numpy as np
+import pytest
+from bw2data.backends.schema import ActivityDataset, ExchangeDataset
+
+from wmlci import jsonld_loader
+from wmlci.benchmark.synthetic import (
+    foreground_process_name,
+    generate_synthetic_jsonld,
+    synthetic_method_config,
+)
+from wmlci.extract import extract_common, source_store
+from wmlci.lca import (
+    link_inventory,
+    prepare_inventory,
+    prepare_lcia,
+    write_inventory,
+    write_lcia_methods,
+)
+from wmlci.openlca import calculate_lca_results, resolve_processes
+from wmlci.upgrade import apply_node_delta, load_node_hashes
+
+SOURCE = "upgrade_test"
+ADDED = "MSW recycling of Synthetic material 9"
+
+
+@pytest.fixture
+def release(tmp_path, monkeypatch):
+    """JSON-LD directory of a synthetic release in a temporary source tree."""
+    data = tmp_path / "source_data"
+    for module in (extract_common, jsonld_loader):
+        monkeypatch.setattr(module, "source_data_path", data)
+    monkeypatch.setattr(source_store, "store_enabled", lambda: False)
+    paths = generate_synthetic_jsonld(SOURCE, n_processes=80, seed=3, output_dir=data)
+    return paths["inventory"]
+
+
+@pytest.fixture
+def projects():
+    """Create and clean up Brightway projects by name."""
+    current, created = bd.projects.current, []
+
+    def use(name):
+        if name in bd.projects:
+            bd.projects.delete_project(name, delete_dir=True)
+        bd.projects.set_current(name)
+        created.append(name)
+
+    yield use
+    bd.projects.set_current(current)
+    for name in created:
+        if name in bd.projects:
+            bd.projects.delete_project(name, delete_dir=True)
+
+
+def import_release(config):
+    write_inventory(prepare_inventory(config), config)
+    write_lcia_methods(prepare_lcia(config), config)
+
+
+def scores(config):
+    db = bd.Database(config["inventory_database"])
+    summary, _ = calculate_lca_results(db, resolve_processes(db, config), config)
+    return summary.set_index("process")["score"].sort_index()
+
+
+def edit_release(directory, config):
+    """
+    Change the inputs of one process, add a foreground process and remove
+    another, in the release and in ``config``. Returns their ``@id``s.
+    """
+    processes = {
+        p["name"]: (path, p)
+        for path in (directory / "processes").glob("*.json")
+        for p in [json.loads(path.read_text(encoding="utf-8"))]
+    }
+    path, changed = processes["Synthetic process 10"]
+    for exc in changed["exchanges"]:
+        if exc.get("isInput"):
+            exc["amount"] *= 3
+            exc.pop("amountFormula", None)
+    path.write_text(json.dumps(changed), encoding="utf-8")
+
+    # a copy of a foreground process with a product of its own
+    template = processes[foreground_process_name(0)][1]
+    added = copy.deepcopy(template)
+    added["@id"], added["name"] = "upgrade-test-added", ADDED
+    reference = next(e for e in added["exchanges"] if e.get("isQuantitativeReference"))
+    flows = directory / "flows"
+    flow = json.loads(
+        (flows / f"{reference['flow']['@id']}.json").read_text(encoding="utf-8")
+    )
+    flow["@id"], flow["name"] = "upgrade-test-product", f"{ADDED} product"
+    reference["flow"] = {**reference["flow"], "@id": flow["@id"], "name": flow["name"]}
+    for path, entity in (
+        (flows / f"{flow['@id']}.json", flow),
+        (directory / "processes" / f"{added['@id']}.json", added),
+    ):
+        path.write_text(json.dumps(entity), encoding="utf-8")
+    config["processes"][ADDED] = copy.deepcopy(
+        config["processes"][foreground_process_name(0)]
+    )
+
+    removed_name = foreground_process_name(2)
+    path, removed = processes[removed_name]
+    path.unlink()
+    del config["processes"][removed_name]
+    return changed["@id"], added["@id"], removed["@id"]
+
+
+@pytest.mark.parametrize("writer", ["bw2io", "bulk"])
+def test_delta_matches_a_fresh_import(release, projects, writer):
+    config = synthetic_method_config(SOURCE)
+    config["database_writer"] = writer
+    projects(f"wmlci_test_upgrade_{writer}")
+    import_release(config)
+
+    changed, added, removed = edit_release(release, config)
+    result = apply_node_delta(link_inventory(prepare_inventory(config), config), config)
+
+    assert changed in result["changed"]
+    assert added in result["added"]
+    assert removed in result["removed"]
+    assert result["unchanged"] > 0
+    upgraded = scores(config)
+    assert ADDED in upgraded.index
+
+    projects(f"wmlci_test_upgrade_{writer}_fresh")
+    import_release(config)
+    np.testing.assert_allclose(upgraded, scores(config), rtol=1e-9)
+
+
+@pytest.mark.parametrize("writer", ["bw2io", "bulk"])
+def test_delta_with_dangling_exchanges_rolls_back(release, projects, writer):
+    config = synthetic_method_config(SOURCE)
+    config["database_writer"] = writer
+    projects(f"wmlci_test_upgrade_{writer}")
+    import_release(config)
+    db_name = config["inventory_database"]
+    before = scores(config)
+    manifest = load_node_hashes(db_name)
+    rows = (ActivityDataset.select().count(), ExchangeDataset.select().count())
+
+    # drop a product node without changing the datasets that use it
+    jsonld = link_inventory(prepare_inventory(config), config)
+    supplier = next(ds for ds in jsonld.data if ds["name"] == "Synthetic process 10")
+    production = next(e for e in supplier["exchanges"] if e["type"] == "production")
+    jsonld.data = [ds for ds in jsonld.data if ds["code"] != production["input"][1]]
+    with pytest.raises(ValueError, match="use removed nodes"):
+        apply_node_delta(jsonld, config)
+
+    assert (ActivityDataset.select().count(), ExchangeDataset.select().count()) == rows
+    assert load_node_hashes(db_name)["nodes"] == manifest["nodes"]
+    np.testing.assert_allclose(scores(config), before, rtol=1e-12)
@@ -0,0 +1,72 @@
+"""What-if queries against a direct solve of the updated matrix."""
+
+import numpy as np
+import pytest
+from scipy.sparse.linalg import spsolve
+
+from wmlci import jsonld_loader
+from wmlci.benchmark.synthetic import generate_synthetic_jsonld, synthetic_method_config
+from wmlci.extract import extract_common, source_store
+from wmlci.lca import prepare_inventory, prepare_lcia
+from wmlci.matrices import build_matrices
+from wmlci.whatif import WhatIf
+
+
+@pytest.fixture(scope="module")
+def matrices(tmp_path_factory):
+    data = tmp_path_factory.mktemp("whatif") / "source_data"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for module in (extract_common, jsonld_loader):
+            monkeypatch.setattr(module, "source_data_path", data)
+        monkeypatch.setattr(source_store, "store_enabled", lambda: False)
+        generate_synthetic_jsonld("whatif_test", n_processes=60, seed=4, output_dir=data)
+        config = synthetic_method_config("whatif_test")
+        return build_matrices(
+            prepare_inventory(config), prepare_lcia(config), tuple(config["lcia_method"])
+        )
+
+
+def changes(matrices, k):
+    """Double ``k`` off-diagonal technosphere entries in distinct columns."""
+    a = matrices.technosphere.tocoo()
+    products, processes = list(matrices.products), list(matrices.processes)
+    entries, columns = {}, set()
+    for r, c, value in zip(a.row, a.col, a.data):
+        if r != c and c not in columns and len(entries) < k:
+            entries[(products[r], processes[c])] = 2 * value
+            columns.add(c)
+    return entries
+
+
+def direct_score(matrices, demand, update):
+    a = matrices.technosphere.tolil()
+    for (product, process), value in update.items():
+        a[matrices.products[product], matrices.processes[process]] = value
+    f = np.zeros(a.shape[0])
+    for code, amount in demand.items():
+        f[matrices.products[code]] = amount
+    return matrices.characterized_biosphere @ spsolve(a.tocsc(), f)
+
+
+@pytest.mark.parametrize("max_rank, solver", [(50, "woodbury"), (2, "refactor")])
+def test_query_matches_a_direct_solve(matrices, monkeypatch, max_rank, solver):
+    whatif = WhatIf(matrices, max_rank=max_rank)
+    widths = []
+    solve = whatif.factorization.solve
+
+    def recording_solve(b):
+        widths.append(1 if np.ndim(b) == 1 else np.shape(b)[1])
+        return solve(b)
+
+    monkeypatch.setattr(whatif.factorization, "solve", recording_solve)
+    demand = {next(iter(matrices.products)): 907.18474}
+    update = changes(matrices, 3)
+    result = whatif.query(demand, technosphere=update)
+
+    assert result["rank"] == 3
+    assert result["solver"] == solver
+    # over max_rank only the base supply is solved, not the k + 1 block
+    assert widths == ([4] if solver == "woodbury" else [1])
+    np.testing.assert_allclose(
+        result["score"], direct_score(matrices, demand, update), rtol=1e-8
+    )
@@ -0,0 +1,348 @@
+"""
+Adjoint local sensitivity of every scenario score to every model parameter.
+
+With ``h = (c^T B)^T`` the characterized direct impact per process and
+``s = A^-1 f`` a scenario's supply, the score is ``h^T s = lambda^T f`` with
+``A^T lambda = h``. Its derivative with respect to a parameter ``p`` is::
+
+    d score / dp = sum over B entries (r, j): c_r s_j dB_rj/dp
+                 - sum over A entries (i, j): lambda_i s_j dA_ij/dp
+
+so one transposed solve (shared by all scenarios of the method) gives the
+gradient of every score. Entry derivatives ``dA/dp`` and ``dB/dp`` come from
+forward-mode automatic differentiation: the derived parameters and
+amountFormulas of ``wmlci.parameters.ParameterModel`` are evaluated on
+``Dual`` numbers that carry their partial derivatives.
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from wmlci.editImporter import _evaluate_dependent_formulas, _python_expression
+from wmlci.log import log
+from wmlci.method_config import load_method_config
+from wmlci.monte_carlo import prepare_parameter_model
+from wmlci.openlca import METHOD_UNIT, functional_unit_label
+from wmlci.parameters import ParameterModel
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.trace import span, trace_run
+
+
+class Dual:
+    """A value and its partial derivatives ``{parameter index: derivative}``."""
+
+    __slots__ = ("value", "grad")
+
+    def __init__(self, value: float, grad: dict[int, float] | None = None) -> None:
+        self.value = float(value)
+        self.grad = grad or {}
+
+    def __repr__(self) -> str:
+        return f"Dual({self.value!r}, {self.grad!r})"
+
+    @staticmethod
+    def _lift(other) -> Dual:
+        return other if isinstance(other, Dual) else Dual(other)
+
+    @staticmethod
+    def _combine(a: dict, da: float, b: dict, db: float) -> dict[int, float]:
+        """``da * grad a + db * grad b``."""
+        grad = {k: da * v for k, v in a.items()} if da else {}
+        if db:
+            for k, v in b.items():
+                grad[k] = grad.get(k, 0.0) + db * v
+        return grad
+
+    def __add__(self, other):
+        other = self._lift(other)
+        return Dual(self.value + other.value, self._combine(self.grad, 1, other.grad, 1))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._lift(other)
+        return Dual(self.value - other.value, self._combine(self.grad, 1, other.grad, -1))
+
+    def __rsub__(self, other):
+        return self._lift(other) - self
+
+    def __mul__(self, other):
+        other = self._lift(other)
+        return Dual(
+            self.value * other.value,
+            self._combine(self.grad, other.value, other.grad, self.value),
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = self._lift(other)
+        return Dual(
+            self.value / other.value,
+            self._combine(
+                self.grad, 1 / other.value,
+                other.grad, -self.value / other.value**2,
+            ),
+        )
+
+    def __rtruediv__(self, other):
+        return self._lift(other) / self
+
+    def __pow__(self, other):
+        other = self._lift(other)
+        value = self.value**other.value
+        d_base = other.value * self.value ** (other.value - 1) if self.grad else 0.0
+        d_exp = value * math.log(self.value) if other.grad and self.value > 0 else 0.0
+        return Dual(value, self._combine(self.grad, d_base, other.grad, d_exp))
+
+    def __rpow__(self, other):
+        return self._lift(other) ** self
+
+    def __neg__(self):
+        return Dual(-self.value, {k: -v for k, v in self.grad.items()})
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return -self if self.value < 0 else self
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __float__(self) -> float:
+        return self.value
+
+    # comparisons follow the values (conditional formulas pick a branch)
+    def __lt__(self, other):
+        return self.value < self._lift(other).value
+
+    def __le__(self, other):
+        return self.value <= self._lift(other).value
+
+    def __gt__(self, other):
+        return self.value > self._lift(other).value
+
+    def __ge__(self, other):
+        return self.value >= self._lift(other).value
+
+    def __eq__(self, other):
+        return self.value == self._lift(other).value
+
+    def __ne__(self, other):
+        return self.value != self._lift(other).value
+
+    __hash__ = None
+
+
+@lru_cache(maxsize=None)
+def _compile(py_expr: str):
+    return compile(py_expr, "<formula>", "eval")
+
+
+def _evaluate_dual(formula: str, env: dict[str, Any]) -> Dual:
+    """Evaluate an openLCA formula on ``Dual`` parameters."""
+    py_expr = _python_expression(formula, env)
+    try:
+        return Dual._lift(eval(_compile(py_expr), {"__builtins__": {}}, env))  # noqa: S307
+    except Exception as exc:
+        raise ValueError(
+            f"Failed to differentiate formula '{formula}' (-> '{py_expr}'): {exc}"
+        ) from exc
+
+
+def parameter_jacobians(
+    model: ParameterModel,
+) -> tuple[list[dict[str, Any]], sparse.csr_matrix, sparse.csr_matrix]:
+    """
+    Derivatives of every matrix entry with respect to every input parameter.
+
+    Returns
+    -------
+    tuple
+        The parameters (dicts with ``name``, ``scope`` and ``value``), and
+        technosphere and biosphere Jacobians of shape (entries, parameters)
+        in the order of the matrices' COO arrays.
+    """
+    parameters = []
+
+    def seed(name: str, value: float, scope: str) -> Dual:
+        parameters.append({"name": name, "scope": scope, "value": float(value)})
+        return Dual(value, {len(parameters) - 1: 1.0})
+
+    env_global = {
+        name: seed(name, value, "global")
+        for name, value in sorted(model.global_values.items())
+    }
+    env_global = _evaluate_dependent_formulas(
+        env_global, model.global_derived, _evaluate_dual
+    )
+    entries = {"technosphere": ([], [], []), "biosphere": ([], [], [])}
+    for process in model.processes:
+        env = {**env_global}
+        for name, value in sorted(process["values"].items()):
+            env[name] = seed(name, value, process["name"])
+        env = _evaluate_dependent_formulas(env, process["formulas"], _evaluate_dual)
+        for expr, matrix, entry, scale in process["exchanges"]:
+            result = Dual._lift(eval(_compile(expr), {"__builtins__": {}}, env))  # noqa: S307
+            rows, cols, values = entries[matrix]
+            for k, derivative in result.grad.items():
+                rows.append(entry)
+                cols.append(k)
+                values.append(derivative * scale)
+
+    def jacobian(matrix: str) -> sparse.csr_matrix:
+        rows, cols, values = entries[matrix]
+        n_entries = len(getattr(model.matrices, f"{matrix}_coo")[2])
+        return sparse.csr_matrix(
+            (values, (rows, cols)), shape=(n_entries, len(parameters))
+        )
+
+    return parameters, jacobian("technosphere"), jacobian("biosphere")
+
+
+def score_gradients(
+    model: ParameterModel, block: np.ndarray
+) -> tuple[list[dict[str, Any]], np.ndarray, np.ndarray]:
+    """
+    Scores and their gradients for every demand column of ``block``.
+
+    Returns
+    -------
+    tuple
+        Parameters, scores (scenarios,) and gradients (parameters, scenarios).
+    """
+    matrices = model.matrices
+    with span("differentiate formulas"):
+        parameters, d_technosphere, d_biosphere = parameter_jacobians(model)
+    with span("solve"):
+        supply = matrices.factorization.solve(block).reshape(
+            len(matrices.processes), -1
+        )
+        impact = matrices.characterized_biosphere
+        # one transposed solve serves every scenario of the method
+        adjoint = matrices.factorization.solve_transpose(impact)
+    scores = impact @ supply
+
+    t_rows, t_cols, _ = matrices.technosphere_coo
+    b_rows, b_cols, _ = matrices.biosphere_coo
+    bio_weights = matrices.characterization[b_rows][:, None] * supply[b_cols]
+    tech_weights = -adjoint[t_rows][:, None] * supply[t_cols]
+    gradients = d_biosphere.T @ bio_weights + d_technosphere.T @ tech_weights
+    return parameters, scores, np.asarray(gradients)
+
+
+def summarize_gradients(
+    parameters, processes, scores, gradients, method, overridden
+) -> pd.DataFrame:
+    """
+    One row per scenario and parameter with a nonzero derivative, ranked by
+    absolute elasticity ``(d score / dp) * p / score``.
+    """
+    rows = []
+    for j, (activity, product, process_settings) in enumerate(processes):
+        fu_label = functional_unit_label(
+            product.get("name", ""), process_settings["functional_unit"]
+        )
+        for k in np.flatnonzero(gradients[:, j]):
+            p = parameters[k]
+            derivative = float(gradients[k, j])
+            rows.append({
+                "process": activity["name"],
+                "functional_unit": fu_label,
+                "method": str(method),
+                "parameter": p["name"],
+                "scope": p["scope"],
+                "overridden": p["scope"] == "global" and p["name"] in overridden,
+                "value": p["value"],
+                "score": float(scores[j]),
+                "derivative": derivative,
+                "elasticity": (
+                    derivative * p["value"] / scores[j] if scores[j] else np.nan
+                ),
+                "score_unit": METHOD_UNIT,
+            })
+    table = pd.DataFrame(rows)
+    if len(table):
+        order = table["elasticity"].abs().fillna(table["derivative"].abs())
+        table = (
+            table.assign(_order=order)
+            .sort_values(["process", "_order"], ascending=[True, False], kind="stable")
+            .drop(columns="_order")
+            .reset_index(drop=True)
+        )
+    return table
+
+
+def run_adjoint_sensitivity(
+    method_name: str, trace: str | Path | None = None
+) -> dict[str, Any]:
+    """
+    Local sensitivities of every configured scenario of a method YAML.
+
+    Parameters
+    ----------
+    method_name
+        Stem of a file in ``wmlci/methods/``.
+    trace
+        Optional Chrome trace output path (see ``wmlci.trace``).
+
+    Returns
+    -------
+    dict
+        config, ranked DataFrame and output path.
+    """
+    with trace_run(trace):
+        with span("run_adjoint_sensitivity", method=method_name):
+            config = load_method_config(method_name)
+            method = tuple(config["lcia_method"])
+            _, model, processes, block = prepare_parameter_model(config)
+            parameters, scores, gradients = score_gradients(model, block)
+            log.info(
+                f"Adjoint sensitivities of {len(processes)} scenarios to "
+                f"{len(parameters)} parameters"
+            )
+            table = summarize_gradients(
+                parameters, processes, scores, gradients, method,
+                model.fixed_globals,
+            )
+
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get(
+                "adjoint_csv", "lcia_results_adjoint_sensitivity.csv"
+            )
+            table.to_csv(path, index=False)
+            log.info(f"Adjoint sensitivities written to {path}")
+
+    print("\nLargest elasticities:")
+    print(
+        table.groupby("process", sort=False).head(5)[
+            ["process", "parameter", "scope", "derivative", "elasticity"]
+        ].to_string(index=False)
+    )
+    return {
+        "method": method_name,
+        "config": config,
+        "summary": table,
+        "path": str(path),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.adjoint",
+        description="Adjoint local sensitivities of WMLCI scenario scores.",
+    )
+    parser.add_argument("method", nargs="?", default="v16")
+    args = parser.parse_args()
+    run_adjoint_sensitivity(args.method)
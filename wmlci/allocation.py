@@ -0,0 +1,388 @@
+"""
+Optimal allocation of waste tonnages to management pathways.
+
+Unit impacts (score per functional unit of each material x pathway scenario
+and LCIA method) are computed once on the matrix engine; the optimizer only
+works with that table and never re-solves the LCA. Tonnages are expressed
+in functional units (one US short ton in the WARM methods).
+
+The allocation is a linear program solved with ``scipy.optimize.milp``:
+minimize the (weighted) impacts of ``x[material, pathway] >= 0`` subject to
+
+- ``sum over pathways x[m, p] = tonnage[m]``
+- ``sum over materials x[m, p] <= capacity[p]``
+- ``sum over materials x[m, p] >= min_share[p] * total tonnage``
+- ``bounds[m][p] = [low, high]`` on single allocations
+
+and, with ``min_throughput[p]``, binary open/closed variables make it a MILP
+in which a pathway is either unused or handles at least that tonnage.
+
+Scenarios are matched to materials and pathways by their ``comparison_group``
+and ``pathway`` process settings, or otherwise by the WARM process names
+(``"MSW <pathway> of <material>[; ...]"``). Settings are read from the
+``allocation`` section of the method YAML::
+
+    allocation:
+      methods:                # default: lcia_method
+        - [IPCC, AR6-100]
+      weights: [1.0]          # one per method
+      tonnages:
+        Food Waste: 1000
+        Mixed Plastics: 250
+      capacities:
+        combustion: 400
+      min_share:
+        recycling: 0.2
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from wmlci.background import BackgroundStore
+from wmlci.decomposition import BlockDecomposition
+from wmlci.lca import prepare_inventory, prepare_lcia
+from wmlci.log import log
+from wmlci.matrices import build_matrices, resolve_matrix_processes
+from wmlci.method_config import load_method_config
+from wmlci.monte_carlo import matrix_demand_block
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.trace import span, trace_run
+
+_WARM_PROCESS = re.compile(r"^MSW (?P<pathway>[\w ]+?) of (?P<material>[^;]+)")
+
+
+def scenario_material_pathway(name: str, settings: dict[str, Any]) -> tuple[str, str]:
+    """Material and pathway of a scenario from its settings or WARM name."""
+    match = _WARM_PROCESS.match(name)
+    material = settings.get("comparison_group") or (match and match["material"].strip())
+    pathway = settings.get("pathway") or (match and match["pathway"])
+    if not material or not pathway:
+        raise ValueError(
+            f"Cannot tell material and pathway of '{name}'; set comparison_group "
+            "and pathway in its process settings"
+        )
+    return str(material), str(pathway)
+
+
+def unit_impacts(config: dict[str, Any], methods: list[tuple] | None = None) -> pd.DataFrame:
+    """
+    Impact per functional unit of every configured scenario and method.
+
+    The inventory and LCIA sources are prepared once; each method builds its
+    matrices and solves all scenarios as one demand block. With
+    ``background_store`` set, only the foreground above the scenarios is
+    solved and linked to the stored background inventories, which the
+    methods share.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns process, material, pathway, method, impact.
+    """
+    methods = [tuple(m) for m in (methods or [config["lcia_method"]])]
+    jsonld = prepare_inventory(config)
+    jsonldlcia = prepare_lcia(config)
+    store = BackgroundStore.from_config(config)
+    rows = []
+    for method in methods:
+        with span("unit impacts", method=str(method)):
+            matrices = build_matrices(jsonld, jsonldlcia, method)
+            processes = resolve_matrix_processes(matrices, config)
+            block = matrix_demand_block(matrices, processes)
+            if store is not None:
+                decomposition = BlockDecomposition(
+                    matrices, (), np.flatnonzero(block.any(axis=1)), store
+                )
+                scores = decomposition.scores(block, matrices.characterization)
+            else:
+                supply = matrices.factorization.solve(block).reshape(
+                    len(matrices.processes), -1
+                )
+                scores = matrices.characterized_biosphere @ supply
+        for j, (activity, _, process_settings) in enumerate(processes):
+            material, pathway = scenario_material_pathway(
+                activity["name"], process_settings
+            )
+            rows.append({
+                "process": activity["name"],
+                "material": material,
+                "pathway": pathway,
+                "method": str(method),
+                "impact": float(scores[j]),
+            })
+    return pd.DataFrame(rows)
+
+
+class AllocationProblem:
+    """
+    Linear (or mixed-integer) allocation model over a unit-impact table.
+
+    Parameters
+    ----------
+    impacts : pd.DataFrame
+        ``unit_impacts`` output: material, pathway, method, impact.
+    settings : dict
+        ``tonnages`` plus optional ``capacities``, ``min_share``, ``bounds``
+        and ``min_throughput`` (see the module docstring).
+    """
+
+    def __init__(self, impacts: pd.DataFrame, settings: dict[str, Any]) -> None:
+        tonnages = settings.get("tonnages") or {}
+        if not tonnages:
+            raise ValueError("allocation needs tonnages per material")
+        missing = sorted(set(tonnages) - set(impacts["material"]))
+        if missing:
+            raise ValueError(f"No scenarios for materials {missing}")
+        self.methods = list(dict.fromkeys(impacts["method"]))
+        table = impacts[impacts["material"].isin(list(tonnages))]
+        self.options = list(
+            dict.fromkeys(zip(table["material"], table["pathway"]))
+        )
+        self.pathways = list(dict.fromkeys(p for _, p in self.options))
+        pivot = table.pivot_table(
+            index=["material", "pathway"], columns="method", values="impact",
+            aggfunc="first",
+        )
+        self.impacts = pivot.loc[self.options, self.methods].to_numpy()
+        if np.isnan(self.impacts).any():
+            raise ValueError("Unit impacts missing for some material, pathway and method")
+        self.tonnages = {str(m): float(t) for m, t in tonnages.items()}
+        self.settings = settings
+
+        self._check_settings()
+
+        n = len(self.options)
+        self.throughput = {
+            str(p): float(t)
+            for p, t in (settings.get("min_throughput") or {}).items()
+        }
+        self.binaries = list(self.throughput)
+        self.n_variables = n + len(self.binaries)
+        self._constraints = self._build_constraints()
+        low = np.zeros(self.n_variables)
+        high = np.full(self.n_variables, np.inf)
+        for k, (material, pathway) in enumerate(self.options):
+            lo, hi = (
+                (settings.get("bounds") or {}).get(material, {}).get(pathway)
+                or (0.0, np.inf)
+            )
+            low[k], high[k] = lo or 0.0, (np.inf if hi is None else hi)
+        high[n:] = 1
+        self._bounds = Bounds(low, high)
+        self._integrality = np.r_[np.zeros(n), np.ones(len(self.binaries))]
+
+    def _check_settings(self) -> None:
+        """Reject pathways and materials the constraints would silently skip."""
+        settings = self.settings
+        for key in ("capacities", "min_share", "min_throughput"):
+            unknown = sorted(
+                str(p) for p in settings.get(key) or {} if str(p) not in self.pathways
+            )
+            if unknown:
+                raise ValueError(
+                    f"allocation {key}: unknown pathways {unknown}, use one of "
+                    f"{self.pathways}"
+                )
+        for material, pathways in (settings.get("bounds") or {}).items():
+            if str(material) not in self.tonnages:
+                raise ValueError(
+                    f"allocation bounds: unknown material {material!r}, use one "
+                    f"of {sorted(self.tonnages)}"
+                )
+            unknown = sorted(
+                str(p) for p in pathways or {}
+                if (str(material), str(p)) not in self.options
+            )
+            if unknown:
+                raise ValueError(
+                    f"allocation bounds: no scenarios of {material!r} for "
+                    f"pathways {unknown}"
+                )
+
+    def _rows(self, select) -> np.ndarray:
+        row = np.zeros(self.n_variables)
+        for k, option in enumerate(self.options):
+            if select(*option):
+                row[k] = 1
+        return row
+
+    def _build_constraints(self) -> list[LinearConstraint]:
+        settings = self.settings
+        rows, low, high = [], [], []
+        for material, tonnage in self.tonnages.items():
+            rows.append(self._rows(lambda m, _p: m == material))
+            low.append(tonnage)
+            high.append(tonnage)
+        total = sum(self.tonnages.values())
+        for pathway, capacity in (settings.get("capacities") or {}).items():
+            rows.append(self._rows(lambda _m, p: p == pathway))
+            low.append(-np.inf)
+            high.append(float(capacity))
+        for pathway, share in (settings.get("min_share") or {}).items():
+            rows.append(self._rows(lambda _m, p: p == pathway))
+            low.append(float(share) * total)
+            high.append(np.inf)
+        # unused pathways, or at least min_throughput: t*y <= sum x <= total*y
+        for b, pathway in enumerate(self.binaries):
+            used = self._rows(lambda _m, p: p == pathway)
+            upper, lower = used.copy(), used.copy()
+            upper[len(self.options) + b] = -total
+            lower[len(self.options) + b] = -self.throughput[pathway]
+            rows += [upper, lower]
+            low += [-np.inf, 0.0]
+            high += [0.0, np.inf]
+        return [LinearConstraint(sparse.csr_matrix(np.array(rows)), low, high)]
+
+    def objective(self, weights) -> np.ndarray:
+        c = np.zeros(self.n_variables)
+        c[: len(self.options)] = self.impacts @ np.asarray(weights, dtype=float)
+        return c
+
+    def solve(self, weights=None, limits: dict[int, float] | None = None) -> dict[str, Any] | None:
+        """
+        Minimize the weighted impacts, optionally with upper ``limits`` on
+        single methods (``{method index: limit}``, for epsilon constraints).
+
+        Returns the allocation (``x`` per option) and the total impact of
+        each method, or None when infeasible.
+        """
+        weights = np.ones(len(self.methods)) if weights is None else weights
+        constraints = list(self._constraints)
+        for k, limit in (limits or {}).items():
+            row = np.zeros(self.n_variables)
+            row[: len(self.options)] = self.impacts[:, k]
+            constraints.append(LinearConstraint(row[None, :], -np.inf, limit))
+        result = milp(
+            self.objective(weights),
+            constraints=constraints,
+            bounds=self._bounds,
+            integrality=self._integrality,
+        )
+        if not result.success:
+            return None
+        x = result.x[: len(self.options)]
+        return {"x": x, "totals": x @ self.impacts}
+
+    def allocation_table(self, solution: dict[str, Any]) -> pd.DataFrame:
+        """One row per material and pathway with tonnage and impacts."""
+        rows = []
+        for k, (material, pathway) in enumerate(self.options):
+            row = {"material": material, "pathway": pathway, "tonnage": solution["x"][k]}
+            row.update({
+                method: solution["x"][k] * self.impacts[k, i]
+                for i, method in enumerate(self.methods)
+            })
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def pareto_front(self, points: int = 11) -> pd.DataFrame:
+        """
+        Non-dominated allocations over all methods by the epsilon-constraint
+        method: minimize the first method with the others limited to a grid
+        between their individual optimum and their value at the first
+        method's optimum.
+        """
+        if len(self.methods) < 2:
+            raise ValueError("A Pareto front needs at least two methods")
+        first = self.solve(np.eye(len(self.methods))[0])
+        if first is None:
+            raise ValueError("Allocation problem is infeasible")
+        grids = []
+        for k in range(1, len(self.methods)):
+            best = self.solve(np.eye(len(self.methods))[k])
+            if best is None:
+                raise ValueError(
+                    f"Allocation problem has no optimum for {self.methods[k]}"
+                )
+            grids.append(np.linspace(first["totals"][k], best["totals"][k], points))
+        solutions = []
+        for limits in itertools.product(*grids):
+            solution = self.solve(
+                np.eye(len(self.methods))[0],
+                {k + 1: limit + 1e-9 * max(abs(limit), 1) for k, limit in enumerate(limits)},
+            )
+            if solution is not None:
+                solutions.append(solution)
+        totals = np.array([s["totals"] for s in solutions])
+        keep = [
+            i for i, t in enumerate(totals)
+            if not np.any(np.all(totals <= t, axis=1) & np.any(totals < t - 1e-9 * np.abs(t), axis=1))
+        ]
+        rows = []
+        for point, i in enumerate(keep):
+            row = {"point": point}
+            row.update(dict(zip(self.methods, totals[i])))
+            row.update({
+                f"{material} / {pathway}": solutions[i]["x"][k]
+                for k, (material, pathway) in enumerate(self.options)
+            })
+            rows.append(row)
+        return pd.DataFrame(rows).drop_duplicates(subset=self.methods)
+
+
+def run_allocation(
+    method_name: str, pareto: int | None = None, trace: str | Path | None = None
+) -> dict[str, Any]:
+    """
+    Optimal allocation (and optionally a Pareto front over the allocation
+    methods) for a method YAML's ``allocation`` settings.
+    """
+    with trace_run(trace):
+        with span("run_allocation", method=method_name):
+            config = load_method_config(method_name)
+            settings = config.get("allocation") or {}
+            methods = settings.get("methods") or [config["lcia_method"]]
+            impacts = unit_impacts(config, methods)
+            problem = AllocationProblem(impacts, settings)
+            weights = settings.get("weights") or [1.0] * len(problem.methods)
+            with span("optimize"):
+                solution = problem.solve(weights)
+            if solution is None:
+                raise ValueError("Allocation problem is infeasible")
+            table = problem.allocation_table(solution)
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get("allocation_csv", "lcia_allocation.csv")
+            table.to_csv(path, index=False)
+            log.info(f"Optimal allocation written to {path}")
+            result = {
+                "method": method_name,
+                "config": config,
+                "impacts": impacts,
+                "allocation": table,
+                "path": str(path),
+            }
+            if pareto:
+                with span("pareto front", points=pareto):
+                    front = problem.pareto_front(pareto)
+                pareto_path = resultspath / out.get(
+                    "pareto_csv", "lcia_allocation_pareto.csv"
+                )
+                front.to_csv(pareto_path, index=False)
+                log.info(f"Pareto front ({len(front)} points) written to {pareto_path}")
+                result.update(pareto=front, pareto_path=str(pareto_path))
+
+    print("\nOptimal allocation:")
+    print(table.to_string(index=False))
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.allocation",
+        description="Optimal allocation of waste tonnages to WMLCI pathways.",
+    )
+    parser.add_argument("method", nargs="?", default="v16")
+    parser.add_argument("--pareto", type=int, help="points per method on the Pareto front")
+    args = parser.parse_args()
+    run_allocation(args.method, args.pareto)
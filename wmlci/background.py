@@ -0,0 +1,189 @@
+"""
+Store of aggregated background inventories shared across projects and methods.
+
+The cumulative (system-level) inventory of a background product, the
+elementary flows of its whole supply chain per unit, only depends on the
+inventory source it comes from, not on the foreground model or the LCIA
+method. ``BackgroundStore`` keeps these vectors per source name and version
+(plus the inputs that change imported amounts: strategy set, parameter
+overrides and model defaults) so a new method, project or run links its
+foreground to them instead of solving the background again
+(``wmlci.decomposition.BlockDecomposition``).
+
+A store is one compressed ``.npz`` file per key, holding the vectors column
+by column as a sparse CSC matrix (elementary flows x products) with the
+flow and product ``@id`` of each row and column, and a JSON sidecar with
+its inputs. Stores are written to ``wmlci/data/background/`` unless the
+``WMLCI_BACKGROUND_DIR`` environment variable points to a shared
+directory. Enable the store with ``background_store: true`` in the method
+YAML.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from bw2data.utils import safe_filename
+from scipy import sparse
+
+from wmlci.log import log
+from wmlci.settings import datapath
+from wmlci.snapshot import snapshot_inputs
+
+BACKGROUND_ENV_VAR = "WMLCI_BACKGROUND_DIR"
+
+# snapshot inputs that do not change inventories
+_LCIA_INPUTS = ("lcia_input", "lcia_input_version", "lcia_db_name")
+
+
+def background_dir() -> Path:
+    """Directory holding background stores; created if missing."""
+    path = Path(os.environ.get(BACKGROUND_ENV_VAR) or datapath / "background")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def background_inputs(config: dict[str, Any]) -> dict[str, Any]:
+    """Inputs that determine background inventories (no LCIA sources)."""
+    return {
+        k: v for k, v in snapshot_inputs(config).items() if k not in _LCIA_INPUTS
+    }
+
+
+class BackgroundStore:
+    """
+    Cumulative inventories of background products of one inventory source.
+
+    Parameters
+    ----------
+    source, version : str
+        Inventory source name and version.
+    inputs : dict, optional
+        Other inputs that change amounts; part of the store key.
+    directory : Path, optional
+        Defaults to ``background_dir()``.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        version: str | None,
+        inputs: dict[str, Any] | None = None,
+        directory: str | Path | None = None,
+    ) -> None:
+        self.source = source
+        self.version = version
+        self.inputs = inputs or {}
+        payload = json.dumps(self.inputs, sort_keys=True, default=str)
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        name = safe_filename(f"{source}-{version or 'unversioned'}", add_hash=False)
+        self.path = Path(directory or background_dir()) / f"{name}-{key}.npz"
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> BackgroundStore | None:
+        """The store of a method config, or None without ``background_store``."""
+        if not config.get("background_store"):
+            return None
+        inputs = background_inputs(config)
+        return cls(
+            config["inventory_source"], inputs["inventory_source_version"], inputs
+        )
+
+    def __repr__(self) -> str:
+        return f"BackgroundStore({self.source!r}, {self.version!r}, {self.path.name})"
+
+    def load(self) -> tuple[np.ndarray, np.ndarray, sparse.csc_matrix]:
+        """Stored product ids, flow ids and inventories (flows x products)."""
+        if not self.path.exists():
+            return np.array([], dtype=str), np.array([], dtype=str), sparse.csc_matrix((0, 0))
+        with np.load(self.path, allow_pickle=False) as f:
+            products, flows = f["products"], f["flows"]
+            inventory = sparse.csc_matrix(
+                (f["data"], f["indices"], f["indptr"]),
+                shape=(len(flows), len(products)),
+            )
+        return products, flows, inventory
+
+    def lookup(
+        self, products: list[str], flows: dict[str, int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Stored inventories of ``products`` on the rows of ``flows``
+        (``{flow @id: row}``).
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Whether each product is stored, and the inventories, shape
+            (len(flows), len(products)), zero for products not stored.
+        """
+        stored, stored_flows, inventory = self.load()
+        column = {code: k for k, code in enumerate(stored)}
+        found = np.array([code in column for code in products], dtype=bool)
+        result = np.zeros((len(flows), len(products)))
+        if found.any():
+            rows = np.array([flows.get(code, -1) for code in stored_flows], dtype=np.int64)
+            known = rows >= 0
+            picked = inventory[:, [column[c] for c, f in zip(products, found) if f]]
+            result[np.ix_(rows[known], np.flatnonzero(found))] = picked.toarray()[known]
+        return found, result
+
+    def add(self, products: list[str], flows: list[str], inventory: np.ndarray) -> None:
+        """
+        Add inventories (``flows`` x ``products``) to the store; products
+        already stored keep their vectors.
+        """
+        stored, stored_flows, current = self.load()
+        known = set(stored)
+        new = [k for k, code in enumerate(products) if code not in known]
+        if not new:
+            return
+        flow_index = {code: k for k, code in enumerate(stored_flows)}
+        for code in flows:
+            flow_index.setdefault(code, len(flow_index))
+        current = sparse.csc_matrix(
+            (current.data, current.indices, current.indptr),
+            shape=(len(flow_index), current.shape[1]),
+        )
+        rows = np.array([flow_index[code] for code in flows], dtype=np.int64)
+        added = sparse.csc_matrix(inventory[:, new])
+        added = sparse.csc_matrix(
+            (added.data, rows[added.indices], added.indptr),
+            shape=(len(flow_index), len(new)),
+        )
+        combined = sparse.hstack([current, added], format="csc")
+        combined.sort_indices()
+        # write to a temporary name so concurrent readers never see partial files
+        tmp = self.path.with_name(f".{self.path.stem}.{os.getpid()}.npz")
+        np.savez_compressed(
+            tmp,
+            products=np.concatenate([stored, np.array([products[k] for k in new])]).astype(str),
+            flows=np.array(list(flow_index), dtype=str),
+            data=combined.data,
+            indices=combined.indices,
+            indptr=combined.indptr,
+        )
+        os.replace(tmp, self.path)
+        self.path.with_suffix(".json").write_text(
+            json.dumps(
+                {
+                    "source": self.source,
+                    "version": self.version,
+                    "products": combined.shape[1],
+                    "updated": datetime.now().isoformat(timespec="seconds"),
+                    "inputs": self.inputs,
+                },
+                indent=2,
+                default=str,
+            )
+        )
+        log.info(
+            f"Stored {len(new)} background inventories in {self.path} "
+            f"({combined.shape[1]} products)"
+        )
@@ -0,0 +1,38 @@
+"""
+Benchmarks for the WMLCI pipeline on synthetic openLCA JSON-LD.
+
+Run the default suite with ``python -m wmlci.benchmark``; results are appended
+to ``wmlci/data/benchmarks/history.jsonl``. ``python -m wmlci.benchmark.imports``
+guards import times (see ``wmlci.benchmark.imports``).
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from wmlci.log import log
+from wmlci.settings import datapath
+
+benchmark_path = datapath / "benchmarks"
+HISTORY_FILE = benchmark_path / "history.jsonl"
+
+
+def append_history(record: dict[str, Any], path: str | Path | None = None) -> Path:
+    """Append a benchmark record to the JSON Lines history file."""
+    path = Path(path) if path else HISTORY_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    log.info(f"Benchmark '{record['name']}' appended to {path}")
+    return path
+
+
+def load_history(path: str | Path | None = None) -> list[dict[str, Any]]:
+    """Read all records from a benchmark history file."""
+    path = Path(path) if path else HISTORY_FILE
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,50 @@
+"""
+Command line entry point: ``python -m wmlci.benchmark [sizes ...]``.
+"""
+
+import argparse
+
+from wmlci.benchmark.pipeline import SIZES, run_benchmark_suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.benchmark",
+        description="Time WMLCI pipeline stages on synthetic JSON-LD.",
+    )
+    parser.add_argument(
+        "sizes", nargs="*", choices=list(SIZES), default=[],
+        help="inventory sizes to run (default: small)",
+    )
+    parser.add_argument(
+        "--n-processes", type=int, nargs="+",
+        help="additional sizes by number of processes, e.g. 20000 200000",
+    )
+    parser.add_argument("--exchanges-per-process", type=int)
+    parser.add_argument("--formula-density", type=float)
+    parser.add_argument("--multi-output-share", type=float)
+    parser.add_argument("--cycle-share", type=float)
+    parser.add_argument("--uncertainty-share", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--history", help="history file (JSON Lines)")
+    args = parser.parse_args(argv)
+
+    generator_args = {
+        k: v for k, v in vars(args).items()
+        if k not in {"sizes", "history", "n_processes"} and v is not None
+    }
+    sizes = args.sizes or ([] if args.n_processes else ["small"])
+    records = run_benchmark_suite(
+        sizes, args.history, n_processes=args.n_processes, **generator_args
+    )
+    for record in records:
+        stages = ", ".join(f"{k}: {v:.2f} s" for k, v in record["stages"].items())
+        print(f"{record['size']}: total {record['total']:.2f} s ({stages})")
+    if len(records) > 1:
+        print("\nScaling (processes: total seconds):")
+        for record in records:
+            print(f"  {record['params']['n_processes']:>8}: {record['total']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Import-time benchmark.
+
+Times importing WMLCI modules, each in a fresh interpreter, and checks that
+the light modules (settings, logging, config loading, source data fetching)
+do not pull in the Brightway/pandas stack. Exits non-zero on a regression::
+
+    python -m wmlci.benchmark.imports
+    python -m wmlci.benchmark.imports wmlci.lca --repeat 3
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from wmlci import settings
+from wmlci.benchmark import append_history, benchmark_path
+
+IMPORT_HISTORY_FILE = benchmark_path / "imports.jsonl"
+
+# modules used by config loading, CLI help and workers
+LIGHT_MODULES = (
+    "wmlci.settings",
+    "wmlci.log",
+    "wmlci.trace",
+    "wmlci.method_config",
+    "wmlci.metadata",
+    "wmlci.linking",
+    "wmlci.extract.extract_common",
+    "wmlci.extract.integrity",
+    "wmlci.extract.source_store",
+    "wmlci.extract.http_client",
+    "wmlci.extract.prefetch",
+    "wmlci.jsonld_loader",
+)
+# timed for reference, not checked
+REFERENCE_MODULES = ("wmlci.lca",)
+# dependencies a light module must not import
+HEAVY_MODULES = (
+    "bw2calc", "bw2data", "bw2io", "esupy", "fedelemflowlist",
+    "numpy", "openpyxl", "pandas", "scipy",
+)
+# seconds per light module (best of ``repeat``)
+DEFAULT_BUDGET = 0.5
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def time_import(module: str, repeat: int = 5) -> dict[str, Any]:
+    """Best-of-``repeat`` import time of ``module`` in fresh interpreters."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {**best, "runs": [r["seconds"] for r in runs]}
+
+
+def run_import_benchmark(
+    modules: list[str] | None = None,
+    repeat: int = 5,
+    budget: float = DEFAULT_BUDGET,
+    history: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Time module imports and check the light modules.
+
+    Parameters
+    ----------
+    modules
+        Modules to time; defaults to ``LIGHT_MODULES`` and
+        ``REFERENCE_MODULES``. Only modules in ``LIGHT_MODULES`` are checked.
+    budget
+        Seconds a light module may take to import.
+    history
+        Optional JSON Lines file the record is appended to.
+
+    Returns
+    -------
+    dict
+        Benchmark record; ``failures`` lists the light modules that import
+        a heavy dependency or exceed the budget.
+    """
+    modules = modules or [*LIGHT_MODULES, *REFERENCE_MODULES]
+    results = {module: time_import(module, repeat) for module in modules}
+    failures = []
+    for module, result in results.items():
+        if module not in LIGHT_MODULES:
+            continue
+        if result["heavy"]:
+            failures.append(f"{module} imports {', '.join(result['heavy'])}")
+        if result["seconds"] > budget:
+            failures.append(
+                f"{module} takes {result['seconds']:.3f} s (budget {budget:g} s)"
+            )
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": settings.PKG_VERSION_NUMBER,
+        "git_hash": settings.GIT_HASH,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "name": "imports",
+        "params": {"repeat": repeat, "budget": budget},
+        "modules": results,
+        "failures": failures,
+    }
+    if history:
+        append_history(record, history)
+    return record
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.benchmark.imports",
+        description="Time WMLCI module imports and check light modules stay light.",
+    )
+    parser.add_argument("modules", nargs="*", help="modules to time (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument(
+        "--history", nargs="?", const=str(IMPORT_HISTORY_FILE),
+        help=f"append the record to a history file (default {IMPORT_HISTORY_FILE})",
+    )
+    args = parser.parse_args()
+    record = run_import_benchmark(args.modules, args.repeat, args.budget, args.history)
+    for module, result in record["modules"].items():
+        heavy = f"  [{', '.join(result['heavy'])}]" if result["heavy"] else ""
+        print(f"{module:32} {result['seconds']:6.3f} s  {result['modules']:5} modules{heavy}")
+    if record["failures"]:
+        raise SystemExit("Import regressions:\n  " + "\n  ".join(record["failures"]))
@@ -0,0 +1,135 @@
+"""
+Time every WMLCI pipeline stage on synthetic JSON-LD and append the results
+to a machine-readable history file (one JSON object per line).
+"""
+
+from __future__ import annotations
+
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import bw2data as bd
+
+from wmlci import settings
+from wmlci.benchmark import append_history
+from wmlci.benchmark.synthetic import (
+    generate_synthetic_jsonld,
+    synthetic_method_config,
+)
+from wmlci.lca import (
+    prepare_inventory,
+    prepare_lcia,
+    write_inventory,
+    write_lcia_methods,
+)
+from wmlci.openlca import calculate_lca_results, resolve_processes
+from wmlci.trace import Tracer, span, trace_run
+
+# inventory sizes for the default suite; "warm" approximates a WARM v16 export
+# and 10k-100k continue the scaling curve to USLCI/ecoinvent-sized databases
+SIZES = {
+    "small": {"n_processes": 100, "exchanges_per_process": 6},
+    "medium": {"n_processes": 1000, "exchanges_per_process": 8},
+    "warm": {"n_processes": 5000, "exchanges_per_process": 10},
+    "10k": {"n_processes": 10_000, "exchanges_per_process": 10},
+    "50k": {"n_processes": 50_000, "exchanges_per_process": 10},
+    "100k": {"n_processes": 100_000, "exchanges_per_process": 10},
+}
+
+
+def run_pipeline_benchmark(
+    name: str = "synthetic",
+    regenerate: bool = True,
+    trace: str | Path | None = None,
+    **generator_args: Any,
+) -> dict[str, Any]:
+    """
+    Generate a synthetic tree and run it through the pipeline, timing each
+    stage from loading JSON-LD through ``solve``.
+
+    Parameters
+    ----------
+    name
+        Source name of the synthetic tree; also names the Brightway databases.
+    regenerate
+        Write a fresh tree even if one already exists for ``name``.
+    trace
+        Optional Chrome trace output path for the run.
+    generator_args
+        Passed to ``generate_synthetic_jsonld``.
+
+    Returns
+    -------
+    dict
+        History record with parameters, stage durations (seconds) and counts.
+    """
+    n_foreground = generator_args.get("n_foreground", 3)
+    config = synthetic_method_config(name, n_foreground=n_foreground)
+    tracer = Tracer(trace)
+
+    with trace_run(tracer=tracer):
+        with span("generate synthetic JSON-LD"):
+            if regenerate:
+                generate_synthetic_jsonld(name, **generator_args)
+        bd.projects.set_current(config["bw_project_name"])
+
+        jsonld = prepare_inventory(config)
+        write_inventory(jsonld, config)
+        jsonldlcia = prepare_lcia(config)
+        write_lcia_methods(jsonldlcia, config)
+
+        db = bd.Database(config["inventory_database"])
+        with span("resolve processes"):
+            processes = resolve_processes(db, config)
+        with span("calculate LCA results"):
+            results_df, _ = calculate_lca_results(db, processes, config)
+
+    stages = tracer.stage_durations(cat="stage")
+    scenarios = tracer.stage_durations(cat="scenario")
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": settings.PKG_VERSION_NUMBER,
+        "git_hash": settings.GIT_HASH,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "name": name,
+        "params": {"n_foreground": n_foreground, **generator_args},
+        "counts": {
+            "activities": len(db),
+            "scenarios": len(results_df),
+        },
+        "stages": stages,
+        "solve": sum(scenarios.values()),
+        "total": sum(
+            e["dur"] for e in tracer.events
+            if e["ph"] == "X" and e["args"]["depth"] == 0
+        ) / 1e6,
+    }
+    return record
+
+
+def run_benchmark_suite(
+    sizes: list[str] | None = None,
+    history: str | Path | None = None,
+    n_processes: list[int] | None = None,
+    **generator_args: Any,
+) -> list[dict[str, Any]]:
+    """
+    Run the pipeline benchmark for each named size and record the results.
+
+    ``n_processes`` adds sizes with that many processes (named by the count,
+    with the exchanges per process of "warm") to the named ones.
+    """
+    runs = {size: SIZES[size] for size in (sizes or ([] if n_processes else list(SIZES)))}
+    for n in n_processes or []:
+        runs[str(n)] = {**SIZES["warm"], "n_processes": n}
+    records = []
+    for size, preset in sorted(runs.items(), key=lambda item: item[1]["n_processes"]):
+        args = {**preset, **generator_args}
+        record = run_pipeline_benchmark(name=f"synthetic_{size}", **args)
+        record["size"] = size
+        append_history(record, history)
+        records.append(record)
+    return records
@@ -0,0 +1,413 @@
+"""
+Generate synthetic openLCA JSON-LD trees shaped like the WARM and USLCI
+exports read by ``load_JSONLD_sourceData``.
+
+The inventory tree has one reference product per process (plus optional
+co-products with PHYSICAL allocation factors), technosphere inputs linked by
+``defaultProvider``, elementary flow outputs, process input parameters and
+``amountFormula`` exchanges. A matching LCIA tree characterizes the synthetic
+elementary flows so the full pipeline can run through ``solve``.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import shutil
+from pathlib import Path
+from typing import Any
+
+from esupy.util import make_uuid
+
+from wmlci.log import log
+from wmlci.settings import source_data_path
+
+PATHWAYS = ("landfilling", "combustion", "recycling")
+
+_US = {
+    "@type": "Location",
+    "@id": "0b3b97fa-6688-3c56-88ee-4ae80ec0c3c2",
+    "name": "United States",
+    "category": "Country",
+    "code": "US",
+}
+_MASS = {"@type": "FlowProperty", "@id": make_uuid("wmlci synthetic mass"), "name": "Mass"}
+_KG = {"@type": "Unit", "@id": make_uuid("wmlci synthetic kg"), "name": "kg"}
+_T = {"@type": "Unit", "@id": make_uuid("wmlci synthetic t"), "name": "t"}
+_UNIT_GROUP_ID = make_uuid("wmlci synthetic units of mass")
+# global parameters from utils/model_defaults/global_defaults.yaml used in formulas
+_GLOBAL_PARAMETERS = {
+    "transport_distance_landfilling": 20.0,
+    "transport_distance_combustion": 20.0,
+    "transport_distance_recycling": 20.0,
+}
+
+
+def _flow(name: str, flow_type: str, category: str) -> dict[str, Any]:
+    return {
+        "@type": "Flow",
+        "@id": make_uuid("wmlci synthetic flow", name),
+        "name": name,
+        "category": category,
+        "flowType": flow_type,
+        "refUnit": "kg",
+    }
+
+
+def _flow_entity(flow: dict[str, Any]) -> dict[str, Any]:
+    entity = {k: v for k, v in flow.items() if k != "refUnit"}
+    entity["flowProperties"] = [
+        {
+            "@type": "FlowPropertyFactor",
+            "conversionFactor": 1.0,
+            "isRefFlowProperty": True,
+            "flowProperty": _MASS,
+        }
+    ]
+    if flow["flowType"] != "ELEMENTARY_FLOW":
+        entity["location"] = _US
+    return entity
+
+
+def _exchange(
+    internal_id: int,
+    flow: dict[str, Any],
+    amount: float,
+    is_input: bool,
+    quantitative_reference: bool = False,
+    provider: dict[str, Any] | None = None,
+    formula: str | None = None,
+    unit: dict[str, Any] = _KG,
+    geom_sd: float | None = None,
+) -> dict[str, Any]:
+    exchange = {
+        "@type": "Exchange",
+        "internalId": internal_id,
+        "amount": amount,
+        "isInput": is_input,
+        "isQuantitativeReference": quantitative_reference,
+        "isAvoidedProduct": False,
+        "flow": dict(flow),
+        "unit": unit,
+        "flowProperty": _MASS,
+    }
+    if provider is not None:
+        exchange["defaultProvider"] = {
+            "@type": "Process",
+            "@id": provider["@id"],
+            "name": provider["name"],
+            "category": provider["category"],
+            "flowType": "PRODUCT_FLOW",
+            "processType": "UNIT_PROCESS",
+        }
+    if formula:
+        exchange["amountFormula"] = formula
+    if geom_sd:
+        exchange["uncertainty"] = {
+            "@type": "Uncertainty",
+            "distributionType": "LOG_NORMAL_DISTRIBUTION",
+            "geomMean": amount,
+            "geomSd": geom_sd,
+        }
+    return exchange
+
+
+def _write_entities(root: Path, folder: str, entities: dict[str, dict]) -> None:
+    directory = root / folder
+    directory.mkdir(parents=True, exist_ok=True)
+    for entity_id, entity in entities.items():
+        with (directory / f"{entity_id}.json").open("w", encoding="utf-8") as f:
+            json.dump(entity, f)
+
+
+def foreground_process_name(i: int) -> str:
+    """Name of the i-th synthetic WARM-style foreground process."""
+    return f"MSW {PATHWAYS[i % len(PATHWAYS)]} of Synthetic material {i}"
+
+
+def generate_synthetic_jsonld(
+    name: str = "synthetic",
+    n_processes: int = 100,
+    exchanges_per_process: int = 6,
+    formula_density: float = 0.2,
+    multi_output_share: float = 0.02,
+    cycle_share: float = 0.05,
+    n_elementary_flows: int = 50,
+    n_foreground: int = 3,
+    uncertainty_share: float = 0.0,
+    seed: int = 0,
+    output_dir: str | Path | None = None,
+) -> dict[str, Path]:
+    """
+    Write a synthetic inventory tree and a matching LCIA tree.
+
+    Parameters
+    ----------
+    name
+        Source name; trees are written to ``source_data/{name}`` and
+        ``source_data/{name}_lcia`` so they load by name.
+    n_processes
+        Number of processes, including ``n_foreground`` WARM-style
+        "MSW ... of ..." processes whose products are not consumed.
+    exchanges_per_process
+        Non-reference exchanges per process, split between technosphere
+        inputs and elementary flow outputs.
+    formula_density
+        Share of exchanges that carry an ``amountFormula`` over process or
+        global parameters.
+    multi_output_share
+        Share of background processes with a co-product and PHYSICAL
+        allocation factors.
+    cycle_share
+        Share of technosphere inputs linked to a downstream provider, which
+        creates loops in the supply chain.
+    n_elementary_flows
+        Size of the elementary flow list.
+    uncertainty_share
+        Share of non-reference exchanges with a lognormal openLCA
+        uncertainty (geometric standard deviation 1.05-1.5).
+    seed
+        Random seed; the same arguments always write the same tree.
+
+    Returns
+    -------
+    dict
+        ``inventory`` and ``lcia`` directory paths.
+    """
+    if n_processes <= n_foreground:
+        raise ValueError("n_processes must exceed n_foreground")
+    rng = random.Random(seed)
+    root = Path(output_dir) if output_dir else source_data_path
+    inventory_dir = root / name
+    lcia_dir = root / f"{name}_lcia"
+    for d in (inventory_dir, lcia_dir):
+        if d.exists():
+            shutil.rmtree(d)
+
+    elementary = [
+        _flow(
+            f"Synthetic emission {k}",
+            "ELEMENTARY_FLOW",
+            "Elementary flows/emission/air",
+        )
+        for k in range(n_elementary_flows)
+    ]
+    products = [
+        _flow(f"Synthetic product {i}", "PRODUCT_FLOW", "Technosphere flows/synthetic")
+        for i in range(n_processes)
+    ]
+    headers = [
+        {
+            "@id": make_uuid("wmlci synthetic process", name, i),
+            "name": (
+                foreground_process_name(i)
+                if i < n_foreground
+                else f"Synthetic process {i}"
+            ),
+            "category": "Synthetic/foreground" if i < n_foreground else "Synthetic/background",
+        }
+        for i in range(n_processes)
+    ]
+
+    flows = {f["@id"]: _flow_entity(f) for f in elementary + products}
+    processes = {}
+    n_tech_inputs = max(1, exchanges_per_process // 2)
+    n_bio_outputs = max(1, exchanges_per_process - n_tech_inputs)
+    n_formulas = n_loops = n_multi = n_uncertain = 0
+
+    def geom_sd() -> float | None:
+        nonlocal n_uncertain
+        # no draws when disabled, so existing trees stay unchanged
+        if not uncertainty_share or rng.random() >= uncertainty_share:
+            return None
+        n_uncertain += 1
+        return round(rng.uniform(1.05, 1.5), 3)
+
+    for i, header in enumerate(headers):
+        parameters = []
+        exchanges = [_exchange(0, products[i], 1.0, False, True)]
+        allocation = []
+        if i >= n_foreground and rng.random() < multi_output_share:
+            coproduct = _flow(
+                f"Synthetic co-product {i}",
+                "PRODUCT_FLOW",
+                "Technosphere flows/synthetic",
+            )
+            flows[coproduct["@id"]] = _flow_entity(coproduct)
+            exchanges.append(_exchange(1, coproduct, 1.0, False))
+            share = round(rng.uniform(0.5, 0.9), 3)
+            allocation = [
+                {
+                    "@type": "AllocationFactor",
+                    "allocationType": "PHYSICAL_ALLOCATION",
+                    "product": {"@type": "Flow", "@id": f["@id"], "name": f["name"]},
+                    "value": value,
+                }
+                for f, value in ((products[i], share), (coproduct, 1 - share))
+            ]
+            n_multi += 1
+
+        def formula_amount(coefficient: float) -> tuple[float, str | None]:
+            nonlocal n_formulas
+            if rng.random() >= formula_density:
+                return coefficient, None
+            n_formulas += 1
+            if rng.random() < 0.5:
+                global_name = rng.choice(sorted(_GLOBAL_PARAMETERS))
+                factor = coefficient / _GLOBAL_PARAMETERS[global_name]
+                return coefficient, f"{global_name} * {factor!r}"
+            param_name = f"synthetic_param_{len(parameters)}"
+            value = round(rng.uniform(0.5, 2.0), 4)
+            parameters.append({
+                "@type": "Parameter",
+                "@id": make_uuid("wmlci synthetic parameter", header["@id"], param_name),
+                "name": param_name,
+                "parameterScope": "PROCESS_SCOPE",
+                "isInputParameter": True,
+                "value": value,
+            })
+            return coefficient, f"{param_name} * {coefficient / value!r}"
+
+        # technosphere inputs: providers are upstream (higher index) background
+        # processes; cycle_share of them point downstream to close loops
+        candidates_up = range(max(i + 1, n_foreground), n_processes)
+        candidates_down = range(n_foreground, i)
+        providers = set()
+        for _ in range(n_tech_inputs):
+            if candidates_down and rng.random() < cycle_share:
+                providers.add(rng.choice(candidates_down))
+                n_loops += 1
+            elif candidates_up:
+                providers.add(rng.choice(candidates_up))
+        for j in sorted(providers):
+            # keep column sums well below one so the system stays invertible
+            amount, formula = formula_amount(
+                round(rng.uniform(0.01, 0.4) / n_tech_inputs, 6)
+            )
+            unit = _T if rng.random() < 0.1 else _KG
+            if unit is _T:
+                amount /= 1000
+                formula = f"({formula}) / 1000" if formula else None
+            exchanges.append(
+                _exchange(
+                    len(exchanges), products[j], amount, True,
+                    provider=headers[j], formula=formula, unit=unit,
+                    geom_sd=geom_sd(),
+                )
+            )
+        for flow in rng.sample(elementary, min(n_bio_outputs, len(elementary))):
+            amount, formula = formula_amount(round(rng.uniform(0.001, 1.0), 6))
+            exchanges.append(
+                _exchange(
+                    len(exchanges), flow, amount, False, formula=formula,
+                    geom_sd=geom_sd(),
+                )
+            )
+
+        process = {
+            "@type": "Process",
+            **header,
+            "processType": "UNIT_PROCESS",
+            "location": _US,
+            "exchanges": exchanges,
+            "parameters": parameters,
+            "lastInternalId": len(exchanges),
+        }
+        if allocation:
+            process["defaultAllocationMethod"] = "PHYSICAL_ALLOCATION"
+            process["allocationFactors"] = allocation
+        processes[header["@id"]] = process
+
+    unit_groups = {
+        _UNIT_GROUP_ID: {
+            "@type": "UnitGroup",
+            "@id": _UNIT_GROUP_ID,
+            "name": "Units of mass",
+            "defaultFlowProperty": _MASS,
+            "units": [
+                {**_KG, "conversionFactor": 1.0, "isRefUnit": True},
+                {**_T, "conversionFactor": 1000.0},
+            ],
+        }
+    }
+    flow_properties = {
+        _MASS["@id"]: {
+            **_MASS,
+            "flowPropertyType": "PHYSICAL_QUANTITY",
+            "unitGroup": {"@type": "UnitGroup", "@id": _UNIT_GROUP_ID},
+        }
+    }
+    _write_entities(inventory_dir, "processes", processes)
+    _write_entities(inventory_dir, "flows", flows)
+    _write_entities(inventory_dir, "unit_groups", unit_groups)
+    _write_entities(inventory_dir, "flow_properties", flow_properties)
+    _write_entities(inventory_dir, "locations", {_US["@id"]: _US})
+
+    # LCIA tree: one method with one category over the elementary flows
+    method_id = make_uuid("wmlci synthetic method", name)
+    category_id = make_uuid("wmlci synthetic category", name)
+    _write_entities(lcia_dir, "lcia_methods", {
+        method_id: {
+            "@type": "ImpactMethod",
+            "@id": method_id,
+            "name": "WMLCI benchmark",
+            "description": "Synthetic method for benchmarks",
+            "version": "00.00.000",
+            "lastChange": "2026-01-01T00:00:00Z",
+            "impactCategories": [{"@type": "ImpactCategory", "@id": category_id}],
+        }
+    })
+    _write_entities(lcia_dir, "lcia_categories", {
+        category_id: {
+            "@type": "ImpactCategory",
+            "@id": category_id,
+            "name": "Synthetic GWP",
+            "description": "",
+            "referenceUnitName": "kg CO2 eq",
+            "impactFactors": [
+                {
+                    "@type": "ImpactFactor",
+                    "flow": {k: v for k, v in f.items() if k != "refUnit"},
+                    "value": round(rng.uniform(0.1, 300.0), 3),
+                    "unit": _KG,
+                }
+                for f in elementary
+            ],
+        }
+    })
+    _write_entities(lcia_dir, "flows", {f["@id"]: _flow_entity(f) for f in elementary})
+
+    log.info(
+        f"Wrote synthetic JSON-LD '{name}' to {inventory_dir}: {n_processes} "
+        f"processes ({n_multi} multi-output), {n_formulas} formula exchanges, "
+        f"{n_loops} loop links, {n_uncertain} uncertain exchanges"
+    )
+    return {"inventory": inventory_dir, "lcia": lcia_dir}
+
+
+def synthetic_method_config(name: str = "synthetic", n_foreground: int = 3) -> dict[str, Any]:
+    """
+    Method config for a synthetic tree, in the shape ``load_method_config``
+    returns, so it can be passed to the ``wmlci.lca`` stage helpers.
+    """
+    functional_unit = {"amount": 907.18474, "unit": "kilogram"}
+    return {
+        "method_name": f"{name}_benchmark",
+        "bw_project_name": "wmlci_benchmark",
+        "inventory_source": name,
+        "inventory_database": f"{name}_db",
+        "lcia_input": f"{name}_lcia",
+        "lcia_db_name": "WMLCI benchmark",
+        "lcia_method": ["WMLCI benchmark", "Synthetic GWP"],
+        "model_defaults": {"functional_unit": functional_unit},
+        "processes": {
+            foreground_process_name(i): {"functional_unit": dict(functional_unit)}
+            for i in range(n_foreground)
+        },
+        "global_parameter_overrides": {},
+        "process_parameter_overrides": {},
+        "output_files": {
+            "summary_csv": f"{name}_benchmark_results.csv",
+            "detail_csv": f"{name}_benchmark_results_detailed.csv",
+        },
+    }
@@ -0,0 +1,252 @@
+"""
+Break-even values of model parameters between two waste management pathways.
+
+For two scenarios of a method YAML and one model parameter (a global name
+such as ``transport_distance_recycling`` or ``"process name/parameter"``),
+``BreakEven.solve`` finds the value at which both scores are equal: a
+vectorized scan over the bounds locates sign changes of the score
+difference, and ``scipy.optimize.brentq`` refines the first one. Each
+evaluation patches the formula entries of the matrices
+(``ParameterModel.evaluate``) and refactors the cached factorization of
+the foreground system on its fixed sparsity pattern (``EntryScorer``).
+
+``BreakEven.curve`` traces the break-even value over the values of a second
+parameter.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq
+
+from wmlci.background import BackgroundStore
+from wmlci.log import log
+from wmlci.method_config import load_method_config
+from wmlci.monte_carlo import EntryScorer, prepare_parameter_model
+from wmlci.parameters import ParameterModel
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.trace import span, trace_run
+
+
+class BreakEven:
+    """
+    Score difference ``score_a - score_b`` of two scenarios as a function of
+    model parameters.
+
+    Parameters
+    ----------
+    model : wmlci.parameters.ParameterModel
+    processes
+        Resolved scenarios (``wmlci.matrices.resolve_matrix_processes``).
+    block : np.ndarray
+        Demand block of ``processes``.
+    scenario_a, scenario_b : str
+        Process names of the two scenarios.
+    store : wmlci.background.BackgroundStore, optional
+        Shared background inventories.
+    """
+
+    def __init__(
+        self,
+        model: ParameterModel,
+        processes,
+        block: np.ndarray,
+        scenario_a: str,
+        scenario_b: str,
+        store: BackgroundStore | None = None,
+    ) -> None:
+        names = [activity["name"] for activity, _, _ in processes]
+        missing = [s for s in (scenario_a, scenario_b) if s not in names]
+        if missing:
+            raise ValueError(f"Scenarios not in the method config: {missing}")
+        self.model = model
+        self.scenarios = (scenario_a, scenario_b)
+        columns = [names.index(scenario_a), names.index(scenario_b)]
+        self.scorer = EntryScorer(
+            model.matrices, block[:, columns], model.varies_technosphere,
+            model.varying_processes(), store,
+        )
+        self._process_index = {p["name"]: k for k, p in enumerate(model.processes)}
+        self._dropped = model.dropped_parameters()
+
+    def default_value(self, parameter: str) -> float:
+        """Deterministic value of a global or ``"process/parameter"`` input."""
+        if parameter in self.model.global_values:
+            return float(self.model.global_values[parameter])
+        process, _, name = parameter.rpartition("/")
+        k = self._process_index.get(process)
+        if k is None or name not in self.model.processes[k]["values"]:
+            raise ValueError(
+                f"Unknown parameter '{parameter}': use an input global parameter "
+                "or 'process name/parameter' of a process with formula exchanges"
+            )
+        return float(self.model.processes[k]["values"][name])
+
+    def difference(self, assignments: dict[str, np.ndarray]) -> np.ndarray:
+        """Score differences for arrays of parameter values (equal lengths)."""
+        n = len(next(iter(assignments.values())))
+        global_values = {}
+        process_values = [{} for _ in self.model.processes]
+        for parameter, values in assignments.items():
+            self.default_value(parameter)
+            values = np.asarray(values, dtype=float)
+            if parameter in self.model.global_values:
+                global_values[parameter] = values
+            else:
+                process, _, name = parameter.rpartition("/")
+                process_values[self._process_index[process]][name] = values
+        scores = self.scorer(*self.model.evaluate(n, global_values, process_values))
+        return scores[:, 0] - scores[:, 1]
+
+    def default_bounds(self, parameter: str) -> tuple[float, float]:
+        """Zero to ten times the parameter's value (or -1 to 1 for zero)."""
+        value = self.default_value(parameter)
+        return tuple(sorted((0.0, 10 * value))) if value else (-1.0, 1.0)
+
+    def solve(
+        self,
+        parameter: str,
+        bounds: tuple[float, float] | None = None,
+        fixed: dict[str, float] | None = None,
+        grid: int = 41,
+        xtol: float = 1e-10,
+    ) -> float:
+        """
+        Value of ``parameter`` within ``bounds`` where both scores are equal,
+        with other parameters at their defaults or ``fixed`` values; NaN if
+        the difference does not change sign on the scan grid or the
+        parameter only enters formulas that are zero at the defaults.
+        """
+        low, high = bounds or self.default_bounds(parameter)
+        if parameter in self._dropped:
+            log.warning(
+                f"{parameter} only enters formulas that are zero at the default "
+                "parameters, which stay fixed: the scores do not depend on it"
+            )
+            return float("nan")
+        fixed = {k: np.array([v]) for k, v in (fixed or {}).items()}
+
+        def difference(x):
+            values = {parameter: np.atleast_1d(np.asarray(x, dtype=float))}
+            n = len(values[parameter])
+            values.update({k: np.repeat(v, n) for k, v in fixed.items()})
+            return self.difference(values)
+
+        xs = np.linspace(low, high, grid)
+        ds = difference(xs)
+        zeros = np.flatnonzero(ds == 0)
+        if len(zeros):
+            return float(xs[zeros[0]])
+        crossings = np.flatnonzero(np.sign(ds[:-1]) * np.sign(ds[1:]) < 0)
+        if not len(crossings):
+            log.warning(
+                f"No break-even of {parameter} between {low:g} and {high:g} "
+                f"for {self.scenarios[0]!r} and {self.scenarios[1]!r}"
+            )
+            return float("nan")
+        if len(crossings) > 1:
+            log.warning(
+                f"{len(crossings)} break-even values of {parameter} in "
+                f"[{low:g}, {high:g}]; returning the lowest"
+            )
+        i = crossings[0]
+        return float(
+            brentq(lambda x: difference(x)[0], xs[i], xs[i + 1], xtol=xtol)
+        )
+
+    def curve(
+        self,
+        parameter: str,
+        over: str,
+        values,
+        bounds: tuple[float, float] | None = None,
+    ) -> pd.DataFrame:
+        """Break-even values of ``parameter`` for each value of ``over``."""
+        if over in self._dropped:
+            log.warning(
+                f"{over} only enters formulas that are zero at the default "
+                "parameters, which stay fixed: the break-even does not depend on it"
+            )
+        rows = [
+            {over: float(v), parameter: self.solve(parameter, bounds, {over: v})}
+            for v in values
+        ]
+        return pd.DataFrame(rows)
+
+
+def run_break_even(
+    method_name: str,
+    scenario_a: str,
+    scenario_b: str,
+    parameter: str,
+    bounds: tuple[float, float] | None = None,
+    over: str | None = None,
+    values=None,
+    trace: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Break-even value (or curve over ``over``) of ``parameter`` between two
+    scenarios of a method YAML.
+
+    Returns
+    -------
+    dict
+        config, the break-even value or curve DataFrame, and the curve's
+        output path.
+    """
+    with trace_run(trace):
+        with span("run_break_even", method=method_name):
+            config = load_method_config(method_name)
+            _, model, processes, block = prepare_parameter_model(config)
+            break_even = BreakEven(
+                model, processes, block, scenario_a, scenario_b,
+                BackgroundStore.from_config(config),
+            )
+            result: dict[str, Any] = {"method": method_name, "config": config}
+            if over is None:
+                with span("solve", parameter=parameter):
+                    value = break_even.solve(parameter, bounds)
+                log.info(
+                    f"Break-even {parameter} = {value:g} (default "
+                    f"{break_even.default_value(parameter):g})"
+                )
+                result["value"] = value
+                return result
+
+            if values is None:
+                default = break_even.default_value(over)
+                values = np.linspace(0.5 * default, 1.5 * default, 11)
+            with span("curve", parameter=parameter, over=over):
+                curve = break_even.curve(parameter, over, values, bounds)
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get("breakeven_csv", "lcia_breakeven_curve.csv")
+            curve.to_csv(path, index=False)
+            log.info(f"Break-even curve written to {path}")
+    print(curve.to_string(index=False))
+    return {**result, "curve": curve, "path": str(path)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.breakeven",
+        description="Parameter value where two WMLCI pathways score equally.",
+    )
+    parser.add_argument("method")
+    parser.add_argument("scenario_a")
+    parser.add_argument("scenario_b")
+    parser.add_argument("parameter")
+    parser.add_argument("--bounds", type=float, nargs=2)
+    parser.add_argument("--over", help="second parameter to trace a curve over")
+    parser.add_argument("--values", type=float, nargs="+")
+    args = parser.parse_args()
+    run_break_even(
+        args.method, args.scenario_a, args.scenario_b, args.parameter,
+        bounds=tuple(args.bounds) if args.bounds else None,
+        over=args.over, values=args.values,
+    )
@@ -0,0 +1,408 @@
+"""
+Bulk database writer for large JSON-LD imports (USLCI, US electricity
+baseline).
+
+``JSONLDImporter.write_database()`` inserts activities and exchanges 125 rows
+at a time through bw2data's generic path and then re-reads every exchange
+from SQLite to build the processed datapackage. This writer inserts all rows
+with ``executemany`` inside one transaction with tuned SQLite pragmas,
+rebuilds the indices once at the end, and builds the datapackage directly
+from arrays collected while the rows are prepared.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import pickle
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import bw2data as bd
+import numpy as np
+from bw2data import config, databases, geomapping
+from bw2data.backends import sqlite3_lci_db
+from bw2data.backends.schema import ActivityDataset, ExchangeDataset
+from bw2data.backends.utils import dict_as_activitydataset, dict_as_exchangedataset
+from bw2data.configuration import labels
+from bw2data.errors import (
+    InvalidExchange,
+    UnknownObject,
+    UntypedExchange,
+    WrongDatabase,
+)
+from bw2data.utils import (
+    as_uncertainty_dict,
+    get_geocollection,
+    set_correct_process_type,
+)
+from bw2io.errors import NonuniqueCode
+from bw_processing import (
+    INDICES_DTYPE,
+    UNCERTAINTY_DTYPE,
+    clean_datapackage_name,
+    create_datapackage,
+)
+from fsspec.implementations.zip import ZipFileSystem
+
+from wmlci.log import log
+
+# applied for the duration of the bulk insert, then restored
+BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": -262144,  # KiB, i.e. 256 MiB page cache
+}
+
+_ACTIVITY_COLUMNS = ("id", "data", "code", "database", "location", "name", "product", "type")
+_EXCHANGE_COLUMNS = (
+    "data", "input_code", "input_database", "output_code", "output_database", "type"
+)
+
+
+@contextmanager
+def bulk_pragmas(pragmas: dict[str, Any] | None = None) -> Iterator[None]:
+    """Set SQLite pragmas on the LCI database and restore them on exit."""
+    pragmas = BULK_PRAGMAS if pragmas is None else pragmas
+    db = sqlite3_lci_db.db
+    previous = {
+        key: db.execute_sql(f"PRAGMA {key}").fetchone()[0] for key in pragmas
+    }
+    for key, value in pragmas.items():
+        db.execute_sql(f"PRAGMA {key} = {value}")
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            db.execute_sql(f"PRAGMA {key} = {value}")
+
+
+def _insert_rows(table: str, columns: tuple[str, ...], rows: list[dict]) -> None:
+    """
+    Insert rows with one ``executemany`` on the raw connection; peewee's
+    per-value SQL generation dominates ``insert_many`` for large tables.
+    ``data`` is pickled and other fields stored as text, as in bw2data.
+    """
+    sql = (
+        f'INSERT INTO "{table}" ({", ".join(columns)}) '
+        f'VALUES ({", ".join("?" * len(columns))})'
+    )
+    sqlite3_lci_db.db.cursor().executemany(
+        sql,
+        (
+            tuple(
+                pickle.dumps(row[c], protocol=4) if c == "data"
+                else row[c] if row[c] is None or c == "id"
+                else str(row[c])
+                for c in columns
+            )
+            for row in rows
+        ),
+    )
+
+
+def _validate(data: list[dict], db_name: str) -> None:
+    wrong_database = {ds["database"] for ds in data}.difference({db_name})
+    if wrong_database:
+        raise WrongDatabase(
+            f"Can't write activities in databases {wrong_database} to "
+            f"database {db_name}"
+        )
+    seen, duplicates = set(), []
+    for ds in data:
+        if ds["code"] in seen:
+            duplicates.append(ds.get("name"))
+        seen.add(ds["code"])
+    if duplicates:
+        raise NonuniqueCode(
+            f"The following activities have non-unique codes: {duplicates}"
+        )
+
+
+def _uncertainty_fields(exc: dict) -> tuple:
+    """Uncertainty columns as bw2data's ``process()`` reads them."""
+    if "uncertainty_type" not in exc and "uncertainty type" not in exc:
+        return 0, exc["amount"], np.nan, np.nan, np.nan, np.nan, False
+    u = as_uncertainty_dict(dict(exc))
+    return (
+        u.get("uncertainty_type", u.get("uncertainty type", 0)),
+        u.get("loc", u["amount"]),
+        u.get("scale", np.nan),
+        u.get("shape", np.nan),
+        u.get("minimum", np.nan),
+        u.get("maximum", np.nan),
+        u.get("negative", False),
+    )
+
+
+def _add_vector(dp, matrix: str, name: str, rows, cols, amounts, flip=None, uncertainty=None) -> None:
+    """Add a persistent vector to a datapackage from plain arrays."""
+    indices = np.empty(len(rows), dtype=INDICES_DTYPE)
+    indices["row"], indices["col"] = rows, cols
+    distributions = np.zeros(len(rows), dtype=UNCERTAINTY_DTYPE)
+    if uncertainty is not None:
+        distributions[:] = uncertainty
+    else:
+        distributions["loc"] = amounts
+        for field in ("scale", "shape", "minimum", "maximum"):
+            distributions[field] = np.nan
+    order = np.lexsort((cols, rows))
+    dp.add_persistent_vector(
+        matrix=matrix,
+        name=clean_datapackage_name(name),
+        nrows=len(rows),
+        # same precision as bw2data's dict iterator
+        data_array=np.asarray(amounts, dtype=np.float32)[order],
+        indices_array=indices[order],
+        flip_array=(
+            np.zeros(len(rows), dtype=bool) if flip is None
+            else np.asarray(flip, dtype=bool)
+        )[order],
+        distributions_array=distributions[order],
+    )
+
+
+def write_database_bulk(jsonld, searchable: bool = False) -> bd.Database:
+    """
+    Write a linked JSONLDImporter to its database and process it.
+
+    Equivalent to ``jsonld.write_database()`` (existing data is replaced)
+    followed by ``Database.process()``, without the per-row overhead.
+
+    Parameters
+    ----------
+    jsonld : bw2io.importers.json_ld.JSONLDImporter
+        Importer after ``apply_strategies`` and linking.
+    searchable : bool
+        Build the full-text search index (off by default; WMLCI resolves
+        processes by name and does not use search).
+
+    Returns
+    -------
+    bw2data.Database
+    """
+    db_name = jsonld.db_name
+    data = [set_correct_process_type(ds) for ds in jsonld.data]
+    _validate(data, db_name)
+
+    if db_name not in databases:
+        jsonld.metadata.setdefault("format", jsonld.format)
+        bd.Database(db_name).register(**jsonld.metadata)
+    jsonld.write_database_parameters(activate_parameters=False)
+    db = bd.Database(db_name)
+
+    # rows for the SQL tables, with ids assigned here so the datapackage can
+    # be built without reading the exchanges back
+    activities, exchanges, ids = [], [], {}
+    for ds in data:
+        row = dict_as_activitydataset(
+            {k: v for k, v in ds.items() if k != "exchanges"},
+            add_snowflake_id=True,
+        )
+        ids[(db_name, ds["code"])] = row["id"]
+        activities.append(row)
+        for exc in ds.get("exchanges", []):
+            if "input" not in exc or "amount" not in exc:
+                raise InvalidExchange
+            if "type" not in exc:
+                raise UntypedExchange
+            exc.setdefault("output", (db_name, ds["code"]))
+            exchanges.append(dict_as_exchangedataset(exc))
+
+    databases[db_name]["number"] = len(data)
+    databases.set_modified(db_name)
+    geocollections = {
+        get_geocollection(ds.get("location"))
+        for ds in data
+        if ds.get("type") in labels.process_node_types
+    }
+    geocollections.discard(None)
+    databases[db_name]["geocollections"] = sorted(geocollections)
+    geomapping.add({ds["location"] for ds in data if ds.get("location")})
+
+    start = datetime.datetime.now()
+    db._drop_indices()
+    try:
+        with bulk_pragmas(), sqlite3_lci_db.transaction():
+            db.delete(keep_params=True, warn=False, vacuum=False)
+            _insert_rows(ActivityDataset._meta.table_name, _ACTIVITY_COLUMNS, activities)
+            _insert_rows(ExchangeDataset._meta.table_name, _EXCHANGE_COLUMNS, exchanges)
+    finally:
+        db._add_indices()
+    log.info(
+        f"Bulk wrote {len(activities)} activities and {len(exchanges)} "
+        f"exchanges to '{db_name}' in "
+        f"{(datetime.datetime.now() - start).total_seconds():.2f} seconds"
+    )
+
+    if searchable:
+        db.make_searchable(reset=True, signal=False)
+    process_bulk(db, data, ids)
+    return db
+
+
+def process_bulk(db: bd.Database, data: list[dict], ids: dict[tuple, int]) -> None:
+    """
+    Build the processed datapackage of ``db`` from the written datasets,
+    matching ``Database.process()``.
+
+    ``ids`` maps (database, code) to activity ids for ``data``; ids of
+    nodes in other databases (e.g. biosphere flows) are looked up in one
+    query.
+    """
+    technosphere, biosphere, geo, dependents = matrix_entries(db, data, ids)
+    write_processed(db, technosphere, biosphere, geo, dependents)
+
+
+def matrix_entries(
+    db: bd.Database, data: list[dict], ids: dict[tuple, int]
+) -> tuple[dict, dict, dict, set]:
+    """
+    Technosphere, biosphere and geomapping entries of ``data`` as arrays.
+
+    Returns
+    -------
+    tuple
+        ``technosphere`` and ``biosphere`` dicts of ``rows``, ``cols``,
+        ``amounts``, ``uncertainty`` (``UNCERTAINTY_DTYPE``) and, for the
+        technosphere, ``flip``; ``geo`` dict of ``rows`` and ``cols``; and
+        the names of the databases ``data`` depends on.
+    """
+    external = {
+        exc["input"][0]
+        for ds in data
+        for exc in ds.get("exchanges", [])
+        if tuple(exc["input"]) not in ids
+    }
+    if external:
+        ids = dict(ids)
+        ids.update(
+            ((database, code), node_id)
+            for node_id, database, code in ActivityDataset.select(
+                ActivityDataset.id, ActivityDataset.database, ActivityDataset.code
+            )
+            .where(ActivityDataset.database << sorted(external))
+            .tuples()
+        )
+
+    negative = set(labels.technosphere_negative_edge_types)
+    positive = set(labels.technosphere_positive_edge_types)
+    biosphere = set(labels.biosphere_edge_types)
+    bio = ([], [], [], [])  # rows, cols, amounts, uncertainty
+    tech = ([], [], [], [], [])  # rows, cols, amounts, uncertainty, flip
+    has_production, dependents = set(), set()
+
+    for ds in data:
+        for exc in ds.get("exchanges", []):
+            kind = exc["type"]
+            if kind not in biosphere and kind not in negative and kind not in positive:
+                continue
+            if not np.isfinite(exc["amount"]):
+                raise ValueError(f"Invalid amount in exchange {exc}")
+            try:
+                row, col = ids[tuple(exc["input"])], ids[tuple(exc["output"])]
+            except KeyError:
+                raise UnknownObject(
+                    f"Exchange between {exc['input']} and {exc['output']} is "
+                    "invalid - one of these objects is unknown (i.e. doesn't "
+                    "exist as a process dataset)"
+                )
+            if exc["input"][0] != exc["output"][0]:
+                dependents.add(exc["input"][0])
+            target = bio if kind in biosphere else tech
+            target[0].append(row)
+            target[1].append(col)
+            target[2].append(exc["amount"])
+            target[3].append(_uncertainty_fields(exc))
+            if target is tech:
+                tech[4].append(kind in negative)
+                if kind in positive:
+                    has_production.add(col)
+
+    # implicit production of 1 for process nodes without production edges
+    for ds in data:
+        node_id = ids[(ds["database"], ds["code"])]
+        if (
+            ds.get("type") in labels.implicit_production_allowed_node_types
+            and node_id not in has_production
+        ):
+            tech[0].append(node_id)
+            tech[1].append(node_id)
+            tech[2].append(1.0)
+            tech[3].append((0, 1.0, np.nan, np.nan, np.nan, np.nan, False))
+            tech[4].append(False)
+
+    location_normalization = db.metadata.get("location_normalization") or {}
+    geo_rows, geo_cols = [], []
+    for ds in data:
+        if ds.get("type") in labels.process_node_types:
+            location = ds.get("location") or config.global_location
+            geo_rows.append(ids[(ds["database"], ds["code"])])
+            geo_cols.append(
+                geomapping[location_normalization.get(location, location)]
+            )
+
+    def entries(rows, cols, amounts, uncertainty) -> dict[str, np.ndarray]:
+        return {
+            "rows": np.asarray(rows, dtype=np.int64),
+            "cols": np.asarray(cols, dtype=np.int64),
+            "amounts": np.asarray(amounts, dtype=np.float64),
+            "uncertainty": np.array(uncertainty, dtype=UNCERTAINTY_DTYPE),
+        }
+
+    technosphere = entries(*tech[:4])
+    technosphere["flip"] = np.asarray(tech[4], dtype=bool)
+    geo = {
+        "rows": np.asarray(geo_rows, dtype=np.int64),
+        "cols": np.asarray(geo_cols, dtype=np.int64),
+    }
+    return technosphere, entries(*bio), geo, dependents
+
+
+def write_processed(
+    db: bd.Database,
+    technosphere: dict[str, np.ndarray],
+    biosphere: dict[str, np.ndarray],
+    geo: dict[str, np.ndarray],
+    dependents: set[str],
+) -> None:
+    """
+    Write the processed datapackage of ``db`` from ``matrix_entries``
+    arrays and mark the database processed.
+    """
+    db.metadata["processed"] = datetime.datetime.now().isoformat()
+    fp = db.dirpath_processed() / db.filename_processed()
+    # write to a temporary name so readers never see a partial datapackage
+    tmp = fp.with_name(f".{fp.name}")
+    dp = create_datapackage(
+        fs=ZipFileSystem(str(tmp), mode="w"),
+        name=clean_datapackage_name(db.name),
+        sum_intra_duplicates=True,
+        sum_inter_duplicates=False,
+    )
+    _add_vector(
+        dp, "inv_geomapping_matrix", db.name + " inventory geomapping matrix",
+        geo["rows"], geo["cols"], np.ones(len(geo["rows"])),
+    )
+    _add_vector(
+        dp, "biosphere_matrix", db.name + " biosphere matrix",
+        biosphere["rows"], biosphere["cols"], biosphere["amounts"],
+        uncertainty=biosphere["uncertainty"],
+    )
+    _add_vector(
+        dp, "technosphere_matrix", db.name + " technosphere matrix",
+        technosphere["rows"], technosphere["cols"], technosphere["amounts"],
+        flip=technosphere["flip"], uncertainty=technosphere["uncertainty"],
+    )
+    dp.metadata["database_dependencies"] = sorted(dependents)
+    dp.finalize_serialization()
+    os.replace(tmp, fp)
+
+    db.metadata["depends"] = sorted(dependents)
+    db.metadata["dirty"] = False
+    db._metadata.flush()
+    log.info(
+        f"Processed '{db.name}': {len(technosphere['rows'])} technosphere and "
+        f"{len(biosphere['rows'])} biosphere entries"
+    )
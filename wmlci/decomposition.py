@@ -0,0 +1,305 @@
+"""
+Foreground/background block decomposition of the technosphere.
+
+Ordering processes (and the products they supply) as foreground ``f``
+first and background ``b`` second gives::
+
+    A = | A_ff    0   |      B = | B_f  B_b |
+        | A_bf  A_bb  |
+
+as long as no background process consumes a foreground product. The WARM
+scenario processes (``MSW ... of ...``) and the processes whose exchanges
+carry formulas form the foreground; USLCI transport, the electricity
+baseline and the rest of the background never change between draws.
+
+The background is solved once per background version: for the background
+products the foreground consumes (rows ``L`` of ``A_bf``) the cumulative
+inventories ``G = B_b A_bb^-1 I_L`` (flows x L). A scenario, parameter draw
+or sweep point then only solves the foreground system::
+
+    s_f = A_ff^-1 f_f,   u = -A_bf[L] s_f,   g = B_f s_f + G u
+
+Background inventories are cached in the process by a digest of ``A_bb``,
+``B_b`` and ``L``, and, given a ``wmlci.background.BackgroundStore``, on
+disk per inventory source version, so other projects and methods only solve
+background products the store does not have yet.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import maximum_bipartite_matching
+
+from wmlci.background import BackgroundStore
+from wmlci.log import log
+from wmlci.matrices import InventoryMatrices
+from wmlci.solvers import Factorization, factorize
+from wmlci.trace import span
+
+_BACKGROUND_CACHE: dict[str, BackgroundInventory] = {}
+
+
+def supplying_rows(matrices: InventoryMatrices) -> np.ndarray:
+    """
+    Product row supplied by each process column: the reference product
+    where every process has one, otherwise a structural matching of A.
+    """
+    rows = np.full(len(matrices.processes), -1, dtype=np.int64)
+    for code, col in matrices.processes.items():
+        product = matrices.process_meta.get(code, {}).get("product")
+        if product in matrices.products:
+            rows[col] = matrices.products[product]
+    if (rows >= 0).all() and len(np.unique(rows)) == len(rows):
+        return rows
+    pattern = sparse.csr_matrix(matrices.technosphere.T)
+    rows = maximum_bipartite_matching(pattern, perm_type="column")
+    if (rows < 0).any():
+        raise ValueError("Technosphere matrix is structurally singular")
+    return rows.astype(np.int64)
+
+
+def foreground_closure(
+    matrices: InventoryMatrices, seeds: Iterable[int], rows: np.ndarray
+) -> np.ndarray:
+    """
+    Sorted process columns of ``seeds`` and, recursively, every process
+    that consumes a product they supply.
+    """
+    technosphere = sparse.csr_matrix(matrices.technosphere)
+    foreground = set(int(c) for c in seeds)
+    queue = list(foreground)
+    while queue:
+        r = rows[queue.pop()]
+        for j in technosphere.indices[technosphere.indptr[r]:technosphere.indptr[r + 1]]:
+            if j not in foreground:
+                foreground.add(int(j))
+                queue.append(int(j))
+    return np.array(sorted(foreground), dtype=np.int64)
+
+
+class BackgroundInventory:
+    """
+    Cumulative inventories of the background products a foreground uses.
+
+    Attributes
+    ----------
+    rows : np.ndarray
+        Technosphere rows ``L`` of the linked background products.
+    inventory : np.ndarray
+        ``G``, shape (flows, len(rows)): cumulative elementary flows per
+        unit of each linked product.
+    digest : str
+        Version of the background block the inventories were solved from.
+    """
+
+    def __init__(self, rows: np.ndarray, inventory: np.ndarray, digest: str) -> None:
+        self.rows = rows
+        self.inventory = inventory
+        self.digest = digest
+
+    def __repr__(self) -> str:
+        return (
+            f"BackgroundInventory({len(self.rows)} linked products, "
+            f"{self.inventory.shape[0]} flows, {self.digest[:12]})"
+        )
+
+    def impacts(self, characterization: np.ndarray) -> np.ndarray:
+        """Cumulative characterized impact per unit of each linked product."""
+        return characterization @ self.inventory
+
+
+def _digest(*arrays: np.ndarray) -> str:
+    h = hashlib.sha1()
+    for array in arrays:
+        h.update(np.ascontiguousarray(array).tobytes())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+def solve_background(
+    technosphere_bb, biosphere_b, linked: np.ndarray, rows: np.ndarray, digest: str
+) -> BackgroundInventory:
+    """Solve ``A_bb X = I_L`` once and aggregate ``G = B_b X``."""
+    cached = _BACKGROUND_CACHE.get(digest)
+    if cached is not None:
+        return cached
+    with span("solve background", products=technosphere_bb.shape[0], linked=len(linked)):
+        unit = np.zeros((technosphere_bb.shape[0], len(linked)))
+        unit[linked, np.arange(len(linked))] = 1
+        if len(linked):
+            supply = factorize(technosphere_bb).solve(unit)
+            supply = supply.reshape(technosphere_bb.shape[0], -1)
+        else:
+            supply = unit
+        background = BackgroundInventory(
+            rows, np.asarray(biosphere_b @ supply), digest
+        )
+    _BACKGROUND_CACHE[digest] = background
+    return background
+
+
+class BlockDecomposition:
+    """
+    Foreground/background split of one ``InventoryMatrices``.
+
+    Parameters
+    ----------
+    matrices : wmlci.matrices.InventoryMatrices
+    seeds : iterable of int
+        Process columns that must be foreground, e.g. the scenario processes
+        and the processes whose entries vary
+        (``ParameterModel.varying_processes``).
+    demand_rows : iterable of int, optional
+        Demanded product rows; their suppliers are added to ``seeds``.
+    store : wmlci.background.BackgroundStore, optional
+        Shared store of background inventories to read from and add to.
+    """
+
+    def __init__(
+        self,
+        matrices: InventoryMatrices,
+        seeds: Iterable[int],
+        demand_rows: Iterable[int] = (),
+        store: BackgroundStore | None = None,
+    ) -> None:
+        self.matrices = matrices
+        supplied = supplying_rows(matrices)
+        supplier = np.empty_like(supplied)
+        supplier[supplied] = np.arange(len(supplied))
+        seeds = {int(c) for c in seeds} | {int(supplier[r]) for r in demand_rows}
+        self.columns = foreground_closure(matrices, seeds, supplied)
+        self.rows = supplied[self.columns]
+        n = len(matrices.processes)
+        in_foreground = np.zeros(n, dtype=bool)
+        in_foreground[self.columns] = True
+        background_columns = np.flatnonzero(~in_foreground)
+        background_rows = supplied[background_columns]
+        self.size = len(self.columns)
+
+        local = np.full(n, -1, dtype=np.int64)
+        local[self.columns] = np.arange(self.size)
+        # rows map to the position of their supplier, so A_ff keeps its diagonal
+        local_row = np.full(n, -1, dtype=np.int64)
+        local_row[self.rows] = np.arange(self.size)
+        background_local = np.full(n, -1, dtype=np.int64)
+        background_local[background_rows] = np.arange(len(background_rows))
+
+        t_rows, t_cols, _ = matrices.technosphere_coo
+        foreground_column = in_foreground[t_cols]
+        foreground_row = local_row[t_rows] >= 0
+        self._ff = np.flatnonzero(foreground_column & foreground_row)
+        self._bf = np.flatnonzero(foreground_column & ~foreground_row)
+        linked_rows = np.unique(t_rows[self._bf])
+        link_position = np.full(n, -1, dtype=np.int64)
+        link_position[linked_rows] = np.arange(len(linked_rows))
+        self._ff_index = (local_row[t_rows[self._ff]], local[t_cols[self._ff]])
+        self._bf_index = (link_position[t_rows[self._bf]], local[t_cols[self._bf]])
+
+        b_rows, b_cols, _ = matrices.biosphere_coo
+        self._bio = np.flatnonzero(in_foreground[b_cols])
+        self._bio_index = (b_rows[self._bio], local[b_cols[self._bio]])
+
+        # background process supplying each linked product, and its output
+        self.linked_columns = supplier[linked_rows]
+        self.linked_outputs = np.asarray(
+            matrices.technosphere[linked_rows, self.linked_columns]
+        ).ravel()
+
+        product_codes = list(matrices.products)
+        linked_codes = [product_codes[r] for r in linked_rows]
+        found = np.zeros(len(linked_rows), dtype=bool)
+        if store is not None:
+            found, stored = store.lookup(linked_codes, matrices.flows)
+        missing = np.flatnonzero(~found)
+        if store is None or len(missing):
+            technosphere = matrices.technosphere
+            technosphere_bb = technosphere[background_rows][:, background_columns].tocsc()
+            biosphere_b = matrices.biosphere[:, background_columns].tocsc()
+            linked = background_local[linked_rows[missing]]
+            digest = _digest(
+                technosphere_bb.indptr, technosphere_bb.indices, technosphere_bb.data,
+                biosphere_b.indptr, biosphere_b.indices, biosphere_b.data, linked,
+            )
+            solved = solve_background(
+                technosphere_bb, biosphere_b, linked, linked_rows[missing], digest
+            )
+        if store is None:
+            self.background = solved
+        else:
+            if len(missing):
+                stored[:, missing] = solved.inventory
+                store.add(
+                    [linked_codes[k] for k in missing], list(matrices.flows),
+                    solved.inventory,
+                )
+            self.background = BackgroundInventory(linked_rows, stored, _digest(stored))
+        log.info(
+            f"Foreground of {self.size} processes linked to "
+            f"{len(linked_rows)} of {len(background_columns)} background products"
+            + (f" ({int(found.sum())} from {store})" if store is not None else "")
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"BlockDecomposition({self.size} foreground, "
+            f"{len(self.matrices.processes) - self.size} background processes)"
+        )
+
+    def foreground_technosphere(self, values: np.ndarray | None = None):
+        """``A_ff`` for technosphere entry values (default: the matrices')."""
+        values = self.matrices.technosphere_coo[2] if values is None else values
+        return sparse.csc_matrix(
+            (values[self._ff], self._ff_index), shape=(self.size, self.size)
+        )
+
+    def background_demand(self, values: np.ndarray | None = None):
+        """``-A_bf[L]``: linked background products per unit of foreground."""
+        values = self.matrices.technosphere_coo[2] if values is None else values
+        return sparse.csr_matrix(
+            (-values[self._bf], self._bf_index),
+            shape=(len(self.background.rows), self.size),
+        )
+
+    def foreground_biosphere(self, values: np.ndarray | None = None):
+        """``B_f`` for biosphere entry values (default: the matrices')."""
+        values = self.matrices.biosphere_coo[2] if values is None else values
+        return sparse.csr_matrix(
+            (values[self._bio], self._bio_index),
+            shape=(len(self.matrices.flows), self.size),
+        )
+
+    def foreground_demand(self, block: np.ndarray) -> np.ndarray:
+        """Rows of a demand block (products x k) on the foreground products."""
+        outside = np.ones(len(block), dtype=bool)
+        outside[self.rows] = False
+        if np.any(block[outside]):
+            raise ValueError(
+                "Demand on background products; add their suppliers to the foreground"
+            )
+        return block[self.rows]
+
+    def solve(self, block: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Foreground supply ``s_f`` (foreground x k) of a demand block and the
+        linked background products ``u`` (linked x k) it consumes.
+        """
+        supply = Factorization(self.foreground_technosphere()).solve(
+            self.foreground_demand(block)
+        ).reshape(self.size, -1)
+        return supply, np.asarray(self.background_demand() @ supply)
+
+    def inventory(self, block: np.ndarray) -> np.ndarray:
+        """Cumulative inventories ``g`` (flows x k) of a demand block."""
+        supply, linked = self.solve(block)
+        return np.asarray(
+            self.foreground_biosphere() @ supply
+            + self.background.inventory @ linked
+        )
+
+    def scores(self, block: np.ndarray, characterization: np.ndarray) -> np.ndarray:
+        """Characterized scores (k,) of a demand block."""
+        return characterization @ self.inventory(block)
@@ -394,6 +394,9 @@ def split_process_by_products(process: Dict) -> List[Dict]:
             product_flow_id,
             allocation_factor
         )
+        # the child is single-product and already scaled; keeping the parent's
+        # factors would make bw2io allocate it a second time
+        new_process.pop("allocationFactors", None)
         new_processes.append(new_process)
 
     return new_processes
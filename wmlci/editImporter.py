@@ -2,6 +2,7 @@
 Functions to clean up imported olca data and generate square technosphere matrix
 """
 
+import math
 import re
 from typing import Any, Set
 
@@ -435,6 +436,111 @@ def convert_lcia_param_list_to_dict(jsonld):
     return jsonld
 
 
+#####################################################
+### openLCA uncertainty to stats_arrays fields ###
+#####################################################
+
+# stats_arrays uncertainty type ids
+_LOGNORMAL, _NORMAL, _UNIFORM, _TRIANGULAR = 2, 3, 4, 5
+
+
+def _olca_uncertainty_fields(uncertainty: dict, amount: float) -> dict | None:
+    """
+    stats_arrays fields for an openLCA ``Uncertainty`` around ``amount``
+    (already in the flow reference unit). Spreads are taken relative to the
+    distribution's own center, so unit conversion, formula recalculation and
+    sign changes of ``amount`` carry over to the distribution.
+    """
+    kind = uncertainty.get("distributionType")
+    if kind == "LOG_NORMAL_DISTRIBUTION":
+        gsd = uncertainty.get("geomSd")
+        if not gsd or gsd <= 1:
+            return None
+        return {
+            "uncertainty_type": _LOGNORMAL,
+            "loc": math.log(abs(amount)),
+            "scale": math.log(gsd),
+            "negative": amount < 0,
+        }
+    if kind == "NORMAL_DISTRIBUTION":
+        mean, sd = uncertainty.get("mean"), uncertainty.get("sd")
+        if not mean or not sd:
+            return None
+        return {
+            "uncertainty_type": _NORMAL,
+            "loc": amount,
+            "scale": abs(sd * amount / mean),
+        }
+    if kind in ("UNIFORM_DISTRIBUTION", "TRIANGLE_DISTRIBUTION"):
+        low, high = uncertainty.get("minimum"), uncertainty.get("maximum")
+        if low is None or high is None or low == high:
+            return None
+        center = (
+            uncertainty.get("mode")
+            if kind == "TRIANGLE_DISTRIBUTION"
+            else (low + high) / 2
+        )
+        if not center:
+            return None
+        ratio = amount / center
+        low, high = sorted((low * ratio, high * ratio))
+        return {
+            "uncertainty_type": (
+                _TRIANGULAR if kind == "TRIANGLE_DISTRIBUTION" else _UNIFORM
+            ),
+            "loc": amount,
+            "minimum": low,
+            "maximum": high,
+        }
+    return None
+
+
+def convert_uncertainty_to_stats_arrays(jsonld):
+    """
+    Translate openLCA exchange ``uncertainty`` objects into the stats_arrays
+    fields (``uncertainty_type``, ``loc``, ``scale``, ``minimum``,
+    ``maximum``, ``negative``) that bw2data writes to datapackages, so Monte
+    Carlo runs can sample them. bw2io's JSON-LD strategies drop openLCA
+    uncertainty, and convert amounts to reference units later, so the
+    fields are computed here in reference units.
+
+    Run after every cleaning step that changes exchange amounts.
+
+    Parameters
+    ----------
+    jsonld : bw2io.importers.json_ld.JSONLDImporter
+        The JSON-LD importer instance with `data` attribute.
+
+    Returns
+    -------
+    bw2io.importers.json_ld.JSONLDImporter
+        The same importer instance, with updated exchanges.
+    """
+    unit_conversion = {
+        unit["@id"]: unit["conversionFactor"]
+        for group in jsonld.data.get("unit_groups", {}).values()
+        for unit in group.get("units", [])
+    }
+    converted = skipped = 0
+    for process in jsonld.data.get("processes", {}).values():
+        for exc in process.get("exchanges", []):
+            uncertainty = exc.get("uncertainty")
+            if not isinstance(uncertainty, dict) or not exc.get("amount"):
+                continue
+            factor = unit_conversion.get(exc.get("unit", {}).get("@id"), 1.0)
+            fields = _olca_uncertainty_fields(uncertainty, exc["amount"] * factor)
+            if fields is None:
+                skipped += 1
+                continue
+            exc.update(fields)
+            converted += 1
+    log.info(
+        f"Converted {converted} exchange uncertainties to stats_arrays "
+        f"({skipped} unsupported or degenerate distributions left deterministic)."
+    )
+    return jsonld
+
+
 ##############################################################
 ### Recalc amountFormula from model defaults / overrides ###
 ##############################################################
@@ -442,25 +548,38 @@ def convert_lcia_param_list_to_dict(jsonld):
 _FORMULA_KEYWORDS = {"if", "else", "e"}
 
 
+def read_model_defaults() -> tuple[dict[str, Any], dict[str, Any]]:
+    """Raw ``global_defaults.yaml`` and ``process_parameters.yaml`` contents."""
+    with (model_defaults_path / "global_defaults.yaml").open(encoding="utf-8") as f:
+        global_raw = yaml.safe_load(f) or {}
+    with (model_defaults_path / "process_parameters.yaml").open(encoding="utf-8") as f:
+        process_raw = yaml.safe_load(f) or {}
+    return global_raw, process_raw
+
+
+def parameter_value(spec: Any) -> float:
+    """Point value of a model default: a number or a mapping with ``value``."""
+    if isinstance(spec, dict):
+        return float(spec["value"])
+    return float(spec)
+
+
 def _load_model_defaults() -> tuple[
     dict[str, float], dict[str, str], dict[str, dict[str, float]]
 ]:
     """Load global + process defaults from ``utils/model_defaults/``."""
-    with (model_defaults_path / "global_defaults.yaml").open(encoding="utf-8") as f:
-        global_raw = yaml.safe_load(f) or {}
+    global_raw, process_raw = read_model_defaults()
     values = {
-        str(k): float(v) for k, v in (global_raw.get("parameters") or {}).items()
+        str(k): parameter_value(v)
+        for k, v in (global_raw.get("parameters") or {}).items()
     }
     derived = {
         str(name): str(spec["formula"])
         for name, spec in (global_raw.get("derived") or {}).items()
         if isinstance(spec, dict) and spec.get("formula")
     }
-
-    with (model_defaults_path / "process_parameters.yaml").open(encoding="utf-8") as f:
-        process_raw = yaml.safe_load(f) or {}
     process_defaults = {
-        str(proc): {str(k): float(v) for k, v in (params or {}).items()}
+        str(proc): {str(k): parameter_value(v) for k, v in (params or {}).items()}
         for proc, params in (process_raw.get("process_parameters") or {}).items()
     }
     return values, derived, process_defaults
@@ -507,10 +626,11 @@ def _translate_olca_formula(formula: str) -> str:
     return expr
 
 
-def _evaluate_expression(formula: str, env: dict[str, float]) -> float:
-    """Evaluate Python formula (case-insensitive parameter names)."""
+def _python_expression(formula: str, names) -> str:
+    """Python expression for an openLCA formula, with parameter names matched
+    case-insensitively to ``names``."""
     py_expr = _translate_olca_formula(formula)
-    lookup = {k.lower(): k for k in env}
+    lookup = {k.lower(): k for k in names}
 
     def repl_name(match: re.Match) -> str:
         token = match.group(0)
@@ -521,7 +641,12 @@ def _evaluate_expression(formula: str, env: dict[str, float]) -> float:
             raise KeyError(f"Unknown parameter '{token}' in formula '{formula}'")
         return canon
 
-    py_expr = re.sub(r"[A-Za-z_][A-Za-z0-9_]*", repl_name, py_expr)
+    return re.sub(r"[A-Za-z_][A-Za-z0-9_]*", repl_name, py_expr)
+
+
+def _evaluate_expression(formula: str, env: dict[str, float]) -> float:
+    """Evaluate Python formula (case-insensitive parameter names)."""
+    py_expr = _python_expression(formula, env)
     try:
         return float(eval(py_expr, {"__builtins__": {}}, dict(env)))  # noqa: S307
     except Exception as exc:
@@ -531,9 +656,15 @@ def _evaluate_expression(formula: str, env: dict[str, float]) -> float:
 
 
 def _evaluate_dependent_formulas(
-    values: dict[str, float], formulas: dict[str, str]
+    values: dict[str, float], formulas: dict[str, str], evaluate=None
 ) -> dict[str, float]:
-    """evaluate dependent parameter formulas"""
+    """evaluate dependent parameter formulas
+
+    ``evaluate(formula, env)`` defaults to ``_evaluate_expression``; the
+    parameter sampler and the adjoint sensitivities pass vectorized and
+    dual-number evaluators.
+    """
+    evaluate = evaluate or _evaluate_expression
     env, pending = dict(values), dict(formulas)
     for _ in range(len(pending) + 5):
         if not pending:
@@ -552,7 +683,7 @@ def _evaluate_dependent_formulas(
                     needed.add(canon)
             if needed:
                 continue
-            env[name] = _evaluate_expression(formula, env)
+            env[name] = evaluate(formula, env)
             del pending[name]
             progressed = True
         if not progressed:
@@ -587,15 +718,43 @@ def _process_param_dict(process: dict) -> tuple[dict[str, float], dict[str, str]
     return values, formulas
 
 
-def recalculate_amounts_from_formulas(jsonld, config: dict[str, Any]):
+def _process_environment(
+    process: dict,
+    process_defaults: dict[str, dict[str, float]],
+    process_overrides: dict[str, dict[str, Any]],
+) -> tuple[dict[str, float], dict[str, str]]:
+    """Input values and derived formulas of a process after defaults and overrides."""
+    process_name = process.get("name")
+    proc_vals, proc_forms = _process_param_dict(process)
+    proc_vals.update(process_defaults.get(process_name) or {})
+    for k, v in (process_overrides.get(process_name) or {}).items():
+        proc_vals[str(k)] = float(v)
+        proc_forms.pop(str(k), None)
+    return proc_vals, proc_forms
+
+
+def model_parameter_environment(
+    config: dict[str, Any],
+) -> tuple[dict[str, float], dict[str, str], dict[str, dict[str, float]]]:
     """
-    Recompute exchange amounts from amountFormula using model defaults and
-    optional method YAML overrides. Process-derived formulas come from JSON-LD.
+    Global values, global derived formulas and process defaults after the
+    method's ``global_parameter_overrides``.
     """
     global_values, global_derived, process_defaults = _load_model_defaults()
     for name, val in (config.get("global_parameter_overrides") or {}).items():
         global_values[str(name)] = float(val)
         global_derived.pop(str(name), None)
+    return global_values, global_derived, process_defaults
+
+
+def recalculate_amounts_from_formulas(jsonld, config: dict[str, Any]):
+    """
+    Recompute exchange amounts from amountFormula using model defaults and
+    optional method YAML overrides. Process-derived formulas come from JSON-LD.
+    """
+    global_values, global_derived, process_defaults = model_parameter_environment(
+        config
+    )
     process_overrides = config.get("process_parameter_overrides") or {}
 
     env_global = _evaluate_dependent_formulas(global_values, global_derived)
@@ -605,11 +764,9 @@ def recalculate_amounts_from_formulas(jsonld, config: dict[str, Any]):
         if process.get("type") in {"emission", "product"}:
             continue
         process_name = process.get("name", process_id)
-        proc_vals, proc_forms = _process_param_dict(process)
-        proc_vals.update(process_defaults.get(process_name) or {})
-        for k, v in (process_overrides.get(process_name) or {}).items():
-            proc_vals[str(k)] = float(v)
-            proc_forms.pop(str(k), None)
+        proc_vals, proc_forms = _process_environment(
+            process, process_defaults, process_overrides
+        )
 
         env = {**env_global, **proc_vals}
         try:
@@ -387,6 +387,7 @@ def write_provider_errors(error_dicts, output_path):
     """
     # define filepath
     file_path = f"{output_path}.xlsx"
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
 
     # Ensure the file exists
     if not os.path.exists(file_path):
@@ -17,13 +17,14 @@ from urllib import parse
 
 from dotenv import load_dotenv
 from esupy.processed_data_mgmt import mkdir_if_missing
-from esupy.remote import make_url_request
 
 from wmlci.extract.extract_common import (
     API_KEYS_ENV_PATH,
     load_extract_yaml,
     source_data_dir,
 )
+from wmlci.extract.http_client import default_client
+from wmlci.extract.integrity import record_integrity
 from wmlci.log import log
 from wmlci.metadata import set_meta, write_metadata
 
@@ -69,11 +70,13 @@ def _build_url(urlinfo: dict[str, Any], subs: dict[str, str]) -> str:
     return url
 
 
+# the FLCAC API has always been called without certificate verification
+FLCAC_VERIFY = False
+
+
 def _request(url: str) -> Any:
     log.info(f"Calling {url}")
-    resp = make_url_request(url, verify=False)
-    if resp is None:
-        raise RuntimeError(f"No response from {url}")
+    resp = default_client().get(url, verify=FLCAC_VERIFY)
     if resp.status_code != 200:
         raise RuntimeError(f"Request failed ({resp.status_code}): {resp.text[:500]}")
     return resp
@@ -164,15 +167,16 @@ def _call_url_and_download_data(
             or f"{method_name}.zip"
         )
         unzip = last.get("unzip", config.get("unzip", False))
+        sha256 = last.get("sha256", config.get("sha256"))
     else:
         url = _build_url(shared_url, subs)
         filename = config.get("filename") or f"{method_name}.zip"
         unzip = config.get("unzip", False)
+        sha256 = config.get("sha256")
 
     out_path = out_dir / filename
-    resp = _request(url)
-    out_path.write_bytes(resp.content)
-    log.info(f"Downloading and extracting {out_path}")
+    log.info(f"Downloading {out_path}")
+    default_client().download(url, out_path, sha256=sha256, verify=FLCAC_VERIFY)
 
     if unzip:
         if out_path.suffix.lower() != ".zip":
@@ -222,5 +226,6 @@ def download_source_data(method_name: str, version: str | None = None) -> Path:
         str(out_dir),
     )
     log.info(f"Wrote metadata to {meta_path}")
+    record_integrity(out_dir, meta_path)
 
     return out_path
@@ -10,6 +10,7 @@ from typing import Any
 
 import yaml
 
+from wmlci.extract.source_store import materialize_version, store_version
 from wmlci.settings import extractpath, source_data_path
 
 API_KEYS_ENV_PATH = extractpath / "API_Keys.env"
@@ -41,13 +42,17 @@ def source_data_dir(method_name: str, version: str | None = None) -> Path:
 
 
 def jsonld_source_dir(fname: str, version: str | None = None) -> Path:
-    """Local directory containing JSON-LD for ``fname``."""
+    """
+    Local directory containing JSON-LD for ``fname``; materialized from the
+    source store if it is missing there (see ``wmlci.extract.source_store``).
+    """
     if not (extractpath / f"{fname}.yaml").exists():
         return source_data_path / fname
 
     config = load_extract_yaml(fname)
     version = version or config.get("version")
     root = source_data_dir(fname, version)
+    materialize_version(root)
     # Script products write into root; API downloads unzip into root/fname.
     return root if "script_function" in config else root / fname
 
@@ -57,17 +62,22 @@ def extract_source_data(method_name: str, version: str | None = None) -> Path:
     Obtain source data using an extract yaml.
 
     Uses ``script_function`` when present; otherwise downloads from the
-    yaml's configured URL.
+    yaml's configured URL. The extracted version is added to the source
+    store when one is used.
     """
     config = load_extract_yaml(method_name)
+    root = source_data_dir(method_name, version or config.get("version"))
     if "script_function" in config:
         from wmlci.extract.extract_source_data_from_script import (
             extract_source_data_from_script,
         )
 
-        return extract_source_data_from_script(method_name, version=version)
+        path = extract_source_data_from_script(method_name, version=version)
+        store_version(root)
+        return path
 
     from wmlci.extract.download_source_data_from_api import download_source_data
 
     download_source_data(method_name, version=version)
+    store_version(root)
     return jsonld_source_dir(method_name, version=version)
@@ -4,16 +4,22 @@ Build derived source-data products by running scripts defined in extract YAML co
 
 from __future__ import annotations
 
+import shutil
 from pathlib import Path
 
 from wmlci.extract.extract_common import load_extract_yaml, source_data_dir
+from wmlci.extract.integrity import record_integrity
+from wmlci.metadata import set_meta, write_metadata
 
 
 def extract_source_data_from_script(
     method_name: str,
     version: str | None = None,
 ) -> Path:
-    """Run the extract yaml ``script_function`` and return its output path."""
+    """
+    Run the extract yaml ``script_function`` and return its output path.
+    Metadata with the hashes of the output is written next to it.
+    """
     config = load_extract_yaml(method_name)
     version = version or config.get("version")
 
@@ -22,9 +28,13 @@ def extract_source_data_from_script(
         raise ValueError(f"{method_name} does not define a script_function")
 
     output_dir = source_data_dir(method_name, version)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # rebuilt from scratch: the files of a stored version are hard links to
+    # source store objects, which the script must not write through
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
 
-    return Path(
+    path = Path(
         script_function(
             method_name=method_name,
             config=config,
@@ -32,3 +42,9 @@ def extract_source_data_from_script(
         )
         or output_dir
     )
+    meta = set_meta(method_name)
+    meta.ext = config.get("format", "json-ld")
+    record_integrity(
+        output_dir, write_metadata(method_name, config, meta, str(output_dir))
+    )
+    return path
@@ -0,0 +1,308 @@
+"""
+HTTP client for source data downloads.
+
+``DownloadClient`` keeps one pooled ``requests.Session`` so the FLCAC
+prepare/download steps and repeated calls reuse connections, and:
+
+- retries connection errors, timeouts, 429 and 5xx responses with
+  exponential backoff (honoring ``Retry-After``);
+- streams downloads to ``<file>.part`` in 1 MiB chunks, logging progress,
+  so archives never sit in memory;
+- resumes an interrupted download with an HTTP ``Range`` request, within
+  a call and across runs (guarded by the ``ETag``/``Last-Modified`` of the
+  first response, kept in ``<file>.part.json``), and starts over when the
+  server ignores the range;
+- checks the expected size and SHA-256 before moving the file in place.
+
+Tests can point it at a local ``http.server`` stand-in; nothing here is
+specific to the FLCAC API.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from wmlci.extract.integrity import file_hash
+from wmlci.log import log
+
+CHUNK_SIZE = 1 << 20
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# seconds between progress log lines
+PROGRESS_INTERVAL = 5.0
+
+# errors after which a request is retried or a download resumed
+_TRANSIENT = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.ProtocolError,
+)
+
+_CLIENT: DownloadClient | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+class DownloadError(RuntimeError):
+    """Raised when a request or download fails after all retries."""
+
+
+class ChecksumError(DownloadError):
+    """Raised when a downloaded file does not have the expected size or hash."""
+
+
+class DownloadClient:
+    """
+    Pooled HTTP session with retries and resumable streamed downloads.
+
+    Parameters
+    ----------
+    retries : int
+        Attempts after the first one, per request or download.
+    backoff : float
+        Base delay in seconds; attempt ``k`` waits ``backoff * 2**k``
+        (plus jitter, at most ``max_backoff``).
+    timeout : float or tuple
+        ``requests`` connect/read timeout.
+    verify : bool
+        Default TLS certificate verification; ``get`` and ``download`` take
+        a per-call ``verify``.
+    session : requests.Session, optional
+        Session to use instead of a new pooled one.
+    """
+
+    def __init__(
+        self,
+        retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        timeout: float | tuple[float, float] = (10.0, 120.0),
+        verify: bool = True,
+        pool_size: int = 8,
+        session: requests.Session | None = None,
+    ) -> None:
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.verify = verify
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def __repr__(self) -> str:
+        return f"DownloadClient(retries={self.retries}, backoff={self.backoff})"
+
+    def _wait(self, attempt: int, response: requests.Response | None = None) -> None:
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay * (1 + 0.1 * random.random()))
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """GET with retries; returns the last response (any status)."""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self.session.get(url, **kwargs)
+            except _TRANSIENT as e:
+                if last:
+                    raise DownloadError(f"GET {url} failed: {e}") from e
+                log.warning(f"GET {url} failed ({e}); retrying")
+                self._wait(attempt)
+                continue
+            if response.status_code not in RETRY_STATUS or last:
+                return response
+            log.warning(f"GET {url} returned {response.status_code}; retrying")
+            self._wait(attempt, response)
+
+    def download(
+        self,
+        url: str,
+        path: str | Path,
+        sha256: str | None = None,
+        size: int | None = None,
+        verify: bool | None = None,
+    ) -> dict[str, Any]:
+        """
+        Stream ``url`` to ``path``, resuming a previous partial download.
+
+        Parameters
+        ----------
+        sha256, size : optional
+            Expected hash and size; the server's size is checked when it
+            sends one.
+        verify : bool, optional
+            TLS certificate verification; defaults to the client's.
+
+        Returns
+        -------
+        dict
+            path, bytes, sha256, resumed (bytes of a part file left by an
+            earlier run) and seconds.
+
+        Raises
+        ------
+        DownloadError
+            After ``retries`` failed attempts or on a non-retryable status.
+        ChecksumError
+            When the completed file has the wrong size or hash; the partial
+            file is removed.
+        """
+        path = Path(path)
+        verify = self.verify if verify is None else verify
+        part = path.with_name(path.name + ".part")
+        state_path = path.with_name(path.name + ".part.json")
+        state = (
+            json.loads(state_path.read_text(encoding="utf-8"))
+            if part.exists() and state_path.exists() else {}
+        )
+        # a part from another URL (e.g. a new FLCAC download token) is only
+        # resumed with a validator, so If-Range restarts it if it changed
+        if state.get("url") != url and not (state.get("etag") or state.get("last_modified")):
+            part.unlink(missing_ok=True)
+            state = {}
+        state["url"] = url
+        start = time.perf_counter()
+        resumed = part.stat().st_size if part.exists() else 0
+
+        for attempt in range(self.retries + 1):
+            offset = part.stat().st_size if part.exists() else 0
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                validator = state.get("etag") or state.get("last_modified")
+                if validator:
+                    headers["If-Range"] = validator
+            try:
+                with self.session.get(
+                    url, headers=headers, stream=True,
+                    timeout=self.timeout, verify=verify,
+                ) as response:
+                    if response.status_code == 416 and offset:
+                        # nothing left to send: the part file is complete
+                        total = _content_range_total(response)
+                        if total is None or total == offset:
+                            break
+                        part.unlink()
+                        continue
+                    if response.status_code in RETRY_STATUS and attempt < self.retries:
+                        log.warning(f"Download of {url} returned {response.status_code}; retrying")
+                        self._wait(attempt, response)
+                        continue
+                    if response.status_code not in (200, 206):
+                        raise DownloadError(
+                            f"Download of {url} failed ({response.status_code}): "
+                            f"{response.text[:500]}"
+                        )
+                    if response.status_code == 200 and offset:
+                        log.info(f"Server ignored the range request; restarting {path.name}")
+                        offset = 0
+                    total = (
+                        _content_range_total(response)
+                        if response.status_code == 206
+                        else _int(response.headers.get("Content-Length"))
+                    )
+                    state.update(
+                        etag=response.headers.get("ETag") or state.get("etag"),
+                        last_modified=(
+                            response.headers.get("Last-Modified") or state.get("last_modified")
+                        ),
+                        total=total,
+                    )
+                    part.parent.mkdir(parents=True, exist_ok=True)
+                    state_path.write_text(json.dumps(state), encoding="utf-8")
+                    self._stream(response, part, offset, total, url)
+                    break
+            except _TRANSIENT as e:
+                if attempt == self.retries:
+                    raise DownloadError(
+                        f"Download of {url} failed after {attempt + 1} attempts: {e}"
+                    ) from e
+                log.warning(
+                    f"Download of {url} interrupted at "
+                    f"{part.stat().st_size if part.exists() else 0} bytes ({e}); resuming"
+                )
+                self._wait(attempt)
+        else:
+            raise DownloadError(f"Download of {url} failed after {self.retries + 1} attempts")
+
+        digest = file_hash(part)
+        received = part.stat().st_size
+        expected_size = size or state.get("total")
+        if (expected_size is not None and received != expected_size) or (
+            sha256 and digest != sha256.lower()
+        ):
+            part.unlink()
+            state_path.unlink(missing_ok=True)
+            raise ChecksumError(
+                f"{url}: got {received} bytes with sha256 {digest}, expected "
+                f"{expected_size} bytes" + (f" with sha256 {sha256}" if sha256 else "")
+            )
+        os.replace(part, path)
+        state_path.unlink(missing_ok=True)
+        seconds = time.perf_counter() - start
+        log.info(
+            f"Downloaded {path.name} ({received / 1e6:.1f} MB"
+            + (f", {resumed / 1e6:.1f} MB resumed" if resumed else "")
+            + f") in {seconds:.1f} seconds"
+        )
+        return {
+            "path": path, "bytes": received, "sha256": digest,
+            "resumed": resumed, "seconds": seconds,
+        }
+
+    def _stream(
+        self, response: requests.Response, part: Path, offset: int,
+        total: int | None, url: str,
+    ) -> None:
+        written, last = offset, time.perf_counter()
+        started, first = last, offset
+        with part.open("r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+                now = time.perf_counter()
+                if now - last >= PROGRESS_INTERVAL:
+                    rate = (written - first) / max(now - started, 1e-9) / 1e6
+                    share = f" ({written / total:.0%})" if total else ""
+                    log.info(
+                        f"{part.name[:-5]}: {written / 1e6:.1f} MB{share} at {rate:.1f} MB/s"
+                    )
+                    last = now
+
+
+def _int(value: str | None) -> int | None:
+    return int(value) if value and value.isdigit() else None
+
+
+def _content_range_total(response: requests.Response) -> int | None:
+    """Total size from ``Content-Range: bytes a-b/total``."""
+    content_range = response.headers.get("Content-Range", "")
+    return _int(content_range.rsplit("/", 1)[-1]) if "/" in content_range else None
+
+
+def default_client() -> DownloadClient:
+    """Process-wide client, so downloads share the connection pool."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = DownloadClient()
+    return _CLIENT
@@ -0,0 +1,236 @@
+"""
+Content hashes and integrity checks of source data directories.
+
+``hash_tree`` hashes every file of a source data version directory (SHA-256,
+chunked reads, on a thread pool since hashing releases the GIL) and a tree
+hash over the sorted ``path, hash`` pairs. ``record_integrity`` writes them
+into the directory's ``{name}_metadata.json`` when the data are downloaded
+or derived, and ``verify_tree`` checks a directory against it before
+``load_JSONLD_sourceData`` imports it, so a partially extracted or edited
+tree fails in seconds with the files that differ instead of deep inside
+bw2io.
+
+``WMLCI_VERIFY_SOURCE_DATA`` selects the check: ``full`` (default, hashes),
+``quick`` (file list and sizes only) or ``off``. Usage::
+
+    python -m wmlci.extract.integrity wmlci/data/source_data/uslci_v1_2026-06_0
+    python -m wmlci.extract.integrity <dir> --record
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from wmlci.log import log
+
+VERIFY_ENV_VAR = "WMLCI_VERIFY_SOURCE_DATA"
+METADATA_SUFFIX = "_metadata.json"
+
+_BLOCK = 1 << 20
+# mismatches listed in errors and logs
+_SHOWN = 10
+
+
+class IntegrityError(ValueError):
+    """Raised when a source data directory does not match its recorded hashes."""
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def is_extracted_archive(path: Path) -> bool:
+    """A zip archive whose contents were extracted next to it."""
+    return path.suffix.lower() == ".zip" and path.with_suffix("").is_dir()
+
+
+def write_text_atomic(path: str | Path, text: str) -> None:
+    """
+    Write ``text`` to a temporary file next to ``path`` and move it into
+    place. A version directory file may be a hard link to a source store
+    object; replacing the link keeps the object intact where writing
+    through it would not.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def tree_files(directory: Path) -> list[Path]:
+    """
+    Data files of a version directory: everything except metadata JSON and
+    extracted archives (which the source store drops).
+    """
+    return sorted(
+        p for p in Path(directory).rglob("*")
+        if p.is_file()
+        and not p.name.endswith(METADATA_SUFFIX)
+        and not p.name.startswith(".")
+        and not is_extracted_archive(p)
+    )
+
+
+def tree_hash(files: dict[str, list]) -> str:
+    """Hash over sorted ``(relative path, file hash)`` pairs."""
+    h = hashlib.sha256()
+    for relative in sorted(files):
+        h.update(f"{relative}\0{files[relative][0]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def hash_tree(directory: Path, workers: int | None = None) -> dict[str, Any]:
+    """
+    Per-file ``[sha256, size]`` by relative path, and the tree hash, of a
+    source data directory.
+    """
+    directory = Path(directory)
+    paths = tree_files(directory)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(file_hash, paths))
+    files = {
+        p.relative_to(directory).as_posix(): [digest, p.stat().st_size]
+        for p, digest in zip(paths, digests)
+    }
+    log.debug(
+        f"Hashed {len(files)} files of {directory} in "
+        f"{time.perf_counter() - start:.2f} seconds"
+    )
+    return {
+        "algorithm": "sha256",
+        "tree": tree_hash(files),
+        "count": len(files),
+        "bytes": sum(size for _, size in files.values()),
+        "files": files,
+    }
+
+
+def metadata_path(directory: Path) -> Path | None:
+    """The ``*_metadata.json`` of a version directory, if any."""
+    found = sorted(Path(directory).glob(f"*{METADATA_SUFFIX}"))
+    return found[0] if found else None
+
+
+def record_integrity(directory: Path, meta_path: str | Path | None = None) -> dict[str, Any]:
+    """Hash a version directory and add the hashes to its metadata JSON."""
+    directory = Path(directory)
+    meta_path = Path(meta_path) if meta_path else metadata_path(directory)
+    if meta_path is None:
+        raise FileNotFoundError(f"No *{METADATA_SUFFIX} in {directory}")
+    integrity = hash_tree(directory)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["integrity"] = integrity
+    write_text_atomic(meta_path, json.dumps(meta, indent=4))
+    log.info(
+        f"Recorded hashes of {integrity['count']} files "
+        f"({integrity['bytes'] / 1e6:.1f} MB) in {meta_path}"
+    )
+    return integrity
+
+
+def verify_tree(directory: Path, mode: str | None = None) -> bool | None:
+    """
+    Check a version directory against the hashes in its metadata JSON.
+
+    Parameters
+    ----------
+    directory : Path
+    mode : str, optional
+        'full' (hashes), 'quick' (file list and sizes) or 'off'; defaults
+        to ``WMLCI_VERIFY_SOURCE_DATA`` or 'full'.
+
+    Returns
+    -------
+    bool or None
+        True when verified; None when skipped or nothing was recorded.
+
+    Raises
+    ------
+    IntegrityError
+        Listing missing, unexpected and differing files.
+    """
+    mode = mode or os.environ.get(VERIFY_ENV_VAR) or "full"
+    if mode not in ("full", "quick", "off"):
+        raise ValueError(f"Unknown {VERIFY_ENV_VAR} mode: {mode!r}")
+    directory = Path(directory)
+    meta_path = metadata_path(directory)
+    if mode == "off" or meta_path is None:
+        return None
+    recorded = json.loads(meta_path.read_text(encoding="utf-8")).get("integrity")
+    if not recorded:
+        log.debug(f"No recorded hashes in {meta_path}; not verifying {directory}")
+        return None
+
+    start = time.perf_counter()
+    expected = recorded["files"]
+    if mode == "quick":
+        paths = tree_files(directory)
+        actual = {
+            p.relative_to(directory).as_posix(): [None, p.stat().st_size] for p in paths
+        }
+        differing = [
+            r for r in set(expected) & set(actual) if expected[r][1] != actual[r][1]
+        ]
+    else:
+        current = hash_tree(directory)
+        actual = current["files"]
+        if current["tree"] == recorded["tree"]:
+            differing = []
+        else:
+            differing = [
+                r for r in set(expected) & set(actual) if expected[r][0] != actual[r][0]
+            ]
+    missing = sorted(set(expected) - set(actual))
+    unexpected = sorted(set(actual) - set(expected))
+    problems = [
+        (label, sorted(paths))
+        for label, paths in (
+            ("missing", missing), ("unexpected", unexpected), ("changed", differing),
+        )
+        if paths
+    ]
+    if problems:
+        detail = "; ".join(
+            f"{len(paths)} {label}: {', '.join(paths[:_SHOWN])}"
+            + (" ..." if len(paths) > _SHOWN else "")
+            for label, paths in problems
+        )
+        raise IntegrityError(
+            f"{directory} does not match the hashes recorded in {meta_path.name} "
+            f"({detail}). Delete the directory to download it again."
+        )
+    log.info(
+        f"Verified {len(expected)} files of {directory} ({mode}) in "
+        f"{time.perf_counter() - start:.2f} seconds"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.extract.integrity",
+        description="Record or verify hashes of a source data directory.",
+    )
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--record", action="store_true", help="(re)record hashes")
+    parser.add_argument("--quick", action="store_true", help="check file list and sizes only")
+    args = parser.parse_args()
+    if args.record:
+        record_integrity(args.directory)
+    elif verify_tree(args.directory, "quick" if args.quick else "full") is None:
+        raise SystemExit(f"No recorded hashes for {args.directory}")
@@ -0,0 +1,176 @@
+"""
+Concurrent prefetch of the source data a method needs.
+
+``load_JSONLD_sourceData`` fetches a missing source when the pipeline
+reaches it, so a fresh environment downloads the inventory, the LCIA and
+every database named by technosphere updates one after the other.
+``prefetch`` resolves that set from the method YAML, the technosphere update
+files and the extract yamls (a script-derived source depends on its
+``base_source``), and fetches the missing ones on a bounded thread pool; a
+derived source starts as soon as its base is there. The FLCAC prepare and
+download calls of different sources then overlap and share the pooled
+connections of ``wmlci.extract.http_client``.
+
+``wmlci.lca`` prefetches before importing; usage::
+
+    python -m wmlci.extract.prefetch wmlci_pilot --workers 4
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any
+
+from wmlci.extract.extract_common import jsonld_source_dir, load_extract_yaml
+from wmlci.jsonld_loader import obtain_source_data
+from wmlci.linking import configured_updates
+from wmlci.log import log
+from wmlci.method_config import load_method_config
+from wmlci.settings import extractpath
+from wmlci.trace import span
+
+DEFAULT_WORKERS = 4
+
+
+def source_dependencies(config: dict[str, Any]) -> list[tuple[str, str | None]]:
+    """
+    ``(source, version)`` of the inventory, the LCIA and the databases of
+    the technosphere updates of a method config.
+    """
+    sources = [
+        (config["inventory_source"], config.get("inventory_source_version")),
+        (config["lcia_input"], config.get("lcia_input_version")),
+    ]
+    for update in configured_updates(config).values():
+        for spec in (update.get("technosphere_exchanges") or {}).values():
+            sources.append((spec["data_source"], spec.get("data_version")))
+    return list(dict.fromkeys(sources))
+
+
+def _base_sources(source: str) -> list[str]:
+    """Sources a script-derived source is built from."""
+    if not (extractpath / f"{source}.yaml").exists():
+        return []
+    config = load_extract_yaml(source)
+    if "script_function" not in config or not config.get("base_source"):
+        return []
+    return [config["base_source"]]
+
+
+def missing_sources(
+    sources: list[tuple[str, str | None]],
+) -> dict[Path, tuple[str, str | None, set[Path]]]:
+    """
+    Sources without a local directory, by directory, with the directories
+    of the missing sources each one is built from.
+    """
+    missing: dict[Path, tuple[str, str | None, set[Path]]] = {}
+
+    def visit(source: str, version: str | None) -> Path | None:
+        path = jsonld_source_dir(source, version=version)
+        if path in missing:
+            return path
+        if path.exists():
+            return None
+        missing[path] = (source, version, set())
+        for base in _base_sources(source):
+            base_path = visit(base, None)
+            if base_path is not None:
+                missing[path][2].add(base_path)
+        return path
+
+    for source, version in sources:
+        visit(source, version)
+    return missing
+
+
+def _fetch(source: str, version: str | None) -> Path:
+    with span("prefetch source", source=source):
+        return obtain_source_data(source, data_version=version)
+
+
+def prefetch_sources(
+    config: dict[str, Any], workers: int = DEFAULT_WORKERS
+) -> list[Path]:
+    """
+    Fetch the missing sources of a method config, at most ``workers`` at a
+    time.
+
+    Returns
+    -------
+    list of Path
+        Directories fetched (empty when everything is present).
+
+    Raises
+    ------
+    RuntimeError
+        Naming the sources that failed, after the others have finished;
+        sources built from a failed one are not attempted.
+    """
+    missing = missing_sources(source_dependencies(config))
+    if not missing:
+        return []
+    log.info(
+        f"Prefetching {len(missing)} sources with {workers} workers: "
+        + ", ".join(source for source, _, _ in missing.values())
+    )
+    start = time.perf_counter()
+    done: list[Path] = []
+    failed: dict[Path, BaseException] = {}
+    pending = dict(missing)
+    with span("prefetch sources"), ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for path, (source, version, bases) in list(pending.items()):
+                if bases & failed.keys():
+                    failed[path] = RuntimeError(f"a base source of {source} failed")
+                    del pending[path]
+                elif not bases - set(done):
+                    running[pool.submit(_fetch, source, version)] = path
+                    del pending[path]
+            if not running:
+                if pending:
+                    raise RuntimeError(
+                        f"Circular base sources: {sorted(map(str, pending))}"
+                    )
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = running.pop(future)
+                if future.exception() is not None:
+                    failed[path] = future.exception()
+                    log.error(f"Prefetch of {missing[path][0]} failed: {future.exception()}")
+                else:
+                    done.append(path)
+    log.info(
+        f"Prefetched {len(done)} of {len(missing)} sources in "
+        f"{time.perf_counter() - start:.1f} seconds"
+    )
+    if failed:
+        first = next(iter(failed.values()))
+        raise RuntimeError(
+            "Prefetch failed for "
+            + ", ".join(missing[path][0] for path in failed)
+        ) from first
+    return done
+
+
+def prefetch(method_name: str, workers: int = DEFAULT_WORKERS) -> list[Path]:
+    """Fetch the missing sources of ``wmlci/methods/{method_name}.yaml``."""
+    return prefetch_sources(load_method_config(method_name), workers)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.extract.prefetch",
+        description="Download the missing source data of a method concurrently.",
+    )
+    parser.add_argument("method", help="stem of a file in wmlci/methods/")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    for path in prefetch(args.method, args.workers):
+        print(path)
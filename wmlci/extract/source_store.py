@@ -0,0 +1,319 @@
+"""
+Content-addressed store of extracted source data.
+
+Consecutive releases of a source share most of their JSON-LD entities (one
+file per entity), so keeping versions side by side in
+``wmlci/data/source_data/`` stores the same files again and again. The store
+keeps every file once, by the SHA-256 of its bytes, under
+``objects/<2 hex>/<62 hex>``, and each version directory as a manifest of
+relative paths and hashes under ``manifests/``.
+
+Version directories are hard links to the stored objects, so a directory
+costs only its inodes; files in them are only ever replaced, never written
+in place. The ``*_metadata.json`` of a version is rewritten as hashes are
+recorded, so it is kept in its manifest instead of the objects. ``extract_source_data`` ingests a version after
+downloading it, and ``jsonld_source_dir`` materializes a version from its
+manifest when its directory is missing (e.g. after ``evict``). Where hard
+links are not possible (store on another file system), files are copied.
+Zip archives whose contents were extracted next to them are dropped on
+ingest.
+
+Objects are read-only; a store is used when it exists or the
+``WMLCI_SOURCE_STORE_DIR`` environment variable points to one. Create it
+with::
+
+    python -m wmlci.extract.source_store ingest
+    python -m wmlci.extract.source_store stats
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import stat
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from wmlci.extract.integrity import (
+    METADATA_SUFFIX,
+    file_hash,
+    is_extracted_archive,
+    write_text_atomic,
+)
+from wmlci.log import log
+from wmlci.settings import datapath, source_data_path
+
+SOURCE_STORE_ENV_VAR = "WMLCI_SOURCE_STORE_DIR"
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def source_store_dir() -> Path:
+    """Directory of the source store (not created)."""
+    return Path(os.environ.get(SOURCE_STORE_ENV_VAR) or datapath / "source_store")
+
+
+def store_enabled() -> bool:
+    """Whether extracted sources go through the store."""
+    return bool(os.environ.get(SOURCE_STORE_ENV_VAR)) or source_store_dir().exists()
+
+
+def _link_or_copy(source: Path, target: Path) -> bool:
+    """Hard link ``source`` to ``target``; copy if linking fails. True if linked."""
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        shutil.copy2(source, target)
+        return False
+
+
+class SourceStore:
+    """
+    Objects and version manifests of a source store.
+
+    Parameters
+    ----------
+    directory : Path, optional
+        Defaults to ``source_store_dir()``.
+    """
+
+    def __init__(self, directory: str | Path | None = None) -> None:
+        self.directory = Path(directory or source_store_dir())
+        self.objects = self.directory / "objects"
+        self.manifests = self.directory / "manifests"
+
+    def __repr__(self) -> str:
+        return f"SourceStore({str(self.directory)!r})"
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests / f"{name}.json"
+
+    def versions(self) -> list[str]:
+        """Names of the stored version directories."""
+        if not self.manifests.exists():
+            return []
+        return sorted(p.stem for p in self.manifests.glob("*.json"))
+
+    def manifest(self, name: str) -> dict[str, Any] | None:
+        path = self.manifest_path(name)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _add_object(self, path: Path, digest: str) -> Path:
+        target = self.object_path(digest)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # per thread: versions may be ingested concurrently (prefetch)
+            tmp = target.with_name(
+                f".{target.name}.{os.getpid()}.{threading.get_ident()}"
+            )
+            _link_or_copy(path, tmp)
+            os.chmod(tmp, _READ_ONLY)
+            os.replace(tmp, target)
+        return target
+
+    def ingest(self, directory: Path, name: str | None = None) -> dict[str, Any]:
+        """
+        Store the files of a version directory and replace them by links to
+        the stored objects.
+
+        Parameters
+        ----------
+        directory : Path
+            Version directory, e.g. ``source_data/uslci_v1_2026-06_0``.
+        name : str, optional
+            Manifest name; defaults to the directory name.
+
+        Returns
+        -------
+        dict
+            The manifest: ``files`` maps relative paths to ``[hash, size]``.
+        """
+        directory = Path(directory)
+        name = name or directory.name
+        files: dict[str, list] = {}
+        metadata: dict[str, str] = {}
+        new = new_bytes = dropped = 0
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            if path.name.endswith(METADATA_SUFFIX):
+                text = path.read_text(encoding="utf-8")
+                if path.stat().st_nlink > 1:
+                    # linked by an older store; detach before it is rewritten
+                    write_text_atomic(path, text)
+                metadata[path.relative_to(directory).as_posix()] = text
+                continue
+            if is_extracted_archive(path):
+                # extracted next to itself; the contents are stored instead
+                path.unlink()
+                dropped += 1
+                continue
+            digest = file_hash(path)
+            size = path.stat().st_size
+            target = self.object_path(digest)
+            if not target.exists():
+                new += 1
+                new_bytes += size
+                self._add_object(path, digest)
+            if not os.path.samefile(path, target):
+                tmp = path.with_name(f".{path.name}.{os.getpid()}")
+                if _link_or_copy(target, tmp):
+                    os.replace(tmp, path)
+                else:
+                    tmp.unlink()
+            files[path.relative_to(directory).as_posix()] = [digest, size]
+        manifest = {
+            "name": name,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "files": files,
+            "metadata": metadata,
+        }
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path(name).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, self.manifest_path(name))
+        log.info(
+            f"Stored {name}: {len(files)} files, {new} new objects "
+            f"({new_bytes / 1e6:.1f} MB)"
+            + (f", {dropped} extracted archives dropped" if dropped else "")
+        )
+        return manifest
+
+    def materialize(self, name: str, directory: Path) -> bool:
+        """
+        Create a version directory from its manifest. Returns False if the
+        store has no manifest for ``name``.
+        """
+        manifest = self.manifest(name)
+        if manifest is None:
+            return False
+        directory = Path(directory)
+        tmp = directory.with_name(f".{directory.name}.{os.getpid()}")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        linked = 0
+        for relative, (digest, _) in manifest["files"].items():
+            target = tmp / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            linked += _link_or_copy(self.object_path(digest), target)
+        for relative, text in (manifest.get("metadata") or {}).items():
+            target = tmp / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding="utf-8")
+        tmp.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, directory)
+        log.info(
+            f"Materialized {name} from {self.directory} "
+            f"({len(manifest['files'])} files, {linked} linked)"
+        )
+        return True
+
+    def evict(self, name: str) -> None:
+        """Remove a stored version's directory; it is materialized again on use."""
+        if self.manifest(name) is None:
+            raise ValueError(f"{name} is not in {self}; evicting would lose it")
+        directory = source_data_path / name
+        if directory.exists():
+            shutil.rmtree(directory)
+        log.info(f"Evicted {directory}")
+
+    def remove(self, name: str) -> None:
+        """Drop a version's manifest (objects are freed by ``gc``)."""
+        self.manifest_path(name).unlink(missing_ok=True)
+
+    def gc(self) -> int:
+        """Delete objects no manifest refers to. Returns the bytes freed."""
+        referenced = {
+            digest
+            for name in self.versions()
+            for digest, _ in self.manifest(name)["files"].values()
+        }
+        freed = 0
+        if self.objects.exists():
+            for path in self.objects.glob("*/*"):
+                if path.parent.name + path.name not in referenced:
+                    freed += path.stat().st_size
+                    path.unlink()
+        log.info(f"Freed {freed / 1e6:.1f} MB from {self.directory}")
+        return freed
+
+    def stats(self) -> dict[str, Any]:
+        """Versions, objects, and logical vs stored bytes."""
+        logical, unique = 0, {}
+        for name in self.versions():
+            for digest, size in self.manifest(name)["files"].values():
+                logical += size
+                unique[digest] = size
+        stored = sum(unique.values())
+        return {
+            "versions": len(self.versions()),
+            "objects": len(unique),
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "saved_share": 1 - stored / logical if logical else 0.0,
+        }
+
+
+def store_version(directory: Path) -> None:
+    """Ingest a freshly extracted version directory if the store is used."""
+    if store_enabled() and Path(directory).is_dir():
+        SourceStore().ingest(directory)
+
+
+def materialize_version(directory: Path) -> bool:
+    """
+    Materialize a missing version directory from the store. Returns True
+    if it was materialized.
+    """
+    directory = Path(directory)
+    if directory.exists() or not store_enabled():
+        return False
+    return SourceStore().materialize(directory.name, directory)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.extract.source_store",
+        description="Content-addressed store of extracted source data.",
+    )
+    parser.add_argument(
+        "command", choices=["ingest", "materialize", "evict", "remove", "gc", "stats"]
+    )
+    parser.add_argument(
+        "names", nargs="*",
+        help="version directories in source_data (default for ingest: all)",
+    )
+    args = parser.parse_args()
+    store = SourceStore()
+    if args.command == "ingest":
+        names = args.names or sorted(
+            p.name for p in source_data_path.glob("*")
+            if p.is_dir() and not p.name.startswith(".")
+        )
+        for name in names:
+            store.ingest(source_data_path / name)
+    elif args.command == "materialize":
+        for name in args.names:
+            if not store.materialize(name, source_data_path / name):
+                raise SystemExit(f"{name} is not in {store}")
+    elif args.command in ("evict", "remove"):
+        for name in args.names:
+            getattr(store, args.command)(name)
+    elif args.command == "gc":
+        store.gc()
+    stats = store.stats()
+    print(
+        f"{store}: {stats['versions']} versions, {stats['objects']} objects, "
+        f"{stats['stored_bytes'] / 1e6:.1f} MB stored for "
+        f"{stats['logical_bytes'] / 1e6:.1f} MB of files "
+        f"({stats['saved_share']:.0%} saved)"
+    )
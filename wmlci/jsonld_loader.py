@@ -1,20 +1,21 @@
 """
 Functions common across datasets
+
+bw2io and the cleaning functions of ``wmlci.editImporter`` (which pull in
+bw2data, fedelemflowlist and pandas) are imported by the functions that use
+them, so locating and fetching source data stays cheap to import.
 """
 
 import zipfile
+from time import time
 
-from bw2io.importers.json_ld import JSONLDImporter
-from bw2io.importers.json_ld_lcia import JSONLDLCIAImporter
-
-from wmlci.settings import extractpath, paths, source_data_path
+from wmlci import settings
+from wmlci.settings import extractpath, source_data_path
 from wmlci.extract.extract_common import extract_source_data, jsonld_source_dir
+from wmlci.extract.http_client import DownloadError, default_client
+from wmlci.extract.integrity import verify_tree
 from wmlci.log import log
-from wmlci.editImporter import *
-from wmlci.errorLogging import *
-
-from esupy.remote import make_url_request
-from esupy.processed_data_mgmt import mkdir_if_missing
+from wmlci.trace import span
 
 
 def download_source_data_from_remote(fname):
@@ -26,30 +27,28 @@ def download_source_data_from_remote(fname):
     """
 
     status = False
-    base_url = f"{paths.remote_path}WMLCI/sourceData/"
+    base_url = f"{settings.paths.remote_path}WMLCI/sourceData/"
     url = base_url + fname
-    r = make_url_request(url)
-    if r is not None:
+    # set subdirectory
+    folder = source_data_path
+    folder.mkdir(parents=True, exist_ok=True)
+    try:
+        default_client().download(url, folder / fname)
+    except DownloadError as e:
+        log.error(f'{fname} could not be downloaded: {e}')
+    else:
         status = True
-        # set subdirectory
-        folder = source_data_path
-        mkdir_if_missing(folder)
-        file = folder / fname
-        with file.open('wb') as fi:
-            fi.write(r.content)
         log.info(f'{fname} downloaded from '
-                 f'{paths.remote_path}index.html?prefix=WMLCI/sourceData'
+                 f'{settings.paths.remote_path}index.html?prefix=WMLCI/sourceData'
                  f' and saved to {folder}')
 
     return status
 
 
-def load_JSONLD_sourceData(
-    fname, datatype="jsonld", bw_database_name="db", data_version=None
-):
+def obtain_source_data(fname, data_version=None):
     """
-    Load local JSON-LD source data. If missing locally, obtain it from the extract
-    yaml or EPA Data Commons.
+    Local JSON-LD directory of a source. If missing locally, obtain it from
+    the extract yaml or EPA Data Commons.
     """
     filepath = jsonld_source_dir(fname, version=data_version)
 
@@ -61,11 +60,32 @@ def load_JSONLD_sourceData(
             with zipfile.ZipFile(source_data_path / f"{fname}.zip", 'r') as zip_ref:
                 zip_ref.extractall(filepath)
             log.info(f"Unzipped {fname} to {source_data_path}")
+    return filepath
+
+
+def load_JSONLD_sourceData(
+    fname, datatype="jsonld", bw_database_name="db", data_version=None
+):
+    """
+    Load local JSON-LD source data. If missing locally, obtain it from the extract
+    yaml or EPA Data Commons (``obtain_source_data``). Data with recorded hashes
+    are verified first (see ``wmlci.extract.integrity``).
+    """
+    filepath = obtain_source_data(fname, data_version=data_version)
+
+    # API downloads unzip into their version directory, next to the metadata
+    root = filepath if filepath.parent == source_data_path else filepath.parent
+    with span("verify source data"):
+        verify_tree(root)
 
     if datatype == 'jsonld':
+        from bw2io.importers.json_ld import JSONLDImporter
+
         log.info(f"Loading {filepath}")
         jsonld = JSONLDImporter(filepath, bw_database_name)
     elif datatype == 'jsonld_lcia':
+        from bw2io.importers.json_ld_lcia import JSONLDLCIAImporter
+
         log.info(f"Loading {filepath}")
         jsonld = JSONLDLCIAImporter(filepath)
     else:
@@ -82,25 +102,73 @@ def clean_JSONLD_sourceData(jsonld, config):
     ``config`` can include global/process parameter overrides for amountFormula
     re-calc so exchange amounts are not static openLCA export values.
     """
+    from wmlci.editImporter import (
+        apply_carbon_storage_credit,
+        apply_opposite_direction_approach,
+        convert_param_list_to_dict,
+        convert_uncertainty_to_stats_arrays,
+        map_to_fedelemflowlist_UUIDs,
+        recalculate_amounts_from_formulas,
+        remove_impact_free_objects,
+        remove_process_allocation_factors,
+        replace_exchange_locations,
+        replace_process_location,
+        reset_location_dict,
+    )
+
     # map UUIDs to the federal elementary flowlist UUIDs
-    jsonld = map_to_fedelemflowlist_UUIDs(jsonld, sourcelistname="WARM")
+    with span("map_to_fedelemflowlist_UUIDs", cat="clean"):
+        jsonld = map_to_fedelemflowlist_UUIDs(jsonld, sourcelistname="WARM")
     # Recompute amounts from amountFormula
-    jsonld = recalculate_amounts_from_formulas(jsonld, config)
+    with span("recalculate_amounts_from_formulas", cat="clean"):
+        jsonld = recalculate_amounts_from_formulas(jsonld, config)
     # Carbon storage: flip positive c_storage to emission-to-air CO2 credit
-    jsonld = apply_carbon_storage_credit(jsonld)
+    with span("apply_carbon_storage_credit", cat="clean"):
+        jsonld = apply_carbon_storage_credit(jsonld)
     # Apply the Opposite Direction Approach for waste management
-    jsonld = apply_opposite_direction_approach(jsonld)
+    with span("apply_opposite_direction_approach", cat="clean"):
+        jsonld = apply_opposite_direction_approach(jsonld)
     # Replace location dictionary with a single entry for the US
-    jsonld = reset_location_dict(jsonld)
+    with span("reset_location_dict", cat="clean"):
+        jsonld = reset_location_dict(jsonld)
     # Set all process locations to US
-    jsonld = replace_process_location(jsonld)
+    with span("replace_process_location", cat="clean"):
+        jsonld = replace_process_location(jsonld)
     # Set all exchange locations to US
-    jsonld = replace_exchange_locations(jsonld)
+    with span("replace_exchange_locations", cat="clean"):
+        jsonld = replace_exchange_locations(jsonld)
     # drop allocation factors of 1 due to missing exchange info causing error
-    jsonld = remove_process_allocation_factors(jsonld)
+    with span("remove_process_allocation_factors", cat="clean"):
+        jsonld = remove_process_allocation_factors(jsonld)
     # Remove exchanges and processes with no impacts
-    remove_impact_free_objects(jsonld)
+    with span("remove_impact_free_objects", cat="clean"):
+        remove_impact_free_objects(jsonld)
     # Convert parameters list to dictionary
-    jsonld = convert_param_list_to_dict(jsonld)
+    with span("convert_param_list_to_dict", cat="clean"):
+        jsonld = convert_param_list_to_dict(jsonld)
+    # Carry openLCA exchange uncertainty over as stats_arrays fields
+    with span("convert_uncertainty_to_stats_arrays", cat="clean"):
+        jsonld = convert_uncertainty_to_stats_arrays(jsonld)
 
     return jsonld
+
+
+def strategy_name(strategy):
+    """Name of a bw2io strategy function (unwrapping ``functools.partial``)."""
+    return getattr(strategy, "__name__", None) or strategy.func.__name__
+
+
+def apply_strategies(importer, strategies=None):
+    """
+    Apply bw2io strategies one at a time so each one is traced and timed.
+    Equivalent to ``importer.apply_strategies(strategies)``.
+    """
+    strategies = importer.strategies if strategies is None else strategies
+    start = time()
+    for strategy in strategies:
+        with span(strategy_name(strategy), cat="strategy"):
+            importer.apply_strategy(strategy, verbose=False)
+    log.info(
+        f"Applied {len(strategies)} strategies in {time() - start:.2f} seconds"
+    )
+    return importer
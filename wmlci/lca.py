@@ -4,18 +4,33 @@ Run Brightway LCA using method YAML configurations.
 
 from __future__ import annotations
 
+from functools import partial
+from pathlib import Path
 from typing import Any
 
 import bw2data as bd
 
+from wmlci.background import BackgroundStore
+from wmlci.bulk_writer import write_database_bulk
 from wmlci.disaggregation import split_multi_product_processes
 from wmlci.editImporter import (
     convert_lcia_param_list_to_dict,
     map_lcia_to_fedelemflowlist_UUIDs,
 )
 from wmlci.errorLogging import check_for_errors_in_jsonld_import
-from wmlci.jsonld_loader import clean_JSONLD_sourceData, load_JSONLD_sourceData
+from wmlci.extract.prefetch import DEFAULT_WORKERS, prefetch_sources
+from wmlci.jsonld_loader import (
+    apply_strategies,
+    clean_JSONLD_sourceData,
+    load_JSONLD_sourceData,
+)
+from wmlci.linking import link_technosphere_updates
 from wmlci.log import log
+from wmlci.matrices import (
+    build_matrices,
+    calculate_matrix_results,
+    resolve_matrix_processes,
+)
 from wmlci.method_config import load_method_config
 from wmlci.openlca import (
     calculate_lca_results,
@@ -23,77 +38,205 @@ from wmlci.openlca import (
     resolve_processes,
     write_lca_outputs,
 )
+from wmlci.snapshot import create_snapshot, restore_snapshot_for_config
+from wmlci.strategies import select_strategies
+from wmlci.trace import span, trace_run
+from wmlci.upgrade import node_hashes, save_node_hashes
 
 
-def run_bw_lca(method_name: str) -> dict[str, Any]:
+def prepare_inventory(config: dict[str, Any]):
     """
-    Run a full Brightway LCA workflow from a method YAML config.
-
-    Parameters
-    ----------
-    method_name
-        Stem of a file in ``wmlci/methods/`` (e.g. ``v16``, ``wmlci_pilot``).
-
-    Returns
-    -------
-    dict
-        config, summary and detail DataFrames, output paths, and scenarios run.
+    Load the inventory JSON-LD for a method config and apply the WMLCI
+    splitting, error checks and cleaning. Returns the JSONLDImporter, ready
+    for bw2io strategies.
     """
-    config = load_method_config(method_name)
-    log.info(
-        f"Running LCA method: {config.get('method_name', method_name)}"
-    )
-
-    bd.projects.set_current(config["bw_project_name"])
-
-    db_name = config["inventory_database"]
-    source = config["inventory_source"]
-    jsonld = load_JSONLD_sourceData(
-        source,
+    with span("load inventory"):
+        jsonld = load_JSONLD_sourceData(
+            config["inventory_source"],
             datatype="jsonld",
-            bw_database_name=db_name,
+            bw_database_name=config["inventory_database"],
             data_version=config.get("inventory_source_version"),
-    )
+        )
     # split multi-product processes so the technosphere matrix is square
-    jsonld = split_multi_product_processes(jsonld)
+    with span("split multi-product processes"):
+        jsonld = split_multi_product_processes(jsonld)
     # check for errors in imported data - these checks do not fix the errors
-    check_for_errors_in_jsonld_import(jsonld)
+    with span("check import errors"):
+        check_for_errors_in_jsonld_import(jsonld)
     # apply common clean up procedures
-    jsonld = clean_JSONLD_sourceData(jsonld, config)
+    with span("clean inventory"):
+        jsonld = clean_JSONLD_sourceData(jsonld, config)
+    # relink scenario exchanges to providers in other FLCAC databases
+    with span("link technosphere updates"):
+        jsonld = link_technosphere_updates(jsonld, config)
     # check for errors again
     log.info("Checking errors are fixed")
-    check_for_errors_in_jsonld_import(jsonld)
+    with span("check import errors"):
+        check_for_errors_in_jsonld_import(jsonld)
+    return jsonld
+
+
+def link_inventory(jsonld, config: dict[str, Any]):
+    """
+    Apply bw2io strategies to a prepared inventory and merge its biosphere
+    flows, ready to write.
+
+    ``config["strategy_set"]`` selects the WMLCI strategy set (default) or
+    bw2io's full JSON-LD list ('bw2io'), see ``wmlci.strategies``.
+    """
     # fix issues when openLCA and brightway have to talk by manipulating data sets
-    jsonld.apply_strategies()
+    with span("apply strategies"):
+        apply_strategies(
+            jsonld,
+            select_strategies(jsonld, config.get("strategy_set", "wmlci")),
+        )
     # merge biosphere flows
     # jsonld.write_separate_biosphere_database()
-    jsonld.merge_biosphere_flows()
+    with span("merge biosphere flows"):
+        jsonld.merge_biosphere_flows()
     # checking if everything worked out with strategies and linking
     jsonld.statistics()
     # jsonld.write_excel(only_unlinked=False)  # set to True if errors
-    # save the database
-    jsonld.write_database()
+    return jsonld
 
-    # LCIA methods import
-    lcia_db_name = config["lcia_db_name"]
-    jsonldlcia = load_JSONLD_sourceData(
-        config["lcia_input"],
-        datatype="jsonld_lcia",
-        bw_database_name=lcia_db_name,
-    data_version=config.get("lcia_input_version"),)
+
+def save_inventory(jsonld, config: dict[str, Any]):
+    """
+    Write a linked inventory and save its node hashes for incremental
+    upgrades (``wmlci.upgrade``).
+
+    ``config["database_writer"]: bulk`` writes with
+    ``wmlci.bulk_writer.write_database_bulk`` instead of bw2io.
+    """
+    hashes = node_hashes(jsonld.data)
+    with span("write database"):
+        if config.get("database_writer") == "bulk":
+            write_database_bulk(jsonld)
+        else:
+            jsonld.write_database()
+    save_node_hashes(jsonld.db_name, hashes, config)
+    return jsonld
+
+
+def write_inventory(jsonld, config: dict[str, Any]):
+    """
+    Apply bw2io strategies to a prepared inventory and write the database
+    (``link_inventory`` and ``save_inventory``).
+    """
+    link_inventory(jsonld, config)
+    return save_inventory(jsonld, config)
+
+
+def prepare_lcia(config: dict[str, Any]):
+    """
+    Load the LCIA JSON-LD for a method config, apply strategies and harmonize
+    characterization factor flows to FEDEFL.
+    """
+    with span("load LCIA"):
+        jsonldlcia = load_JSONLD_sourceData(
+            config["lcia_input"],
+            datatype="jsonld_lcia",
+            bw_database_name=config["lcia_db_name"],
+            data_version=config.get("lcia_input_version"),
+        )
     # convert parameter lists to dicts
     jsonldlcia = convert_lcia_param_list_to_dict(jsonldlcia)
-    # prepare LCIA - apply strategies, harmonize CF flows to FEDEFL,
-    # link to inventory by UUID
-    jsonldlcia.apply_strategies()
-    jsonldlcia = map_lcia_to_fedelemflowlist_UUIDs(
-        jsonldlcia, sourcelistname="IPCC"
-    )
-    jsonldlcia.match_biosphere_by_id(config["inventory_database"])
-    # drop the CFs that do not match a flow
-    jsonldlcia.drop_unlinked(verbose=True)
-    jsonldlcia.statistics()
-    jsonldlcia.write_methods(overwrite=True)
+    # prepare LCIA - apply strategies, harmonize CF flows to FEDEFL
+    with span("apply LCIA strategies"):
+        apply_strategies(jsonldlcia)
+    with span("map LCIA flows to FEDEFL"):
+        jsonldlcia = map_lcia_to_fedelemflowlist_UUIDs(
+            jsonldlcia, sourcelistname="IPCC"
+        )
+    return jsonldlcia
+
+
+def write_lcia_methods(jsonldlcia, config: dict[str, Any]):
+    """Link prepared LCIA methods to the inventory by UUID and write them."""
+    with span("write LCIA methods"):
+        jsonldlcia.match_biosphere_by_id(config["inventory_database"])
+        # drop the CFs that do not match a flow
+        jsonldlcia.drop_unlinked(verbose=True)
+        jsonldlcia.statistics()
+        jsonldlcia.write_methods(overwrite=True)
+    return jsonldlcia
+
+
+def run_bw_lca(
+    method_name: str,
+    trace: str | Path | None = None,
+    snapshot: bool | None = None,
+    engine: str | None = None,
+) -> dict[str, Any]:
+    """
+    Run a full Brightway LCA workflow from a method YAML config.
+
+    Parameters
+    ----------
+    method_name
+        Stem of a file in ``wmlci/methods/`` (e.g. ``v16``, ``wmlci_pilot``).
+    trace
+        Optional path for a Chrome trace event JSON of the run (see
+        ``wmlci.trace``). Defaults to the ``WMLCI_TRACE`` environment variable.
+    snapshot
+        Restore the project from a snapshot of identical sources instead of
+        re-importing, and save one after a fresh import (see
+        ``wmlci.snapshot``). Defaults to ``snapshot`` in the method YAML.
+    engine
+        'brightway' (default) imports into a Brightway project; 'matrix'
+        builds sparse matrices straight from the cleaned JSON-LD and writes
+        no project (see ``wmlci.matrices``). Defaults to ``engine`` in the
+        method YAML.
+
+    Returns
+    -------
+    dict
+        config, summary and detail DataFrames, output paths, and scenarios run.
+    """
+    with trace_run(trace):
+        with span("run_bw_lca", method=method_name):
+            return _run_bw_lca(method_name, snapshot, engine)
+
+
+def fetch_sources(config: dict[str, Any]) -> None:
+    """
+    Download the missing sources of a method config concurrently before
+    importing (see ``wmlci.extract.prefetch``).
+    """
+    with span("fetch sources"):
+        prefetch_sources(config, config.get("prefetch_workers", DEFAULT_WORKERS))
+
+
+def import_project(config: dict[str, Any]) -> None:
+    """Import the inventory and LCIA methods into the current project."""
+    fetch_sources(config)
+    jsonld = prepare_inventory(config)
+    write_inventory(jsonld, config)
+
+    # LCIA methods import
+    jsonldlcia = prepare_lcia(config)
+    write_lcia_methods(jsonldlcia, config)
+
+
+def prepare_project(config: dict[str, Any], snapshot: bool | None = None) -> list:
+    """
+    Restore or import the Brightway project for a method config and check
+    the LCIA method is present; return ``resolve_processes`` for the config.
+    """
+    if snapshot is None:
+        snapshot = bool(config.get("snapshot", False))
+
+    if snapshot:
+        # the snapshot key includes the hashes of the downloaded sources
+        fetch_sources(config)
+        with span("restore snapshot"):
+            restored = restore_snapshot_for_config(config)
+    if not snapshot or not restored:
+        bd.projects.set_current(config["bw_project_name"])
+        import_project(config)
+        if snapshot:
+            with span("create snapshot"):
+                create_snapshot(config)
 
     db = bd.Database(config["inventory_database"])
     log.info(
@@ -108,7 +251,40 @@ def run_bw_lca(method_name: str) -> dict[str, Any]:
             f"LCIA method {method} not in project. Available: {available[:10]}"
         )
 
-    processes = resolve_processes(db, config)
+    with span("resolve processes"):
+        return resolve_processes(db, config)
+
+
+def _run_bw_lca(
+    method_name: str, snapshot: bool | None = None, engine: str | None = None
+) -> dict[str, Any]:
+    config = load_method_config(method_name)
+    log.info(
+        f"Running LCA method: {config.get('method_name', method_name)}"
+    )
+    engine = engine or config.get("engine", "brightway")
+    if engine == "matrix":
+        fetch_sources(config)
+        jsonld = prepare_inventory(config)
+        jsonldlcia = prepare_lcia(config)
+        with span("build matrices"):
+            matrices = build_matrices(
+                jsonld, jsonldlcia, tuple(config["lcia_method"])
+            )
+        with span("resolve processes"):
+            processes = resolve_matrix_processes(matrices, config)
+        calculate = partial(
+            calculate_matrix_results, matrices,
+            store=BackgroundStore.from_config(config),
+        )
+    elif engine == "brightway":
+        processes = prepare_project(config, snapshot)
+        calculate = partial(
+            calculate_lca_results, bd.Database(config["inventory_database"])
+        )
+    else:
+        raise ValueError(f"Unknown engine '{engine}', use 'brightway' or 'matrix'")
+
     scenario_lines = []
     for act, product, process_settings in processes:
         fu_label = functional_unit_label(
@@ -119,8 +295,10 @@ def run_bw_lca(method_name: str) -> dict[str, Any]:
         f"Assessing {len(processes)} scenarios:\n" + "\n".join(scenario_lines)
     )
 
-    results_df, detail_df = calculate_lca_results(db, processes, config)
-    paths = write_lca_outputs(results_df, detail_df, config)
+    with span("calculate LCA results"):
+        results_df, detail_df = calculate(processes, config)
+    with span("write outputs"):
+        paths = write_lca_outputs(results_df, detail_df, config)
 
     print("\nLCA results (all scenarios):")
     print(results_df.to_string(index=False))
@@ -0,0 +1,434 @@
+"""
+Relink foreground exchanges to providers in other FLCAC databases.
+
+A scenario process can name a file of ``wmlci/technosphere_updates/`` in its
+``technosphere_updates`` setting::
+
+    technosphere_exchanges:
+      "Transport of MSW, by truck":        # input flow or provider name
+        data_source: uslci                 # extract yaml / source name
+        data_version: 1.2026-06.0
+        product: "Transport; single unit truck, short-haul; diesel powered"
+        process: "Transport, single unit truck; short-haul; diesel powered"
+        location: US                       # optional
+        unit: t*km                         # optional
+    technosphere_exchange_drops:
+      - "Transport, in product manufacturing from PET, using 100% virgin inputs"
+
+``link_technosphere_updates`` prepares each referenced source once per run
+(``wmlci.lca.prepare_inventory``), resolves providers through a persistent
+``ProviderIndex`` of that source version, copies the providers and their
+upstream supply chain into the inventory, and relinks the matching input
+exchanges of the scenario process in one pass over its exchanges.
+
+Provider indexes hash normalized (process, product, location, unit) keys and
+are written to ``wmlci/data/link_index/`` with a fingerprint of the source's
+process ``@id``s, so resolving a provider in a 100k-process database is a
+dictionary lookup and a regenerated source is reindexed.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from wmlci.extract.integrity import write_text_atomic
+from wmlci.log import log
+from wmlci.settings import MODULEPATH, datapath
+
+TECHNOSPHERE_UPDATES_DIR = MODULEPATH / "technosphere_updates"
+link_index_path = datapath / "link_index"
+
+# key fields, most to least specific; lookups use the fields given
+_KEY_FIELDS = ("process", "product", "location", "unit")
+
+# prepared sources of this run, by (source, version)
+_SOURCES: dict[tuple[str, str | None], Any] = {}
+
+
+def load_technosphere_updates(name: str) -> dict[str, Any]:
+    """Load ``wmlci/technosphere_updates/{name}.yaml``."""
+    path = TECHNOSPHERE_UPDATES_DIR / f"{name}.yaml"
+    if not path.exists():
+        available = sorted(p.stem for p in TECHNOSPHERE_UPDATES_DIR.glob("*.yaml"))
+        raise FileNotFoundError(
+            f"Technosphere updates '{name}' not found at {path}. "
+            f"Available: {available}"
+        )
+    with path.open(encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def configured_updates(config: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Technosphere updates by scenario process name."""
+    return {
+        name: load_technosphere_updates(settings["technosphere_updates"])
+        for name, settings in (config.get("processes") or {}).items()
+        if (settings or {}).get("technosphere_updates")
+    }
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+def _key(**fields: Any) -> str:
+    """Hash of the given (non-empty) key fields."""
+    text = "|".join(
+        f"{field}={_normalize(fields[field])}"
+        for field in _KEY_FIELDS
+        if fields.get(field)
+    )
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def _reference_exchange(process: dict[str, Any]) -> dict[str, Any] | None:
+    for exc in process.get("exchanges", []):
+        if exc.get("isQuantitativeReference"):
+            return exc
+    return None
+
+
+class ProviderIndex:
+    """
+    Hash index of the providers of one source database version.
+
+    ``entries`` maps hashed keys over every combination of process name,
+    product name, location and unit (in that order of specificity) to
+    process ``@id`` lists; ``providers`` maps product flow ``@id`` to the
+    processes supplying it.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        version: str | None,
+        entries: dict[str, list[str]],
+        providers: dict[str, list[str]],
+        fingerprint: str | None = None,
+    ) -> None:
+        self.source = source
+        self.version = version
+        self.entries = entries
+        self.providers = providers
+        self.fingerprint = fingerprint
+
+    def __repr__(self) -> str:
+        return (
+            f"ProviderIndex({self.source!r}, {self.version!r}, "
+            f"{len(self.providers)} products)"
+        )
+
+    @staticmethod
+    def path_for(source: str, version: str | None) -> Path:
+        from bw2data.utils import safe_filename
+
+        name = safe_filename(f"{source}-{version or 'unversioned'}", add_hash=False)
+        return link_index_path / f"{name}.json"
+
+    @staticmethod
+    def fingerprint_of(data: dict[str, Any]) -> str:
+        """Hash of the process ``@id`` set of a loaded source."""
+        digest = hashlib.sha1()
+        for code in sorted(data["processes"]):
+            digest.update(code.encode("utf-8") + b"\n")
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, source: str, version: str | None, data: dict[str, Any]) -> ProviderIndex:
+        """Index the processes of a loaded JSON-LD source."""
+        entries: dict[str, list[str]] = defaultdict(list)
+        providers: dict[str, list[str]] = defaultdict(list)
+        for code, process in data["processes"].items():
+            reference = _reference_exchange(process)
+            if reference is None:
+                continue
+            providers[reference["flow"]["@id"]].append(code)
+            fields = {
+                "process": process["name"],
+                "product": reference["flow"].get("name"),
+                "location": (process.get("location") or {}).get("code")
+                or (process.get("location") or {}).get("name"),
+                "unit": (reference.get("unit") or {}).get("name"),
+            }
+            keys = set()
+            for mask in range(1, 2 ** len(_KEY_FIELDS)):
+                subset = {
+                    f: fields[f] for i, f in enumerate(_KEY_FIELDS)
+                    if mask >> i & 1 and fields[f]
+                }
+                if subset:
+                    keys.add(_key(**subset))
+            for key in keys:
+                entries[key].append(code)
+        return cls(
+            source, version, dict(entries), dict(providers), cls.fingerprint_of(data)
+        )
+
+    @classmethod
+    def load_or_build(
+        cls, source: str, version: str | None, data: dict[str, Any]
+    ) -> ProviderIndex:
+        """
+        The saved index of a source version, built and saved if missing or
+        if the source's processes changed since it was saved.
+        """
+        path = cls.path_for(source, version)
+        fingerprint = cls.fingerprint_of(data)
+        if path.exists():
+            saved = json.loads(path.read_text(encoding="utf-8"))
+            if saved.get("fingerprint") == fingerprint:
+                return cls(
+                    source, version, saved["entries"], saved["providers"], fingerprint
+                )
+            log.info(f"Processes of {source} {version} changed; rebuilding {path}")
+        index = cls.build(source, version, data)
+        link_index_path.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(
+            path,
+            json.dumps({
+                "source": source,
+                "version": version,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "fingerprint": index.fingerprint,
+                "entries": index.entries,
+                "providers": index.providers,
+            }),
+        )
+        log.info(f"Saved provider index of {source} {version} to {path}")
+        return index
+
+    def lookup(self, **fields: Any) -> list[str]:
+        """Process ``@id``s matching the given process, product, location and unit."""
+        return self.entries.get(_key(**fields), [])
+
+
+def prepared_source(source: str, version: str | None):
+    """Load and clean a linked source once per run (see ``prepare_inventory``)."""
+    if (source, version) not in _SOURCES:
+        from wmlci.lca import prepare_inventory
+
+        _SOURCES[(source, version)] = prepare_inventory({
+            "inventory_source": source,
+            "inventory_source_version": version,
+            "inventory_database": source,
+        })
+    return _SOURCES[(source, version)]
+
+
+def resolve_provider(index: ProviderIndex, spec: dict[str, Any]) -> str:
+    """``@id`` of the provider a technosphere update points to."""
+    fields = {f: spec.get(f) for f in _KEY_FIELDS}
+    matches = index.lookup(**fields)
+    if not matches:
+        raise ValueError(
+            f"No provider in {index.source} {index.version} for "
+            f"{ {k: v for k, v in fields.items() if v} }"
+        )
+    if len(matches) > 1:
+        log.warning(
+            f"{len(matches)} providers in {index.source} match {fields}; using "
+            "the first (add location or unit to the update to choose)"
+        )
+    return matches[0]
+
+
+def upstream_processes(
+    data: dict[str, Any], index: ProviderIndex, roots: list[str]
+) -> list[str]:
+    """``roots`` and every process in their supply chains."""
+    seen, queue = set(roots), list(roots)
+    while queue:
+        process = data["processes"][queue.pop()]
+        for exc in process.get("exchanges", []):
+            if not exc.get("isInput") or exc["flow"].get("flowType") == "ELEMENTARY_FLOW":
+                continue
+            provider = (exc.get("defaultProvider") or {}).get("@id")
+            candidates = (
+                [provider] if provider in data["processes"]
+                else index.providers.get(exc["flow"]["@id"], [])[:1]
+            )
+            for code in candidates:
+                if code not in seen:
+                    seen.add(code)
+                    queue.append(code)
+    return sorted(seen)
+
+
+def merge_processes(
+    jsonld, source_data: dict[str, Any], codes: list[str], namespace: str
+) -> int:
+    """
+    Copy processes, the flows they exchange and all supporting entities of
+    a source into ``jsonld``; entities already present are kept.
+
+    Inputs link to providers by product flow, so a copied process whose
+    product the inventory already supplies gets a product flow of its own
+    (``make_uuid(namespace, flow @id)``) and the copied supply chain is
+    rewritten to use it. Returns the number of processes added.
+    """
+    from esupy.util import make_uuid
+
+    data = jsonld.data
+    supplied = set()
+    for process in data["processes"].values():
+        reference = _reference_exchange(process)
+        if reference is not None:
+            supplied.add(reference["flow"]["@id"])
+    added = [code for code in codes if code not in data["processes"]]
+    renamed = {}
+    for code in added:
+        reference = _reference_exchange(source_data["processes"][code])
+        if reference is not None and reference["flow"]["@id"] in supplied:
+            flow_id = reference["flow"]["@id"]
+            renamed[flow_id] = make_uuid(namespace, flow_id)
+
+    flows = set()
+    for code in added:
+        process = copy.deepcopy(source_data["processes"][code])
+        for exc in process.get("exchanges", []):
+            flow_id = exc["flow"]["@id"]
+            exc["flow"]["@id"] = renamed.get(flow_id, flow_id)
+            flows.add(flow_id)
+        data["processes"][code] = process
+    new_flows = []
+    for flow_id in sorted(flows):
+        code = renamed.get(flow_id, flow_id)
+        if flow_id in source_data["flows"] and code not in data["flows"]:
+            flow = copy.deepcopy(source_data["flows"][flow_id])
+            flow["@id"] = code
+            data["flows"][code] = flow
+            new_flows.append(flow)
+    for category, objects in source_data.items():
+        if category in ("processes", "flows") or not isinstance(objects, dict):
+            continue
+        target = data.setdefault(category, {})
+        for code, obj in objects.items():
+            target.setdefault(code, copy.deepcopy(obj))
+    # importer node lists are built from flows at load time; the strategy
+    # list holds a reference to jsonld.products, so extend in place
+    new_flows = {"flows": {f["@id"]: f for f in new_flows}}
+    jsonld.products.extend(jsonld.flows_as_products(new_flows))
+    jsonld.biosphere_database.extend(
+        jsonld.flows_as_biosphere_database(new_flows, jsonld.db_name)
+    )
+    if renamed:
+        log.info(
+            f"{len(renamed)} linked products already supplied in "
+            f"{jsonld.db_name} use {namespace} product flows"
+        )
+    return len(added)
+
+
+def relink_exchanges(
+    process: dict[str, Any],
+    replacements: dict[str, dict[str, Any]],
+    drops: list[str],
+) -> tuple[set[str], int]:
+    """
+    Point input exchanges named in ``replacements`` (by flow or provider
+    name) to new providers and remove those named in ``drops``.
+
+    ``replacements`` maps names to the provider process. Returns the names
+    that matched and the number of exchanges dropped.
+    """
+    replace = {_normalize(name): spec for name, spec in replacements.items()}
+    drop = {_normalize(name) for name in drops}
+    matched, kept, dropped = set(), [], 0
+    for exc in process["exchanges"]:
+        names = {
+            _normalize(exc["flow"].get("name", "")),
+            _normalize((exc.get("defaultProvider") or {}).get("name", "")),
+        }
+        if not exc.get("isInput") or exc.get("isQuantitativeReference"):
+            kept.append(exc)
+            continue
+        if names & drop:
+            dropped += 1
+            continue
+        hit = next((n for n in names if n in replace), None)
+        if hit is not None:
+            provider = replace[hit]
+            reference = _reference_exchange(provider)
+            if exc.get("flowProperty", {}).get("@id") != reference["flowProperty"]["@id"]:
+                raise ValueError(
+                    f"Cannot relink '{exc['flow'].get('name')}' in "
+                    f"'{process['name']}' to '{provider['name']}': flow property "
+                    f"{exc.get('flowProperty', {}).get('name')} differs from "
+                    f"{reference['flowProperty']['name']}"
+                )
+            exc["flow"] = copy.deepcopy(reference["flow"])
+            exc["defaultProvider"] = {
+                "@type": "Process",
+                "@id": provider["@id"],
+                "name": provider["name"],
+                "category": provider.get("category"),
+                "processType": provider.get("processType"),
+                "flowType": reference["flow"].get("flowType"),
+            }
+            matched.add(hit)
+        kept.append(exc)
+    process["exchanges"] = kept
+    return matched, dropped
+
+
+def link_technosphere_updates(jsonld, config: dict[str, Any]):
+    """
+    Apply the ``technosphere_updates`` of the configured scenario processes
+    to a prepared inventory. Returns the importer.
+    """
+    updates = configured_updates(config)
+    if not updates:
+        return jsonld
+
+    by_name = {p["name"]: p for p in jsonld.data["processes"].values()}
+    missing = sorted(set(updates) - set(by_name))
+    if missing:
+        raise ValueError(f"Processes with technosphere updates not in inventory: {missing}")
+
+    # providers per source version, resolved through its index
+    by_source: dict[tuple[str, str | None], dict[str, dict[str, Any]]] = defaultdict(dict)
+    for name, update in updates.items():
+        for exchange, spec in (update.get("technosphere_exchanges") or {}).items():
+            by_source[(spec["data_source"], spec.get("data_version"))][
+                f"{name}\n{exchange}"
+            ] = spec
+    providers: dict[str, dict[str, Any]] = {}
+    for (source, version), specs in by_source.items():
+        source_jsonld = prepared_source(source, version)
+        index = ProviderIndex.load_or_build(source, version, source_jsonld.data)
+        roots = {key: resolve_provider(index, spec) for key, spec in specs.items()}
+        codes = upstream_processes(source_jsonld.data, index, sorted(set(roots.values())))
+        added = merge_processes(
+            jsonld, source_jsonld.data, codes, f"{source} {version}"
+        )
+        log.info(
+            f"Linked {len(set(roots.values()))} providers from {source} {version} "
+            f"({added} processes added with their supply chains)"
+        )
+        providers.update(
+            (key, jsonld.data["processes"][code]) for key, code in roots.items()
+        )
+
+    for name, update in updates.items():
+        replacements = {
+            exchange: providers[f"{name}\n{exchange}"]
+            for exchange in (update.get("technosphere_exchanges") or {})
+        }
+        matched, dropped = relink_exchanges(
+            by_name[name], replacements, update.get("technosphere_exchange_drops") or []
+        )
+        unmatched = sorted(set(map(_normalize, replacements)) - matched)
+        if unmatched:
+            log.warning(f"No input exchanges of '{name}' named {unmatched}")
+        log.info(
+            f"Relinked {len(matched)} and dropped {dropped} exchanges of '{name}'"
+        )
+    return jsonld
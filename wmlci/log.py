@@ -1,7 +1,7 @@
 import logging
+import os
 import shutil
 import sys
-from esupy.processed_data_mgmt import mkdir_if_missing
 from wmlci.settings import logoutputpath
 
 try:
@@ -35,8 +35,17 @@ except ModuleNotFoundError:
 file_formatter = logging.Formatter('%(asctime)s %(levelname)-8s %(message)s',
                                    datefmt='%Y-%m-%d %H:%M:%S')
 
+class LogFileHandler(logging.FileHandler):
+    """File handler that creates the log directory when it opens the file."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def get_log_file_handler(name='wmlci.log', level=logging.INFO):
-    handler = logging.FileHandler(logoutputpath / name, mode='w', encoding='utf-8')
+    # delay: the file is opened (and truncated) on the first record, not on import
+    handler = LogFileHandler(logoutputpath / name, mode='w', encoding='utf-8',
+                             delay=True)
     handler.setLevel(level)
     handler.setFormatter(file_formatter)
     return handler
@@ -74,10 +83,11 @@ def reset_log_file(filename, _meta):
                     f'{"_" + _meta.git_hash if _meta.git_hash else ""}'
                     f'.log')
     # create log directory if missing
-    mkdir_if_missing(logoutputpath)
+    logoutputpath.mkdir(parents=True, exist_ok=True)
     # rename the standard log file name (os.rename throws error if file
-    # already exists)
-    shutil.copy(log_file, new_log_name)
+    # already exists); the file only exists once something was logged
+    if log_file.exists():
+        shutil.copy(log_file, new_log_name)
 
     # Reset log file
     for h in log.handlers:
@@ -0,0 +1,569 @@
+"""
+Direct JSON-LD to sparse matrix path for ephemeral LCA runs.
+
+``build_matrices`` builds the technosphere (A) and biosphere (B) matrices
+and the characterization vector (c) straight from a cleaned JSONLDImporter
+and the prepared LCIA importer, skipping bw2io strategies, the Brightway
+database write and datapackage processing. The construction mirrors what
+the Brightway path produces from the same data:
+
+- exchange amounts are converted to the flow reference unit;
+- elementary flows are biosphere entries, inputs are technosphere entries
+  (negative), outputs and avoided products are production entries;
+- technosphere and production entries link to the product flow nodes of
+  ``jsonld.products``, so rows are products and columns are processes;
+- duplicate entries are summed.
+
+``calculate_matrix_results`` returns the same summary and detail tables as
+``wmlci.openlca.calculate_lca_results``; ``check_matrix_parity`` compares
+both paths for a method config.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from bw2io.units import normalize_units as normalize_units_function
+from scipy import sparse
+
+from wmlci.background import BackgroundStore
+from wmlci.jsonld_loader import strategy_name
+from wmlci.log import log
+from wmlci.openlca import (
+    DETAIL_COLUMNS,
+    contribution_rows,
+    functional_unit_label,
+    scenario_summary,
+)
+from wmlci.solvers import BlockTriangularFactorization, Factorization, factorize
+from wmlci.strategies import CONDITIONAL_STRATEGIES
+from wmlci.trace import span
+
+
+class InventoryMatrices:
+    """
+    Sparse A, B and c for one inventory and LCIA method.
+
+    Attributes
+    ----------
+    technosphere : scipy.sparse.csc_matrix
+        Products x processes.
+    biosphere : scipy.sparse.csr_matrix
+        Elementary flows x processes.
+    characterization : np.ndarray
+        Characterization factor of each biosphere row.
+    technosphere_coo, biosphere_coo : tuple of np.ndarray
+        ``(rows, cols, values)`` of every exchange entry before duplicates
+        are summed; ``matrix_from_values`` rebuilds a matrix from new values.
+    entries : dict
+        ``(process @id, exchange position)`` to ``(matrix, entry index)``
+        for each exchange that is a matrix entry.
+    products, processes, flows : dict
+        Flow or process ``@id`` to row/column index.
+    process_meta : dict
+        Process ``@id`` to name, location and reference-product metadata
+        (the fields of ``wmlci.openlca.build_process_meta``).
+    """
+
+    def __init__(
+        self,
+        technosphere_coo: tuple[np.ndarray, np.ndarray, np.ndarray],
+        biosphere_coo: tuple[np.ndarray, np.ndarray, np.ndarray],
+        characterization: np.ndarray,
+        products: dict[str, int],
+        processes: dict[str, int],
+        flows: dict[str, int],
+        process_meta: dict[str, dict[str, Any]],
+        product_names: dict[str, str],
+        consumed: set[str],
+        method: tuple,
+        entries: dict[tuple[str, int], tuple[str, int]],
+    ) -> None:
+        self.technosphere_coo = technosphere_coo
+        self.biosphere_coo = biosphere_coo
+        self.characterization = characterization
+        self.products = products
+        self.processes = processes
+        self.flows = flows
+        self.process_meta = process_meta
+        self.product_names = product_names
+        self.consumed = consumed
+        self.method = method
+        self.entries = entries
+        self.technosphere = self.matrix_from_values("technosphere").tocsc()
+        self.biosphere = self.matrix_from_values("biosphere").tocsr()
+        self._process_codes = {col: code for code, col in processes.items()}
+        self._factorization: Factorization | BlockTriangularFactorization | None = None
+
+    def matrix_from_values(self, matrix: str, values: np.ndarray | None = None):
+        """
+        Technosphere or biosphere matrix with entry values replaced by
+        ``values`` (same order as the COO arrays); duplicates are summed.
+        """
+        rows, cols, default = getattr(self, f"{matrix}_coo")
+        shape = (
+            len(self.products if matrix == "technosphere" else self.flows),
+            len(self.processes),
+        )
+        return sparse.csc_matrix(
+            (default if values is None else values, (rows, cols)), shape=shape
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # solver handles do not pickle; workers factorize again on first use
+        return {**self.__dict__, "_factorization": None}
+
+    def __repr__(self) -> str:
+        return (
+            f"InventoryMatrices({len(self.products)} products x "
+            f"{len(self.processes)} processes, {len(self.flows)} flows, "
+            f"method={self.method})"
+        )
+
+    @property
+    def factorization(self) -> Factorization | BlockTriangularFactorization:
+        """
+        Factorization of A, computed on first use and reused for every demand
+        (block-triangular when A is mostly acyclic, see ``wmlci.solvers``).
+        """
+        if self._factorization is None:
+            self._factorization = factorize(self.technosphere)
+        return self._factorization
+
+    @property
+    def characterized_biosphere(self) -> np.ndarray:
+        """``c^T B``: characterized direct impact per unit of each process."""
+        return np.asarray(self.biosphere.T @ self.characterization).ravel()
+
+    def process_code(self, col: int) -> str:
+        return self._process_codes[col]
+
+    def solve(self, demand: dict[str, float]) -> np.ndarray:
+        """Supply vector for a demand of ``{product @id: amount}``."""
+        f = np.zeros(len(self.products))
+        for code, amount in demand.items():
+            f[self.products[code]] += amount
+        return self.factorization.solve(f)
+
+
+def _allocate_if_needed(jsonld) -> None:
+    """Run bw2io allocation in place when the cleaned data still needs it."""
+    for strategy in jsonld.strategies:
+        name = strategy_name(strategy)
+        precondition = CONDITIONAL_STRATEGIES.get(name)
+        if precondition is not None and precondition(jsonld.data):
+            log.info(f"Applying {name} before building matrices")
+            jsonld.data = strategy(jsonld.data)
+
+
+def _exchange_type(exc: dict[str, Any]) -> str:
+    # same labels and checks as bw2io's json_ld_label_exchange_type
+    flow_type = exc.get("flow", {}).get("flowType")
+    if flow_type == "ELEMENTARY_FLOW":
+        return "biosphere"
+    if exc.get("avoidedProduct"):
+        if exc.get("input"):
+            raise ValueError("Avoided products are outputs, not inputs")
+        return "substitution"
+    if exc.get("isInput"):
+        if flow_type != "PRODUCT_FLOW":
+            raise ValueError("Inputs must be products")
+        return "technosphere"
+    if flow_type not in ("PRODUCT_FLOW", "WASTE_FLOW"):
+        raise ValueError("Outputs must be products")
+    return "production"
+
+
+def _index(codes) -> dict[str, int]:
+    index: dict[str, int] = {}
+    for code in codes:
+        index.setdefault(code, len(index))
+    return index
+
+
+def build_matrices(jsonld, jsonldlcia, method: tuple) -> InventoryMatrices:
+    """
+    Build A, B and c from prepared importers.
+
+    Parameters
+    ----------
+    jsonld : bw2io.importers.json_ld.JSONLDImporter
+        Inventory after ``wmlci.lca.prepare_inventory``. Datasets that still
+        need allocation are allocated in place.
+    jsonldlcia : bw2io.importers.json_ld_lcia.JSONLDLCIAImporter
+        LCIA methods after ``wmlci.lca.prepare_lcia``.
+    method : tuple
+        LCIA method name, e.g. ``("IPCC", "AR6-100")``.
+
+    Returns
+    -------
+    InventoryMatrices
+
+    Raises
+    ------
+    ValueError
+        For exchanges that do not link to a product or elementary flow, an
+        unknown method, or a non-square technosphere matrix.
+    """
+    _allocate_if_needed(jsonld)
+    data = jsonld.data
+    unit_conversion = {
+        unit["@id"]: unit["conversionFactor"]
+        for group in data["unit_groups"].values()
+        for unit in group["units"]
+    }
+    product_names = {obj["code"]: obj["name"] for obj in jsonld.products}
+    elementary = {obj["code"] for obj in jsonld.biosphere_database}
+
+    tech, bio = ([], [], []), ([], [], [])  # row codes, column codes, amounts
+    positions = {"technosphere": [], "biosphere": []}  # (process, exchange)
+    process_meta, consumed, unlinked = {}, set(), []
+    for ds in data["processes"].values():
+        code = ds["@id"]
+        production = []
+        for position, exc in enumerate(ds["exchanges"]):
+            kind = _exchange_type(exc)
+            flow_code = exc["flow"]["@id"]
+            amount = exc["amount"] * unit_conversion[exc["unit"]["@id"]]
+            if kind == "biosphere":
+                if flow_code not in elementary:
+                    unlinked.append((ds["name"], exc["flow"]["name"]))
+                    continue
+                target, matrix = bio, "biosphere"
+            else:
+                if flow_code not in product_names:
+                    unlinked.append((ds["name"], exc["flow"]["name"]))
+                    continue
+                target, matrix = tech, "technosphere"
+                if kind == "technosphere":
+                    amount = -amount
+                    consumed.add(flow_code)
+                elif kind == "production":
+                    production.append((flow_code, amount, exc))
+            target[0].append(flow_code)
+            target[1].append(code)
+            target[2].append(amount)
+            positions[matrix].append((code, position))
+
+        meta = {"name": ds["name"], "location": ds["location"]["name"]}
+        if len(production) == 1:
+            flow_code, amount, exc = production[0]
+            flow = exc["flow"]
+            unit = flow["refUnit"] if "refUnit" in flow else exc["unit"]["name"]
+            meta.update({
+                "product": flow_code,
+                "reference_product": product_names[flow_code],
+                "supply_unit": normalize_units_function(unit),
+                "production_amount": amount or 1,
+            })
+        process_meta[code] = meta
+
+    if unlinked:
+        raise ValueError(
+            f"{len(unlinked)} exchanges do not link to a product or elementary "
+            f"flow, e.g. {unlinked[:5]}"
+        )
+
+    products = _index(tech[0])
+    processes = _index(tech[1])
+    if len(products) != len(processes):
+        raise ValueError(
+            f"Technosphere matrix is not square: {len(products)} products "
+            f"and {len(processes)} processes"
+        )
+    technosphere_coo = (
+        np.asarray([products[c] for c in tech[0]], dtype=np.int64),
+        np.asarray([processes[c] for c in tech[1]], dtype=np.int64),
+        np.asarray(tech[2], dtype=np.float64),
+    )
+
+    # biosphere entries of processes outside the technosphere are dropped,
+    # as in bw2calc
+    keep = [i for i, c in enumerate(bio[1]) if c in processes]
+    flows = _index(bio[0][i] for i in keep)
+    biosphere_coo = (
+        np.asarray([flows[bio[0][i]] for i in keep], dtype=np.int64),
+        np.asarray([processes[bio[1][i]] for i in keep], dtype=np.int64),
+        np.asarray([bio[2][i] for i in keep], dtype=np.float64),
+    )
+    entries = {
+        key: ("technosphere", i) for i, key in enumerate(positions["technosphere"])
+    }
+    entries.update(
+        (positions["biosphere"][i], ("biosphere", k)) for k, i in enumerate(keep)
+    )
+
+    characterization = np.zeros(len(flows))
+    for lcia in jsonldlcia.data:
+        if tuple(lcia["name"]) != method:
+            continue
+        for cf in lcia["exchanges"]:
+            row = flows.get(cf["flow"]["@id"])
+            if row is not None:
+                characterization[row] += cf["amount"]
+        break
+    else:
+        raise ValueError(f"LCIA method {method} not in LCIA source")
+
+    matrices = InventoryMatrices(
+        technosphere_coo,
+        biosphere_coo,
+        characterization,
+        products,
+        processes,
+        flows,
+        process_meta,
+        product_names,
+        consumed,
+        method,
+        entries,
+    )
+    log.info(f"Built {matrices}")
+    return matrices
+
+
+def return_matrix_foreground_processes(matrices: InventoryMatrices) -> list:
+    """
+    Foreground processes: a single reference product that no process
+    consumes (``wmlci.openlca.return_foreground_processes`` for matrices).
+    """
+    return [
+        (code, meta)
+        for code, meta in matrices.process_meta.items()
+        if "product" in meta and meta["product"] not in matrices.consumed
+    ]
+
+
+def resolve_matrix_processes(matrices: InventoryMatrices, config: dict[str, Any]):
+    """
+    Match configured process names to foreground processes.
+
+    Returns ``(activity, product, settings)`` tuples like
+    ``wmlci.openlca.resolve_processes``, with dicts in place of nodes.
+    """
+    processes_cfg = config.get("processes") or {}
+    if not processes_cfg:
+        raise ValueError("config must include processes")
+
+    by_name = {
+        meta["name"]: (code, meta)
+        for code, meta in return_matrix_foreground_processes(matrices)
+    }
+    resolved = []
+    missing = []
+
+    for name, settings in processes_cfg.items():
+        if name not in by_name:
+            missing.append(name)
+            continue
+        code, meta = by_name[name]
+        activity = {"code": code, "name": meta["name"], "location": meta["location"]}
+        product = {"code": meta["product"], "name": meta["reference_product"]}
+        resolved.append((activity, product, copy.deepcopy(settings)))
+
+    if missing:
+        available = sorted(by_name.keys())
+        raise ValueError(
+            f"Processes not found in inventory: {missing}. "
+            f"Available foreground processes: {available}"
+        )
+    return resolved
+
+
+def _decomposed_contributions(
+    matrices: InventoryMatrices, processes, store: BackgroundStore
+):
+    """
+    Supply and contribution per process column of each scenario, solving
+    only the foreground above the scenarios and linking it to the stored
+    background inventories. Each background process the foreground consumes
+    from carries the cumulative contribution of its supply chain.
+    """
+    from wmlci.decomposition import BlockDecomposition
+
+    block = np.zeros((len(matrices.products), len(processes)))
+    for j, (_, product, process_settings) in enumerate(processes):
+        amount = float(process_settings["functional_unit"]["amount"])
+        block[matrices.products[product["code"]], j] = amount
+    decomposition = BlockDecomposition(
+        matrices, (), np.flatnonzero(block.any(axis=1)), store
+    )
+    with span("solve foreground", scenarios=len(processes)):
+        foreground, linked = decomposition.solve(block)
+    impact = matrices.characterized_biosphere
+    background_impact = decomposition.background.impacts(matrices.characterization)
+    for j in range(len(processes)):
+        supply = np.zeros(len(matrices.processes))
+        contributions = np.zeros(len(matrices.processes))
+        supply[decomposition.columns] = foreground[:, j]
+        contributions[decomposition.columns] = (
+            impact[decomposition.columns] * foreground[:, j]
+        )
+        np.add.at(
+            supply, decomposition.linked_columns,
+            linked[:, j] / decomposition.linked_outputs,
+        )
+        np.add.at(
+            contributions, decomposition.linked_columns,
+            background_impact * linked[:, j],
+        )
+        yield supply, contributions
+
+
+def calculate_matrix_results(
+    matrices: InventoryMatrices,
+    processes,
+    config: dict[str, Any],
+    store: BackgroundStore | None = None,
+):
+    """
+    Solve each configured scenario on the matrices; return summary and detail
+    DataFrames in the format of ``wmlci.openlca.calculate_lca_results``.
+
+    With a ``store``, only the foreground above the scenarios is solved
+    (``wmlci.decomposition.BlockDecomposition``); the background processes
+    it consumes from are reported with their cumulative contributions.
+    """
+    method = tuple(config["lcia_method"])
+    if method != matrices.method:
+        raise ValueError(
+            f"Matrices were built for {matrices.method}, config uses {method}"
+        )
+    # direct impact per unit of each process; contributions are this times supply
+    impact = matrices.characterized_biosphere
+
+    def column_meta(idx):
+        meta = matrices.process_meta[matrices.process_code(idx)]
+        return meta["name"], meta
+
+    def scenario_contributions():
+        if store is not None:
+            yield from _decomposed_contributions(matrices, processes, store)
+            return
+        for activity, product, process_settings in processes:
+            demand = float(process_settings["functional_unit"]["amount"])
+            with span(f"solve {activity['name']}", cat="scenario"):
+                supply = matrices.solve({product["code"]: demand})
+            yield supply, impact * supply
+
+    results = []
+    detail_rows = []
+    for (activity, product, process_settings), (supply, contributions) in zip(
+        processes, scenario_contributions()
+    ):
+
+        fu_label = functional_unit_label(
+            product["name"], process_settings["functional_unit"]
+        )
+        results.append(
+            scenario_summary(
+                activity, product["name"], fu_label, method,
+                float(contributions.sum()),
+            )
+        )
+        detail_rows.extend(
+            contribution_rows(
+                activity["name"], fu_label, method, contributions, supply,
+                column_meta,
+            )
+        )
+
+    return pd.DataFrame(results), pd.DataFrame(detail_rows, columns=DETAIL_COLUMNS)
+
+
+def check_matrix_parity(config: dict[str, Any], rtol: float = 1e-5) -> bool:
+    """
+    Run a method config through the matrix path and the Brightway path and
+    compare scenario scores and per-activity contributions.
+
+    The Brightway path imports into ``config["bw_project_name"]``.
+
+    Parameters
+    ----------
+    config : dict
+        Loaded method config (``wmlci.method_config.load_method_config``).
+    rtol : float
+        Relative tolerance; Brightway stores amounts in single precision.
+
+    Returns
+    -------
+    bool
+        True if all scores and contributions agree within ``rtol``.
+    """
+    import bw2data as bd
+
+    from wmlci.lca import (
+        prepare_inventory,
+        prepare_lcia,
+        write_inventory,
+        write_lcia_methods,
+    )
+    from wmlci.openlca import calculate_lca_results, resolve_processes
+
+    jsonld = prepare_inventory(config)
+    jsonldlcia = prepare_lcia(config)
+
+    with span("matrix path"):
+        # build_matrices only reads the LCIA importer
+        matrices = build_matrices(
+            copy.deepcopy(jsonld), jsonldlcia, tuple(config["lcia_method"])
+        )
+        fast, fast_detail = calculate_matrix_results(
+            matrices, resolve_matrix_processes(matrices, config), config
+        )
+    with span("brightway path"):
+        bd.projects.set_current(config["bw_project_name"])
+        write_inventory(jsonld, config)
+        write_lcia_methods(jsonldlcia, config)
+        db = bd.Database(config["inventory_database"])
+        expected, expected_detail = calculate_lca_results(
+            db, resolve_processes(db, config), config
+        )
+
+    scores = expected.merge(
+        fast, on="process", how="outer", suffixes=("_bw", "_matrix")
+    )
+    keys = ["process", "activity"]
+    detail = (
+        expected_detail.groupby(keys)["FlowAmount"].sum().to_frame("bw")
+        .join(fast_detail.groupby(keys)["FlowAmount"].sum().to_frame("matrix"),
+              how="outer")
+        .fillna(0)
+    )
+    ok = True
+    for _, row in scores.iterrows():
+        if not np.isclose(row["score_matrix"], row["score_bw"], rtol=rtol):
+            log.warning(
+                f"Score mismatch for '{row['process']}': "
+                f"Brightway {row['score_bw']}, matrix {row['score_matrix']}"
+            )
+            ok = False
+        else:
+            log.info(f"'{row['process']}': {row['score_bw']} (both paths)")
+    # contributions below the detail cutoff may appear on one side only
+    mismatched = detail[
+        ~np.isclose(detail["matrix"], detail["bw"], rtol=rtol, atol=1e-6)
+    ]
+    if len(mismatched):
+        log.warning(
+            f"{len(mismatched)} activity contributions differ, e.g.\n"
+            f"{mismatched.head().to_string()}"
+        )
+        ok = False
+    log.info(
+        f"Matrix path {'matches' if ok else 'differs from'} Brightway for "
+        f"{len(scores)} scenarios and {len(detail)} activity contributions"
+    )
+    return ok
+
+
+if __name__ == "__main__":
+    import sys
+
+    from wmlci.method_config import load_method_config
+
+    method = sys.argv[1] if len(sys.argv) > 1 else "v16"
+    sys.exit(0 if check_matrix_parity(load_method_config(method)) else 1)
@@ -7,15 +7,9 @@ from __future__ import annotations
 import json
 from datetime import datetime
 
-from esupy.processed_data_mgmt import FileMeta
-
-from wmlci.settings import (
-    GIT_HASH,
-    GIT_HASH_LONG,
-    PKG,
-    PKG_VERSION_NUMBER,
-    WRITE_FORMAT,
-)
+from wmlci import settings
+from wmlci.extract.integrity import write_text_atomic
+from wmlci.settings import PKG, WRITE_FORMAT
 
 
 def set_meta(name_data):
@@ -24,11 +18,13 @@ def set_meta(name_data):
     :param name_data: string, name of data
     :return: object, WMLCI metadata
     """
+    from esupy.processed_data_mgmt import FileMeta
+
     wmlci_meta = FileMeta()
     wmlci_meta.tool = PKG
     wmlci_meta.name_data = name_data
-    wmlci_meta.tool_version = PKG_VERSION_NUMBER
-    wmlci_meta.git_hash = GIT_HASH
+    wmlci_meta.tool_version = settings.PKG_VERSION_NUMBER
+    wmlci_meta.git_hash = settings.GIT_HASH
     wmlci_meta.ext = WRITE_FORMAT
     wmlci_meta.date_created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     return wmlci_meta
@@ -72,11 +68,10 @@ def write_metadata(source_name, config, wmlci_meta, pth):
     """
     wmlci_meta.tool_meta = return_method_meta(config)
     wmlci_meta.tool_meta['method_url'] = (
-        f'https://github.com/USEPA/WMLCI/blob/{GIT_HASH_LONG}/wmlci/'
+        f'https://github.com/USEPA/WMLCI/blob/{settings.GIT_HASH_LONG}/wmlci/'
         f'extract/{source_name}.yaml'
     )
     fname = f'{wmlci_meta.name_data}_metadata.json'
     meta_path = f'{pth}/{fname}'
-    with open(meta_path, 'w', encoding='utf-8') as fi:
-        fi.write(json.dumps(wmlci_meta.__dict__, indent=4))
+    write_text_atomic(meta_path, json.dumps(wmlci_meta.__dict__, indent=4))
     return meta_path
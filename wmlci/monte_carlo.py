@@ -0,0 +1,671 @@
+"""
+Monte Carlo uncertainty analysis of WMLCI scenarios.
+
+Exchange uncertainty comes from the imported data: openLCA distributions are
+converted to stats_arrays fields while cleaning
+(``convert_uncertainty_to_stats_arrays``), written to the Brightway
+datapackages, and sampled by bw2calc.
+
+Iterations are split into fixed-size chunks. Each chunk has its own
+``numpy.random.SeedSequence`` child of the run seed, so a run is
+reproducible for a given seed whatever the number of workers. Each worker
+process builds one ``LCA`` object, keeps its matrix structure, and per draw
+resamples the matrix values and solves every scenario demand as one block
+against a single factorization.
+
+With ``sample: parameters`` the draws come from the parameter distributions
+of the model default YAMLs instead (see ``wmlci.parameters``). That mode runs
+on the matrix engine in a single process: each chunk draws all its parameter
+sets at once, evaluates the amountFormulas on arrays of draws, and solves the
+scenario block per draw, reusing one factorization when no technosphere
+entry depends on a sampled parameter.
+
+Settings are read from the ``monte_carlo`` section of the method YAML::
+
+    monte_carlo:
+      iterations: 1000
+      seed: 42
+      workers: 4
+      sample: exchanges   # or parameters
+      tolerance: 0.01     # stop once every mean is known within 1%
+
+Draws are not kept: each chunk updates running means, variances and
+percentile sketches of the scores and of every pairwise scenario difference
+(``wmlci.online_stats``), so memory does not grow with the iteration count.
+Every draw scores all scenarios on the same sampled matrices, so pathway
+differences are paired; the ``comparison_group`` process setting limits the
+comparisons to scenarios of the same group (e.g. one material).
+``iterations`` is the maximum when a ``tolerance`` is set.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import bw2data as bd
+import numpy as np
+import pandas as pd
+from bw2calc import LCA
+from scipy import sparse
+from stats_arrays import MCRandomNumberGenerator
+
+from wmlci.background import BackgroundStore
+from wmlci.decomposition import BlockDecomposition
+from wmlci.lca import prepare_inventory, prepare_lcia, prepare_project
+from wmlci.log import log
+from wmlci.matrices import InventoryMatrices, build_matrices, resolve_matrix_processes
+from wmlci.method_config import load_method_config
+from wmlci.online_stats import ScenarioStatistics
+from wmlci.openlca import METHOD_UNIT, functional_unit_label
+from wmlci.parameters import ParameterModel, build_parameter_model
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.solvers import Factorization
+from wmlci.trace import span, trace_run
+
+MONTE_CARLO_DEFAULTS = {
+    "iterations": 1000,
+    "seed": None,
+    "workers": None,
+    "chunk_size": 50,
+    "sample": "exchanges",
+    # early stopping: relative half-width of the confidence interval on means
+    "tolerance": None,
+    "confidence": 0.95,
+    "min_iterations": 100,
+    "keep_draws": False,
+    "percentiles": [2.5, 5, 25, 50, 75, 95, 97.5],
+}
+
+# matrices resampled per draw
+_MAPPED_MATRICES = ("technosphere_mm", "biosphere_mm", "characterization_mm")
+
+# per-process state of pool workers, set by _init_worker
+_WORKER: dict[str, Any] = {}
+
+
+def monte_carlo_settings(config: dict[str, Any], **overrides: Any) -> dict[str, Any]:
+    """
+    Monte Carlo settings from ``config["monte_carlo"]`` over the defaults;
+    keyword arguments that are not None take precedence.
+
+    Without a configured seed, a fresh one is drawn and returned so the run
+    can be repeated.
+    """
+    settings = {**MONTE_CARLO_DEFAULTS, **(config.get("monte_carlo") or {})}
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    if settings["seed"] is None:
+        settings["seed"] = int(np.random.SeedSequence().entropy % 2**32)
+    if not settings["workers"]:
+        settings["workers"] = os.cpu_count() or 1
+    if settings["iterations"] < 1:
+        raise ValueError("monte_carlo iterations must be at least 1")
+    if settings["tolerance"] is not None and settings["tolerance"] <= 0:
+        raise ValueError("monte_carlo tolerance must be positive")
+    if settings["sample"] not in ("exchanges", "parameters"):
+        raise ValueError(
+            f"Unknown monte_carlo sample '{settings['sample']}', use "
+            "'exchanges' or 'parameters'"
+        )
+    return settings
+
+
+def iteration_chunks(
+    seed: int, iterations: int, chunk_size: int
+) -> list[tuple[np.random.SeedSequence, int]]:
+    """Split ``iterations`` into chunks, each with an independent seed sequence."""
+    sizes = [chunk_size] * (iterations // chunk_size)
+    if iterations % chunk_size:
+        sizes.append(iterations % chunk_size)
+    children = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(children, sizes))
+
+
+def build_scenario_lca(
+    demands: list[dict[int, float]], method: tuple, use_distributions: bool
+) -> tuple[LCA, np.ndarray]:
+    """
+    Build one ``LCA`` for all scenario demands of the current project.
+
+    Returns the LCA (matrices loaded) and the demand block, one column per
+    scenario, in technosphere row order.
+    """
+    indexed, data_objs, _ = bd.prepare_lca_inputs(
+        demands=demands, method=method, remapping=False
+    )
+    lca = LCA(indexed[0], data_objs=data_objs, use_distributions=use_distributions)
+    lca.lci()
+    lca.lcia()
+    block = np.zeros((len(lca.dicts.product), len(indexed)))
+    for j, demand in enumerate(indexed):
+        for product_id, amount in demand.items():
+            block[lca.dicts.product[product_id], j] = amount
+    return lca, block
+
+
+def scenario_scores(
+    lca: LCA, block: np.ndarray, factorization: Factorization | None = None
+) -> np.ndarray:
+    """
+    Scores of every demand column for the LCA's current matrices.
+
+    ``factorization`` (of an earlier draw of the same LCA) is refactored with
+    the current technosphere values, reusing its symbolic analysis; draws
+    keep the sparsity pattern of the technosphere matrix.
+    """
+    technosphere = lca.technosphere_mm.matrix
+    characterized = lca.characterization_mm.matrix @ lca.biosphere_mm.matrix
+    impact = np.asarray(characterized.sum(axis=0)).ravel()
+    if factorization is None:
+        factorization = Factorization(technosphere)
+    else:
+        factorization.refactor(technosphere)
+    supply = factorization.solve(block)
+    return impact @ supply.reshape(len(impact), -1)
+
+
+def _reseed(lca: LCA, seed_sequence: np.random.SeedSequence) -> None:
+    """Give every sampled resource group its own stream from ``seed_sequence``."""
+    groups = [
+        group
+        for name in _MAPPED_MATRICES
+        for group in getattr(lca, name).groups
+        if isinstance(getattr(group, "rng", None), MCRandomNumberGenerator)
+    ]
+    for group, child in zip(groups, seed_sequence.spawn(len(groups))):
+        group.rng = MCRandomNumberGenerator(
+            params=group.data_original, seed=int(child.generate_state(1)[0])
+        )
+
+
+def _init_worker(project: str, demands: list[dict[int, float]], method: tuple) -> None:
+    bd.projects.set_current(project)
+    _WORKER["lca"], _WORKER["block"] = build_scenario_lca(
+        demands, method, use_distributions=True
+    )
+    # one factorization per worker, refactored with the values of each draw
+    _WORKER["factorization"] = Factorization(_WORKER["lca"].technosphere_mm.matrix)
+
+
+def _run_chunk(chunk: tuple[np.random.SeedSequence, int]) -> np.ndarray:
+    """Scores for one chunk of draws, shape (iterations, scenarios)."""
+    seed_sequence, n = chunk
+    lca, block = _WORKER["lca"], _WORKER["block"]
+    _reseed(lca, seed_sequence)
+    scores = np.empty((n, block.shape[1]))
+    for i in range(n):
+        for name in _MAPPED_MATRICES:
+            next(getattr(lca, name))
+        scores[i] = scenario_scores(lca, block, _WORKER["factorization"])
+    return scores
+
+
+def sample_scores(
+    project: str,
+    demands: list[dict[int, float]],
+    method: tuple,
+    settings: dict[str, Any],
+) -> Iterator[np.ndarray]:
+    """
+    Draw Monte Carlo scores for every demand.
+
+    Workers are spawned, so scripts calling this with more than one worker
+    need an ``if __name__ == "__main__":`` guard. Closing the generator
+    cancels the chunks that have not started.
+
+    Yields
+    ------
+    np.ndarray
+        Scores of one chunk, shape (draws, scenarios), in chunk order.
+    """
+    chunks = iteration_chunks(
+        settings["seed"], settings["iterations"], settings["chunk_size"]
+    )
+    workers = min(settings["workers"], len(chunks))
+    if workers == 1:
+        _init_worker(project, demands, method)
+        for chunk in chunks:
+            yield _run_chunk(chunk)
+        return
+    # spawn so workers open their own project database connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(project, demands, method),
+    ) as pool:
+        futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def matrix_demand_block(matrices: InventoryMatrices, processes) -> np.ndarray:
+    """Demand block of the configured scenarios, in technosphere row order."""
+    block = np.zeros((len(matrices.products), len(processes)))
+    for j, (_, product, process_settings) in enumerate(processes):
+        amount = float(process_settings["functional_unit"]["amount"])
+        block[matrices.products[product["code"]], j] = amount
+    return block
+
+
+class EntryScorer:
+    """
+    Scenario scores for batches of matrix entry values (as returned by
+    ``ParameterModel.sample`` or ``ParameterModel.evaluate``).
+
+    When the technosphere varies, one factorization is kept and refactored
+    with each draw's values on the unchanged sparsity pattern; otherwise the
+    scenario supplies are solved once. Given the ``varying`` process columns,
+    only the foreground system above them is refactored and solved per draw
+    (``wmlci.decomposition.BlockDecomposition``), with background inventories
+    from ``store`` when one is given.
+    """
+
+    def __init__(
+        self,
+        matrices: InventoryMatrices,
+        block: np.ndarray,
+        varies_technosphere: bool,
+        varying: Iterable[int] | None = None,
+        store: BackgroundStore | None = None,
+    ) -> None:
+        rows, cols, _ = matrices.biosphere_coo
+        # entries x processes: characterized impact of each biosphere entry
+        self.characterize = sparse.csr_matrix(
+            (matrices.characterization[rows], (np.arange(len(rows)), cols)),
+            shape=(len(rows), len(matrices.processes)),
+        )
+        self.matrices = matrices
+        self.block = block
+        self.decomposition = None
+        if varies_technosphere and varying is not None:
+            decomposition = BlockDecomposition(
+                matrices, varying, np.flatnonzero(block.any(axis=1)), store
+            )
+            if decomposition.size < len(matrices.processes):
+                self.decomposition = decomposition
+                self.foreground_block = decomposition.foreground_demand(block)
+                self.background_impact = decomposition.background.impacts(
+                    matrices.characterization
+                )
+        self.factorization = Factorization(
+            matrices.technosphere if self.decomposition is None
+            else self.decomposition.foreground_technosphere()
+        )
+        self.fixed_supply = (
+            None if varies_technosphere
+            else self.factorization.solve(block).reshape(len(matrices.processes), -1)
+        )
+
+    def __call__(self, technosphere: np.ndarray, biosphere: np.ndarray) -> np.ndarray:
+        """Scores of each row of entry values, shape (rows, scenarios)."""
+        impact = np.asarray(self.characterize.T @ biosphere.T).T
+        if self.fixed_supply is not None:
+            return impact @ self.fixed_supply
+        if self.decomposition is not None:
+            return self._foreground_scores(technosphere, impact)
+        scores = np.empty((len(impact), self.block.shape[1]))
+        for i in range(len(impact)):
+            self.factorization.refactor(
+                self.matrices.matrix_from_values("technosphere", technosphere[i])
+            )
+            supply = self.factorization.solve(self.block)
+            scores[i] = impact[i] @ supply.reshape(len(impact[i]), -1)
+        return scores
+
+    def _foreground_scores(
+        self, technosphere: np.ndarray, impact: np.ndarray
+    ) -> np.ndarray:
+        decomposition = self.decomposition
+        scores = np.empty((len(impact), self.block.shape[1]))
+        for i in range(len(impact)):
+            self.factorization.refactor(
+                decomposition.foreground_technosphere(technosphere[i])
+            )
+            supply = self.factorization.solve(self.foreground_block).reshape(
+                decomposition.size, -1
+            )
+            linked = decomposition.background_demand(technosphere[i]) @ supply
+            scores[i] = (
+                impact[i, decomposition.columns] @ supply
+                + self.background_impact @ linked
+            )
+        return scores
+
+
+def sample_parameter_scores(
+    matrices: InventoryMatrices,
+    model: ParameterModel,
+    block: np.ndarray,
+    settings: dict[str, Any],
+    store: BackgroundStore | None = None,
+) -> Iterator[np.ndarray]:
+    """
+    Draw scores from parameter distributions, one vectorized batch per chunk.
+
+    Yields
+    ------
+    np.ndarray
+        Scores of one chunk, shape (draws, scenarios), in chunk order.
+    """
+    scorer = EntryScorer(
+        matrices, block, model.varies_technosphere, model.varying_processes(), store
+    )
+    chunks = iteration_chunks(
+        settings["seed"], settings["iterations"], settings["chunk_size"]
+    )
+    for seed_sequence, n in chunks:
+        yield scorer(*model.sample(n, np.random.default_rng(seed_sequence)))
+
+
+def comparison_groups(processes) -> tuple[list[str], list[list[int]]]:
+    """
+    Scenario comparison groups from the ``comparison_group`` process setting
+    (e.g. the material whose pathways are compared).
+
+    Returns each scenario's group label and the groups as index lists.
+    Without any ``comparison_group``, all scenarios form one group; when some
+    are set, scenarios without one are not compared.
+    """
+    labels = [s.get("comparison_group") for _, _, s in processes]
+    if not any(labels):
+        return ["all"] * len(processes), [list(range(len(processes)))]
+    groups: dict[str, list[int]] = {}
+    for j, label in enumerate(labels):
+        if label:
+            groups.setdefault(str(label), []).append(j)
+    return [str(label) if label else "" for label in labels], list(groups.values())
+
+
+def accumulate_scores(
+    chunks: Iterator[np.ndarray], processes, settings: dict[str, Any]
+) -> tuple[ScenarioStatistics, np.ndarray | None]:
+    """
+    Feed score chunks into running statistics. All scenarios are scored on
+    the same draws, so differences within each comparison group are paired
+    (common random numbers).
+
+    With a ``tolerance`` setting, stops after the first chunk (at or past
+    ``min_iterations`` draws) where every mean score is known within that
+    relative tolerance at the ``confidence`` level. Chunks are consumed in
+    order, so the stopping point depends on the seed only.
+
+    Returns the statistics and, with ``keep_draws``, every draw.
+    """
+    _, groups = comparison_groups(processes)
+    stats = ScenarioStatistics(len(processes), settings["percentiles"], groups)
+    kept = [] if settings["keep_draws"] else None
+    tolerance = settings["tolerance"]
+    try:
+        for chunk in chunks:
+            stats.update(chunk)
+            if kept is not None:
+                kept.append(chunk)
+            if (
+                tolerance
+                and stats.count >= settings["min_iterations"]
+                and stats.converged(tolerance, settings["confidence"])
+            ):
+                log.info(
+                    f"Monte Carlo converged after {stats.count} iterations "
+                    f"(tolerance {tolerance:g} at {settings['confidence']:g} "
+                    "confidence)"
+                )
+                break
+        else:
+            if tolerance:
+                log.warning(
+                    f"Monte Carlo did not converge within {stats.count} "
+                    f"iterations (tolerance {tolerance:g})"
+                )
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    return stats, (np.vstack(kept) if kept else None)
+
+
+def _scenario_label(activity, product, process_settings) -> dict[str, str]:
+    return {
+        "process": activity["name"],
+        "reference_product": product.get("name", ""),
+        "functional_unit": functional_unit_label(
+            product.get("name", ""), process_settings["functional_unit"]
+        ),
+    }
+
+
+def summarize_statistics(
+    stats: ScenarioStatistics,
+    processes,
+    static_scores: np.ndarray,
+    settings: dict[str, Any],
+    method: tuple,
+) -> pd.DataFrame:
+    """
+    One row per scenario: deterministic score, mean, standard deviation,
+    confidence half-width of the mean, percentile estimates, and the share
+    of draws in which the scenario scores lowest of its comparison group.
+    """
+    percentiles = settings["percentiles"]
+    values = stats.quantiles.values()
+    std = stats.scores.std
+    half = stats.scores.half_width(settings["confidence"])
+    labels, _ = comparison_groups(processes)
+    lowest = stats.probability_lowest
+    rows = []
+    for j, scenario in enumerate(processes):
+        row = {
+            **_scenario_label(*scenario),
+            "comparison_group": labels[j],
+            "method": str(method),
+            "iterations": stats.count,
+            "seed": settings["seed"],
+            "score": float(static_scores[j]),
+            "mean": float(stats.scores.mean[j]),
+            "std": float(std[j]),
+            "ci_half_width": float(half[j]),
+        }
+        row.update(
+            {f"p{q:g}": float(values[k, j]) for k, q in enumerate(percentiles)}
+        )
+        row["probability_lowest"] = float(lowest[j])
+        row["score_unit"] = METHOD_UNIT
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_differences(
+    stats: ScenarioStatistics, processes, settings: dict[str, Any], method: tuple
+) -> pd.DataFrame:
+    """
+    One row per compared pair: statistics of the paired difference
+    ``score_a - score_b`` and the share of draws where ``a`` scores lower.
+    """
+    values = stats.difference_quantiles.values()
+    std = stats.differences.std
+    probability = stats.probability_a_lower
+    labels, _ = comparison_groups(processes)
+    rows = []
+    for k, (a, b) in enumerate(stats.pairs):
+        rows.append({
+            "comparison_group": labels[a],
+            "process_a": processes[a][0]["name"],
+            "process_b": processes[b][0]["name"],
+            "method": str(method),
+            "iterations": stats.count,
+            "seed": settings["seed"],
+            "mean_difference": float(stats.differences.mean[k]),
+            "std_difference": float(std[k]),
+            "p2.5": float(values[0, k]),
+            "p50": float(values[1, k]),
+            "p97.5": float(values[2, k]),
+            "probability_a_lower": float(probability[k]),
+            "score_unit": METHOD_UNIT,
+        })
+    return pd.DataFrame(rows)
+
+
+def _sample_exchanges(
+    config: dict[str, Any], settings: dict[str, Any], snapshot: bool | None
+):
+    processes = prepare_project(config, snapshot)
+    method = tuple(config["lcia_method"])
+    demands = [
+        {product.id: float(s["functional_unit"]["amount"])}
+        for _, product, s in processes
+    ]
+    with span("deterministic scores"):
+        static = scenario_scores(
+            *build_scenario_lca(demands, method, use_distributions=False)
+        )
+    log.info(
+        f"Monte Carlo: up to {settings['iterations']} iterations of "
+        f"{len(processes)} scenarios on {settings['workers']} workers "
+        f"(seed {settings['seed']})"
+    )
+    chunks = sample_scores(config["bw_project_name"], demands, method, settings)
+    return processes, static, chunks
+
+
+def prepare_parameter_model(config: dict[str, Any]):
+    """
+    Matrices, parameter model, resolved scenarios and demand block of a
+    method config, for parameter sampling on the matrix engine.
+    """
+    jsonld = prepare_inventory(config)
+    jsonldlcia = prepare_lcia(config)
+    with span("build matrices"):
+        matrices = build_matrices(jsonld, jsonldlcia, tuple(config["lcia_method"]))
+    with span("build parameter model"):
+        model = build_parameter_model(jsonld, matrices, config)
+    processes = resolve_matrix_processes(matrices, config)
+    return matrices, model, processes, matrix_demand_block(matrices, processes)
+
+
+def _sample_parameters(config: dict[str, Any], settings: dict[str, Any]):
+    matrices, model, processes, block = prepare_parameter_model(config)
+    if not model.n_distributions:
+        raise ValueError(
+            "No parameter distributions in the model defaults; add a "
+            "'distribution' to a parameter or use sample: exchanges"
+        )
+    with span("deterministic scores"):
+        supply = matrices.factorization.solve(block)
+        static = matrices.characterized_biosphere @ supply.reshape(
+            len(matrices.processes), -1
+        )
+    log.info(
+        f"Monte Carlo: up to {settings['iterations']} parameter draws of "
+        f"{len(processes)} scenarios, {model.n_distributions} distributions "
+        f"(seed {settings['seed']})"
+    )
+    chunks = sample_parameter_scores(
+        matrices, model, block, settings, BackgroundStore.from_config(config)
+    )
+    return processes, static, chunks
+
+
+def run_monte_carlo(
+    method_name: str,
+    iterations: int | None = None,
+    seed: int | None = None,
+    workers: int | None = None,
+    snapshot: bool | None = None,
+    trace: str | Path | None = None,
+    sample: str | None = None,
+    tolerance: float | None = None,
+) -> dict[str, Any]:
+    """
+    Monte Carlo run of every configured scenario of a method YAML.
+
+    Parameters
+    ----------
+    method_name
+        Stem of a file in ``wmlci/methods/``.
+    iterations, seed, workers, sample, tolerance
+        Override the ``monte_carlo`` settings of the method YAML.
+    snapshot
+        Passed to ``wmlci.lca.prepare_project`` (exchange sampling only).
+    trace
+        Optional Chrome trace output path (see ``wmlci.trace``).
+
+    Returns
+    -------
+    dict
+        config, settings, percentile and scenario-difference DataFrames,
+        output paths, and the raw draws when ``keep_draws`` is set.
+    """
+    with trace_run(trace):
+        with span("run_monte_carlo", method=method_name):
+            config = load_method_config(method_name)
+            settings = monte_carlo_settings(
+                config, iterations=iterations, seed=seed, workers=workers,
+                sample=sample, tolerance=tolerance,
+            )
+            method = tuple(config["lcia_method"])
+            if settings["sample"] == "parameters":
+                processes, static, chunks = _sample_parameters(config, settings)
+            else:
+                processes, static, chunks = _sample_exchanges(
+                    config, settings, snapshot
+                )
+            with span("sample", iterations=settings["iterations"]):
+                stats, draws = accumulate_scores(chunks, processes, settings)
+            summary = summarize_statistics(stats, processes, static, settings, method)
+            differences = summarize_differences(stats, processes, settings, method)
+
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get(
+                "monte_carlo_csv", "lcia_results_monte_carlo.csv"
+            )
+            summary.to_csv(path, index=False)
+            log.info(f"Monte Carlo percentiles written to {path}")
+            differences_path = None
+            if len(differences):
+                differences_path = resultspath / out.get(
+                    "monte_carlo_differences_csv",
+                    "lcia_results_monte_carlo_differences.csv",
+                )
+                differences.to_csv(differences_path, index=False)
+                log.info(f"Scenario differences written to {differences_path}")
+
+    print("\nMonte Carlo results (all scenarios):")
+    print(summary.to_string(index=False))
+    return {
+        "method": method_name,
+        "config": config,
+        "settings": settings,
+        "summary": summary,
+        "differences": differences,
+        "draws": draws,
+        "path": str(path),
+        "differences_path": str(differences_path) if differences_path else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.monte_carlo",
+        description="Monte Carlo uncertainty analysis of a WMLCI method.",
+    )
+    parser.add_argument("method", nargs="?", default="v16")
+    parser.add_argument("--iterations", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--sample", choices=["exchanges", "parameters"])
+    parser.add_argument("--tolerance", type=float)
+    args = parser.parse_args()
+    run_monte_carlo(
+        args.method, args.iterations, args.seed, args.workers,
+        sample=args.sample, tolerance=args.tolerance,
+    )
@@ -0,0 +1,205 @@
+"""
+Constant-memory statistics of Monte Carlo draws.
+
+Scores arrive in chunks of shape (draws, series). ``RunningStats`` keeps the
+Welford mean and variance (chunks are merged with the pairwise update of Chan
+et al.), ``P2Quantiles`` keeps a P-square sketch of each requested percentile
+(Jain & Chlamtac, 1985), and ``ScenarioStatistics`` combines them for every
+scenario and for the differences of the pairs of scenarios being compared.
+"""
+
+from __future__ import annotations
+
+from itertools import combinations
+
+import numpy as np
+from scipy.stats import norm
+
+
+class RunningStats:
+    """Count, mean and variance of each series, updated chunk by chunk."""
+
+    def __init__(self, n_series: int) -> None:
+        self.count = 0
+        self.mean = np.zeros(n_series)
+        self._m2 = np.zeros(n_series)
+
+    def update(self, chunk: np.ndarray) -> None:
+        n = len(chunk)
+        if not n:
+            return
+        mean = chunk.mean(axis=0)
+        m2 = ((chunk - mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + m2 + delta**2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Sample variance (ddof=1); zero below two draws."""
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def half_width(self, confidence: float = 0.95) -> np.ndarray:
+        """Half-width of the normal confidence interval on the mean."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.inf)
+        z = norm.ppf(0.5 + confidence / 2)
+        return z * self.std / np.sqrt(self.count)
+
+
+class P2Quantiles:
+    """
+    P-square estimates of several percentiles of each series.
+
+    Five markers per percentile and series; the first five draws are kept
+    exactly, later draws only move the markers.
+    """
+
+    def __init__(self, percentiles: list[float], n_series: int) -> None:
+        self.percentiles = list(percentiles)
+        p = np.asarray(self.percentiles, dtype=float)[:, None, None] / 100
+        shape = (len(self.percentiles), n_series, 5)
+        self._increments = np.broadcast_to(
+            np.concatenate([0 * p, p / 2, p, (1 + p) / 2, 1 + 0 * p], axis=-1), shape
+        )
+        self._initial_desired = np.broadcast_to(
+            np.concatenate([0 * p, 2 * p, 4 * p, 2 + 2 * p, 4 + 0 * p], axis=-1),
+            shape,
+        )
+        self._heights = np.zeros(shape)
+        self._positions = np.broadcast_to(np.arange(5.0), shape).copy()
+        self._desired = self._initial_desired.copy()
+        self._first: list[np.ndarray] = []
+        self.count = 0
+
+    def update(self, chunk: np.ndarray) -> None:
+        for draw in chunk:
+            self._add(draw)
+
+    def _add(self, x: np.ndarray) -> None:
+        self.count += 1
+        if self.count <= 5:
+            self._first.append(x)
+            if self.count == 5:
+                self._heights[:] = np.sort(np.asarray(self._first), axis=0).T
+            return
+        q, n = self._heights, self._positions
+        x = np.broadcast_to(x, q.shape[:2])
+        # cell of x; the extreme markers follow the minimum and maximum
+        k = (x[..., None] >= q[..., 1:4]).sum(axis=-1)
+        q[..., 0] = np.minimum(q[..., 0], x)
+        q[..., 4] = np.maximum(q[..., 4], x)
+        n += np.arange(5) > k[..., None]
+        self._desired += self._increments
+        for i in (1, 2, 3):
+            d = self._desired[..., i] - n[..., i]
+            up = (d >= 1) & (n[..., i + 1] - n[..., i] > 1)
+            down = (d <= -1) & (n[..., i - 1] - n[..., i] < -1)
+            step = np.where(up, 1.0, np.where(down, -1.0, 0.0))
+            if not step.any():
+                continue
+            qi, qlo, qhi = q[..., i], q[..., i - 1], q[..., i + 1]
+            ni, nlo, nhi = n[..., i], n[..., i - 1], n[..., i + 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = qi + step / (nhi - nlo) * (
+                    (ni - nlo + step) * (qhi - qi) / (nhi - ni)
+                    + (nhi - ni - step) * (qi - qlo) / (ni - nlo)
+                )
+                q_next = np.where(step > 0, qhi, qlo)
+                n_next = np.where(step > 0, nhi, nlo)
+                linear = qi + step * (q_next - qi) / (n_next - ni)
+            adjusted = np.where((qlo < parabolic) & (parabolic < qhi), parabolic, linear)
+            moved = step != 0
+            q[..., i] = np.where(moved, adjusted, qi)
+            n[..., i] = ni + step
+
+    def values(self) -> np.ndarray:
+        """Percentile estimates, shape (percentiles, series)."""
+        if not self.count:
+            return np.full(self._heights.shape[:2], np.nan)
+        if self.count < 5:
+            return np.percentile(np.asarray(self._first), self.percentiles, axis=0)
+        return self._heights[..., 2].copy()
+
+
+class ScenarioStatistics:
+    """
+    Running statistics of scenario scores and of their pairwise differences.
+
+    Scenarios are compared within ``groups`` (lists of scenario indices; by
+    default one group of all scenarios). ``pairs`` lists the compared index
+    pairs ``(a, b)``, whose differences are ``score[a] - score[b]``. Every
+    chunk row must hold the scores of all scenarios for the same draw.
+    """
+
+    def __init__(
+        self,
+        n_scenarios: int,
+        percentiles: list[float],
+        groups: list[list[int]] | None = None,
+    ) -> None:
+        self.groups = (
+            [list(range(n_scenarios))] if groups is None
+            else [list(group) for group in groups]
+        )
+        self.pairs = [
+            pair for group in self.groups for pair in combinations(group, 2)
+        ]
+        self.scores = RunningStats(n_scenarios)
+        self.quantiles = P2Quantiles(percentiles, n_scenarios)
+        self.differences = RunningStats(len(self.pairs))
+        self.difference_quantiles = P2Quantiles([2.5, 50, 97.5], len(self.pairs))
+        self._a_lower = np.zeros(len(self.pairs), dtype=int)
+        self._lowest = np.zeros(n_scenarios, dtype=int)
+
+    @property
+    def count(self) -> int:
+        return self.scores.count
+
+    def update(self, chunk: np.ndarray) -> None:
+        """Add a chunk of scores, shape (draws, scenarios)."""
+        self.scores.update(chunk)
+        self.quantiles.update(chunk)
+        if self.pairs:
+            a, b = (np.array(idx) for idx in zip(*self.pairs))
+            diff = chunk[:, a] - chunk[:, b]
+            self.differences.update(diff)
+            self.difference_quantiles.update(diff)
+            self._a_lower += (diff < 0).sum(axis=0)
+        for group in self.groups:
+            if len(group) > 1:
+                lowest = np.argmin(chunk[:, group], axis=1)
+                self._lowest[group] += np.bincount(lowest, minlength=len(group))
+
+    @property
+    def probability_a_lower(self) -> np.ndarray:
+        """Share of draws where the first scenario of each pair scores lower."""
+        return self._a_lower / max(self.count, 1)
+
+    @property
+    def probability_lowest(self) -> np.ndarray:
+        """
+        Share of draws where each scenario scores lowest in its group (NaN
+        for scenarios that are not compared).
+        """
+        probability = np.full(len(self._lowest), np.nan)
+        for group in self.groups:
+            if len(group) > 1:
+                probability[group] = self._lowest[group] / max(self.count, 1)
+        return probability
+
+    def converged(self, tolerance: float, confidence: float = 0.95) -> bool:
+        """
+        Whether the confidence interval on every mean score is within
+        ``tolerance`` (relative to the mean's magnitude).
+        """
+        half = self.scores.half_width(confidence)
+        return bool(np.all(half <= tolerance * np.abs(self.scores.mean)))
@@ -18,7 +18,8 @@ import pandas as pd
 from bw2calc import LCA
 
 from wmlci.log import log
-from wmlci.settings import resultspath
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.trace import span
 
 _UNIT_LABEL = {
     "kilogram": "kg",
@@ -140,6 +141,80 @@ def build_process_meta(db) -> dict:
     return process_meta
 
 
+def scenario_summary(
+    activity, product_name: str, fu_label: str, method: tuple, score: float
+) -> dict:
+    """Summary row for one scenario; ``activity`` is any mapping with name and location."""
+    return {
+        "process": activity["name"],
+        "reference_product": product_name,
+        "functional_unit": fu_label,
+        "location": activity.get("location", ""),
+        "method": str(method),
+        "score": score,
+        "score_unit": METHOD_UNIT,
+        "score_metric_ton_co2e": score / 1000,
+    }
+
+
+def contribution_rows(
+    process_name: str,
+    fu_label: str,
+    method: tuple,
+    col_contributions: np.ndarray,
+    supply: np.ndarray,
+    column_meta,
+) -> list[dict]:
+    """
+    Detail rows for one scenario, largest contribution first.
+
+    Parameters
+    ----------
+    process_name, fu_label, method
+        Scenario labels repeated on every row.
+    col_contributions, supply
+        Characterized score and supply of each technosphere column.
+    column_meta : callable
+        Maps a column index to ``(activity name, meta)``, where meta holds
+        location, reference_product, supply_unit and production_amount.
+    """
+    rows = []
+    # drop the noise - the values that round to 0 and exist due to sparse matrix after run
+    for idx in np.argsort(np.abs(col_contributions))[::-1]:
+        direct_contribution = float(col_contributions[idx])
+        if abs(direct_contribution) < 1e-9:
+            continue
+        activity_name, meta = column_meta(idx)
+
+        # scale process supply to physical reference-product amount per
+        # functional unit (e.g. 1 kg food waste landfilled)
+        process_supply = supply[idx]
+        production_amount = meta.get("production_amount") or 1
+        product_amount = process_supply * production_amount
+        product_unit = meta.get("supply_unit", "")
+        emissions_per_unit_of_product = (
+            direct_contribution / product_amount if product_amount else None
+        )
+
+        rows.append({
+            "location": meta.get("location", ""),
+            "process": process_name,
+            "activity": activity_name,
+            "reference_product": meta.get("reference_product", ""),
+            "functional_unit": fu_label,
+            "product_amount": product_amount,
+            "product_amount_unit": product_unit,
+            "emissions_per_unit_of_product": emissions_per_unit_of_product,
+            "emissions_per_unit_of_product_unit": (
+                f"{METHOD_UNIT} / {product_unit}" if product_unit else METHOD_UNIT
+            ),
+            "FlowAmount": direct_contribution,
+            "FlowAmount_unit": METHOD_UNIT,
+            "method": str(method),
+        })
+    return rows
+
+
 def calculate_lca_results(db, processes, config: dict[str, Any]):
     """Run LCA for each configured process scenario; return summary and detail DataFrames."""
     method = tuple(config["lcia_method"])
@@ -155,12 +230,13 @@ def calculate_lca_results(db, processes, config: dict[str, Any]):
         demand = float(process_settings["functional_unit"]["amount"])
 
         try:
-            func_unt, data_objs, _ = bd.prepare_lca_inputs(
-                {product: demand}, method=method
-            )
-            lca = LCA(func_unt, data_objs=data_objs)
-            lca.lci()   # life cycle inventory: solves A^-1 f
-            lca.lcia()  # life cycle impact assessment: C B A^-1 f
+            with span(f"solve {activity['name']}", cat="scenario"):
+                func_unt, data_objs, _ = bd.prepare_lca_inputs(
+                    {product: demand}, method=method
+                )
+                lca = LCA(func_unt, data_objs=data_objs)
+                lca.lci()   # life cycle inventory: solves A^-1 f
+                lca.lcia()  # life cycle impact assessment: C B A^-1 f
         except (ValueError, bc.errors.OutsideTechnosphere) as err:
             log.warning(f"Skipping scenario '{activity['name']}': {err}")
             continue
@@ -168,60 +244,32 @@ def calculate_lca_results(db, processes, config: dict[str, Any]):
         fu_config = process_settings["functional_unit"]
         fu_label = functional_unit_label(product.get("name", ""), fu_config)
 
-        score = lca.score
+        results.append(
+            scenario_summary(
+                activity, product.get("name", ""), fu_label, method, lca.score
+            )
+        )
 
-        results.append({
-            "process": activity["name"],
-            "reference_product": product.get("name", ""),
-            "functional_unit": fu_label,
-            "location": activity.get("location", ""),
-            "method": str(method),
-            "score": score,
-            "score_unit": METHOD_UNIT,
-            "score_metric_ton_co2e": score / 1000,
-        })
+        def column_meta(idx):
+            proc = bd.get_activity(lca.dicts.activity.reversed[idx])
+            meta = process_meta.get(proc.id, {})
+            return proc["name"], {"location": proc.get("location", ""), **meta}
 
         # decompose the system score by process: characterized_inventory column sums
         # give each process's contribution to the system total, and supply_array
         # gives how much of each process the system uses. Both are indexed by the
         # technosphere columns (processes).
         ci = lca.characterized_inventory  # biosphere flows x processes
-        col_contributions = np.asarray(ci.sum(axis=0)).ravel()
-        supply = np.asarray(lca.supply_array).ravel()
-        # drop the noise - the values that round to 0 and exist due to sparse matrix after run
-        for idx in np.argsort(np.abs(col_contributions))[::-1]:
-            direct_contribution = float(col_contributions[idx])
-            if abs(direct_contribution) < 1e-9:
-                continue
-            proc = bd.get_activity(lca.dicts.activity.reversed[idx])
-            meta = process_meta.get(proc.id, {})
-
-            # scale process supply to physical reference-product amount per
-            # functional unit (e.g. 1 kg food waste landfilled)
-            process_supply = supply[idx]
-            production_amount = meta.get("production_amount") or 1
-            product_amount = process_supply * production_amount
-            product_unit = meta.get("supply_unit", "")
-            emissions_per_unit_of_product = (
-                direct_contribution / product_amount if product_amount else None
+        detail_rows.extend(
+            contribution_rows(
+                activity["name"],
+                fu_label,
+                method,
+                np.asarray(ci.sum(axis=0)).ravel(),
+                np.asarray(lca.supply_array).ravel(),
+                column_meta,
             )
-
-            detail_rows.append({
-                "location": meta.get("location", proc.get("location", "")),
-                "process": activity["name"],
-                "activity": proc["name"],
-                "reference_product": meta.get("reference_product", ""),
-                "functional_unit": fu_label,
-                "product_amount": product_amount,
-                "product_amount_unit": product_unit,
-                "emissions_per_unit_of_product": emissions_per_unit_of_product,
-                "emissions_per_unit_of_product_unit": (
-                    f"{METHOD_UNIT} / {product_unit}" if product_unit else METHOD_UNIT
-                ),
-                "FlowAmount": direct_contribution,
-                "FlowAmount_unit": METHOD_UNIT,
-                "method": str(method),
-            })
+        )
 
     return pd.DataFrame(results), pd.DataFrame(detail_rows, columns=DETAIL_COLUMNS)
 
@@ -232,6 +280,7 @@ def write_lca_outputs(results_df, detail_df, config: dict[str, Any]) -> dict[str
     summary_name = out.get("summary_csv", "lcia_results_summary.csv")
     detail_name = out.get("detail_csv", "lcia_results_detail.csv")
 
+    ensure_dir(resultspath)
     results_path = resultspath / summary_name
     detail_path = resultspath / detail_name
 
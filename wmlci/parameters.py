@@ -0,0 +1,481 @@
+"""
+Parameter uncertainty for the model defaults.
+
+Entries of ``utils/model_defaults/global_defaults.yaml`` and
+``process_parameters.yaml`` are point values or mappings with a ``value``
+(the deterministic value) and a ``distribution``::
+
+    percentage_flaring:
+      value: 0.255514
+      distribution: triangular   # mode = value
+      minimum: 0.2
+      maximum: 0.3
+
+Supported distributions and their fields:
+
+- ``uniform``: ``minimum``, ``maximum``
+- ``triangular``: ``minimum``, ``maximum`` (mode is ``value``)
+- ``lognormal``: ``gsd``, the geometric standard deviation (median is ``value``)
+- ``normal``: ``sd``, optional ``minimum``/``maximum`` bounds (mean is ``value``)
+
+``build_parameter_model`` links every amountFormula exchange of a cleaned
+inventory to its entry in ``wmlci.matrices.InventoryMatrices``;
+``ParameterModel.sample`` draws a batch of parameter sets and evaluates the
+derived parameters and amountFormulas on whole arrays of draws at once.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+from scipy.stats import norm, triang, truncnorm
+
+from wmlci.editImporter import (
+    _evaluate_dependent_formulas,
+    _evaluate_expression,
+    _process_environment,
+    _python_expression,
+    model_parameter_environment,
+    read_model_defaults,
+)
+from wmlci.log import log
+
+# required fields of each distribution
+DISTRIBUTIONS = {
+    "uniform": ("minimum", "maximum"),
+    "triangular": ("minimum", "maximum"),
+    "lognormal": ("gsd",),
+    "normal": ("sd",),
+}
+
+_VECTOR_FUNCTIONS = {
+    "_where": np.where,
+    "_and": np.logical_and,
+    "_or": np.logical_or,
+    "_not": np.logical_not,
+}
+
+
+def validate_parameter_spec(name: str, spec: dict[str, Any]) -> dict[str, Any]:
+    """Check a parameter distribution mapping; returns it with float fields."""
+    kind = spec.get("distribution")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(
+            f"Parameter '{name}': unknown distribution {kind!r}, use one of "
+            f"{sorted(DISTRIBUTIONS)}"
+        )
+    missing = [f for f in ("value", *DISTRIBUTIONS[kind]) if spec.get(f) is None]
+    if missing:
+        raise ValueError(f"Parameter '{name}': {kind} distribution needs {missing}")
+    spec = {
+        k: (float(v) if k != "distribution" and v is not None else v)
+        for k, v in spec.items()
+    }
+    low, high = spec.get("minimum"), spec.get("maximum")
+    if low is not None and high is not None and not low <= spec["value"] <= high:
+        raise ValueError(
+            f"Parameter '{name}': value {spec['value']} outside "
+            f"[{low}, {high}]"
+        )
+    if kind == "lognormal" and (spec["gsd"] <= 1 or spec["value"] == 0):
+        raise ValueError(f"Parameter '{name}': lognormal needs gsd > 1 and value != 0")
+    if kind == "normal" and spec["sd"] <= 0:
+        raise ValueError(f"Parameter '{name}': normal needs sd > 0")
+    return spec
+
+
+def load_parameter_distributions(
+    config: dict[str, Any] | None = None,
+) -> tuple[dict[str, dict], dict[str, dict[str, dict]]]:
+    """
+    Distributions from the model default YAMLs, as ``(global, process)``
+    where process distributions are keyed by process name.
+
+    Parameters fixed by the method's ``global_parameter_overrides`` or
+    ``process_parameter_overrides`` are deterministic and left out.
+    """
+    config = config or {}
+    global_raw, process_raw = read_model_defaults()
+    global_overrides = set(config.get("global_parameter_overrides") or {})
+    process_overrides = config.get("process_parameter_overrides") or {}
+
+    global_specs = {
+        str(name): validate_parameter_spec(str(name), spec)
+        for name, spec in (global_raw.get("parameters") or {}).items()
+        if isinstance(spec, dict) and str(name) not in global_overrides
+    }
+    process_specs = {}
+    for process, params in (process_raw.get("process_parameters") or {}).items():
+        fixed = set(process_overrides.get(process) or {})
+        specs = {
+            str(name): validate_parameter_spec(f"{process}/{name}", spec)
+            for name, spec in (params or {}).items()
+            if isinstance(spec, dict) and str(name) not in fixed
+        }
+        if specs:
+            process_specs[str(process)] = specs
+    return global_specs, process_specs
+
+
+def sample_parameter(
+    spec: dict[str, Any], n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """``n`` draws of a validated parameter distribution."""
+    kind, value = spec["distribution"], spec["value"]
+    if kind == "uniform":
+        return rng.uniform(spec["minimum"], spec["maximum"], n)
+    if kind == "triangular":
+        return rng.triangular(spec["minimum"], value, spec["maximum"], n)
+    if kind == "lognormal":
+        return value * np.exp(rng.normal(0.0, np.log(spec["gsd"]), n))
+    low, high = spec.get("minimum"), spec.get("maximum")
+    if low is None and high is None:
+        return rng.normal(value, spec["sd"], n)
+    a = -np.inf if low is None else (low - value) / spec["sd"]
+    b = np.inf if high is None else (high - value) / spec["sd"]
+    return truncnorm.rvs(a, b, loc=value, scale=spec["sd"], size=n, random_state=rng)
+
+
+def parameter_ppf(spec: dict[str, Any], u: np.ndarray) -> np.ndarray:
+    """Quantiles of a validated parameter distribution at probabilities ``u``."""
+    kind, value = spec["distribution"], spec["value"]
+    if kind == "uniform":
+        return spec["minimum"] + u * (spec["maximum"] - spec["minimum"])
+    if kind == "triangular":
+        low, high = spec["minimum"], spec["maximum"]
+        if high == low:
+            return np.full_like(u, value, dtype=float)
+        return triang.ppf(u, (value - low) / (high - low), loc=low, scale=high - low)
+    if kind == "lognormal":
+        return value * np.exp(norm.ppf(u) * np.log(spec["gsd"]))
+    low, high = spec.get("minimum"), spec.get("maximum")
+    a = -np.inf if low is None else (low - value) / spec["sd"]
+    b = np.inf if high is None else (high - value) / spec["sd"]
+    return truncnorm.ppf(u, a, b, loc=value, scale=spec["sd"])
+
+
+class _Vectorize(ast.NodeTransformer):
+    """Rewrite conditionals and boolean logic to elementwise numpy calls."""
+
+    @staticmethod
+    def _call(name: str, *args: ast.expr) -> ast.Call:
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.Call:
+        self.generic_visit(node)
+        return self._call("_where", node.test, node.body, node.orelse)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.Call:
+        self.generic_visit(node)
+        name = "_and" if isinstance(node.op, ast.And) else "_or"
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = self._call(name, result, value)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.expr:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call("_not", node.operand)
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.expr:
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c -> (a < b) & (b < c)
+        left, parts = node.left, []
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = self._call("_and", result, part)
+        return result
+
+
+@lru_cache(maxsize=None)
+def compile_formula(py_expr: str):
+    """Compile a Python formula expression for evaluation on numpy arrays."""
+    tree = _Vectorize().visit(ast.parse(py_expr, mode="eval"))
+    return compile(ast.fix_missing_locations(tree), "<formula>", "eval")
+
+
+def _run(code, env: dict[str, Any]):
+    return eval(code, {"__builtins__": {}, **_VECTOR_FUNCTIONS}, env)  # noqa: S307
+
+
+def evaluate_formula_batch(formula: str, env: dict[str, Any]):
+    """Evaluate an openLCA formula where parameters may be arrays of draws."""
+    py_expr = _python_expression(formula, env)
+    try:
+        return _run(compile_formula(py_expr), env)
+    except Exception as exc:
+        raise ValueError(
+            f"Failed to evaluate formula '{formula}' (-> '{py_expr}'): {exc}"
+        ) from exc
+
+
+def _referenced_names(formulas: list[str], derived: dict[str, str]) -> set[str]:
+    """Lower-cased names ``formulas`` use, following ``derived`` formulas."""
+    derived = {name.lower(): formula for name, formula in derived.items()}
+    names: set[str] = set()
+    pending = list(formulas)
+    while pending:
+        for name in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", pending.pop()):
+            name = name.lower()
+            if name not in names:
+                names.add(name)
+                if name in derived:
+                    pending.append(derived[name])
+    return names
+
+
+class ParameterModel:
+    """
+    Parameter distributions and the amountFormula exchanges they drive.
+
+    Each formula exchange is stored as ``(expression, matrix, entry, scale)``:
+    its Python expression, the matrix and COO entry it fills, and the ratio
+    of the entry value to the formula at the deterministic parameters. The
+    ratio carries over unit conversion and the sign changes made while
+    cleaning (technosphere inputs, opposite direction approach, carbon
+    storage). Expressions are compiled on use (cached), so models pickle to
+    worker processes.
+
+    Formulas that are zero at the deterministic parameters have no such
+    reference value; each process lists their expressions in ``dropped``
+    and their entries stay fixed (see ``dropped_parameters``).
+
+    ``fixed_globals`` are the globals set by method overrides; each process
+    lists its ``defaults`` from ``process_parameters.yaml`` that are not
+    overridden.
+    """
+
+    def __init__(
+        self,
+        matrices,
+        global_values: dict[str, float],
+        global_derived: dict[str, str],
+        global_specs: dict[str, dict],
+        processes: list[dict[str, Any]],
+        fixed_globals: set[str] | None = None,
+    ) -> None:
+        self.matrices = matrices
+        self.global_values = global_values
+        self.global_derived = global_derived
+        self.global_specs = global_specs
+        self.processes = processes
+        self.fixed_globals = set(fixed_globals or ())
+
+    def __repr__(self) -> str:
+        return (
+            f"ParameterModel({self.n_distributions} distributions, "
+            f"{self.n_exchanges} formula exchanges)"
+        )
+
+    @property
+    def n_distributions(self) -> int:
+        return len(self.global_specs) + sum(len(p["specs"]) for p in self.processes)
+
+    @property
+    def n_exchanges(self) -> int:
+        return sum(len(p["exchanges"]) for p in self.processes)
+
+    @property
+    def varies_technosphere(self) -> bool:
+        """Whether sampled formulas change A (otherwise one factorization suffices)."""
+        return any(
+            matrix == "technosphere"
+            for p in self.processes
+            for _, matrix, _, _ in p["exchanges"]
+        )
+
+    def varying_processes(self) -> list[int]:
+        """Process columns with formula entries in A or B."""
+        return sorted({
+            int(getattr(self.matrices, f"{matrix}_coo")[1][entry])
+            for p in self.processes
+            for _, matrix, entry, _ in p["exchanges"]
+        })
+
+    def formula_names(self) -> set[str]:
+        """Lower-cased names referenced by the derived and exchange formulas."""
+        formulas = [*self.global_derived.values()]
+        for process in self.processes:
+            formulas.extend(process["formulas"].values())
+            formulas.extend(expr for expr, _, _, _ in process["exchanges"])
+        return {
+            name.lower()
+            for formula in formulas
+            for name in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", formula)
+        }
+
+    def dropped_parameters(self) -> set[str]:
+        """
+        Input parameters (global names or ``"process name/parameter"``) that
+        reach the matrices only through formulas that are zero at the
+        defaults, directly or through derived parameters. Scores do not
+        depend on them.
+        """
+        global_keys = {name.lower(): name for name in self.global_values}
+        kept, dropped = set(), set()
+        for process in self.processes:
+            derived = {**self.global_derived, **process["formulas"]}
+            local = {name.lower(): name for name in process["values"]}
+            for exprs, keys in (
+                ([expr for expr, _, _, _ in process["exchanges"]], kept),
+                (process.get("dropped", []), dropped),
+            ):
+                for name in _referenced_names(exprs, derived):
+                    if name in local:
+                        keys.add(f"{process['name']}/{local[name]}")
+                    elif name in global_keys:
+                        keys.add(global_keys[name])
+        return dropped - kept
+
+    def sample(
+        self, n: int, rng: np.random.Generator
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Draw ``n`` parameter sets and evaluate the formula exchanges.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Technosphere and biosphere entry values, shape (n, entries), in
+            the order of the matrices' COO arrays.
+        """
+        global_draws = {
+            name: sample_parameter(self.global_specs[name], n, rng)
+            for name in sorted(self.global_specs)
+        }
+        process_draws = [
+            {
+                name: sample_parameter(process["specs"][name], n, rng)
+                for name in sorted(process["specs"])
+            }
+            for process in self.processes
+        ]
+        return self.evaluate(n, global_draws, process_draws)
+
+    def evaluate(
+        self,
+        n: int,
+        global_values: dict[str, np.ndarray] | None = None,
+        process_values: list[dict[str, np.ndarray]] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the formula exchanges for ``n`` parameter sets.
+
+        ``global_values`` maps global names, and ``process_values`` (one dict
+        per entry of ``processes``) maps process parameter names, to arrays
+        of ``n`` values; other parameters keep their deterministic values.
+        Returns entry values like ``sample``.
+        """
+        values = {
+            "technosphere": np.tile(self.matrices.technosphere_coo[2], (n, 1)),
+            "biosphere": np.tile(self.matrices.biosphere_coo[2], (n, 1)),
+        }
+        env_global = _evaluate_dependent_formulas(
+            {**self.global_values, **(global_values or {})},
+            self.global_derived,
+            evaluate_formula_batch,
+        )
+        for k, process in enumerate(self.processes):
+            env = {**env_global, **process["values"]}
+            if process_values:
+                env.update(process_values[k])
+            env = _evaluate_dependent_formulas(
+                env, process["formulas"], evaluate_formula_batch
+            )
+            for expr, matrix, entry, scale in process["exchanges"]:
+                values[matrix][:, entry] = _run(compile_formula(expr), env) * scale
+        return values["technosphere"], values["biosphere"]
+
+
+def build_parameter_model(jsonld, matrices, config: dict[str, Any]) -> ParameterModel:
+    """
+    Link the amountFormula exchanges of a cleaned inventory to matrix entries.
+
+    Parameters
+    ----------
+    jsonld : bw2io.importers.json_ld.JSONLDImporter
+        The importer ``matrices`` was built from.
+    matrices : wmlci.matrices.InventoryMatrices
+    config : dict
+        Method config; overridden parameters stay deterministic.
+    """
+    global_values, global_derived, process_defaults = model_parameter_environment(
+        config
+    )
+    process_overrides = config.get("process_parameter_overrides") or {}
+    global_specs, process_specs = load_parameter_distributions(config)
+    env_global = _evaluate_dependent_formulas(global_values, global_derived)
+
+    processes, n_errors = [], 0
+    for ds in jsonld.data["processes"].values():
+        formula_exchanges = [
+            (matrices.entries[(ds["@id"], position)], exc["amountFormula"])
+            for position, exc in enumerate(ds["exchanges"])
+            if exc.get("amountFormula") and (ds["@id"], position) in matrices.entries
+        ]
+        if not formula_exchanges:
+            continue
+        proc_vals, proc_forms = _process_environment(
+            ds, process_defaults, process_overrides
+        )
+        try:
+            env = _evaluate_dependent_formulas({**env_global, **proc_vals}, proc_forms)
+        except Exception as exc:
+            n_errors += 1
+            log.warning(f"Skipping parameters of process {ds['name']!r}: {exc}")
+            continue
+
+        exchanges, dropped = [], []
+        for (matrix, entry), formula in formula_exchanges:
+            try:
+                point = _evaluate_expression(formula, env)
+            except Exception as exc:
+                n_errors += 1
+                log.warning(f"Skipping formula in process {ds['name']!r}: {exc}")
+                continue
+            if point == 0:
+                # no reference value to carry unit and sign over
+                dropped.append(_python_expression(formula, env))
+                continue
+            scale = getattr(matrices, f"{matrix}_coo")[2][entry] / point
+            exchanges.append((_python_expression(formula, env), matrix, entry, scale))
+        fixed = set(process_overrides.get(ds["name"]) or {})
+        processes.append({
+            "name": ds["name"],
+            "values": proc_vals,
+            "formulas": proc_forms,
+            "specs": process_specs.get(ds["name"], {}),
+            "defaults": sorted(
+                set(process_defaults.get(ds["name"]) or {}) - fixed
+            ),
+            "exchanges": exchanges,
+            "dropped": dropped,
+        })
+
+    model = ParameterModel(
+        matrices, global_values, global_derived, global_specs, processes,
+        fixed_globals=set(config.get("global_parameter_overrides") or {}),
+    )
+    n_zero = sum(len(p["dropped"]) for p in processes)
+    log.info(
+        f"Built {model} ({n_zero} formulas that are zero at the default "
+        f"parameters and {n_errors} failing formulas left fixed)"
+    )
+    unused = model.dropped_parameters()
+    if unused:
+        log.warning(
+            f"{len(unused)} parameters only enter formulas that are zero at the "
+            "default parameters, which stay fixed: " + ", ".join(sorted(unused))
+        )
+    return model
@@ -0,0 +1,419 @@
+"""
+Global sensitivity analysis of the model default parameters.
+
+Sobol indices are estimated from a Saltelli design: two quasi-random base
+samples ``A`` and ``B`` (scrambled Sobol sequence or Latin hypercube) and,
+for each parameter ``i``, ``A`` with column ``i`` taken from ``B``. That is
+``samples * (parameters + 2)`` model runs, which are evaluated in batches
+on the matrix engine: each batch evaluates the derived parameters and
+amountFormulas on arrays (``ParameterModel.evaluate``) and refactors one
+technosphere factorization on its fixed sparsity pattern per run. Batches
+can be spread over worker processes.
+
+First-order indices use the Saltelli (2010) estimator and total-order
+indices the Jansen estimator; confidence half-widths come from bootstrap
+resampling of the base rows.
+
+Parameters with a ``distribution`` in the model default YAMLs are sampled
+from it; with ``default_range`` set, every other parameter used by a formula
+is sampled uniformly within that relative range of its value. Settings are
+read from the ``sensitivity`` section of the method YAML::
+
+    sensitivity:
+      samples: 512        # base sample size (a power of two for sobol)
+      sampler: sobol      # or lhs
+      seed: 42
+      default_range: 0.1  # +/-10% for parameters without a distribution
+      workers: 4
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, qmc
+
+from wmlci.background import BackgroundStore
+from wmlci.log import log
+from wmlci.method_config import load_method_config
+from wmlci.monte_carlo import EntryScorer, prepare_parameter_model
+from wmlci.openlca import functional_unit_label
+from wmlci.parameters import ParameterModel, parameter_ppf
+from wmlci.settings import ensure_dir, resultspath
+from wmlci.trace import span, trace_run
+
+SENSITIVITY_DEFAULTS = {
+    "samples": 512,
+    "sampler": "sobol",
+    "seed": None,
+    "default_range": None,
+    "parameters": None,
+    "workers": None,
+    "batch_size": 256,
+    "bootstrap": 100,
+    "confidence": 0.95,
+}
+
+# per-process state of pool workers, set by _init_worker
+_WORKER: dict[str, Any] = {}
+
+
+def sensitivity_settings(config: dict[str, Any], **overrides: Any) -> dict[str, Any]:
+    """
+    Sensitivity settings from ``config["sensitivity"]`` over the defaults;
+    keyword arguments that are not None take precedence.
+    """
+    settings = {**SENSITIVITY_DEFAULTS, **(config.get("sensitivity") or {})}
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    if settings["seed"] is None:
+        settings["seed"] = int(np.random.SeedSequence().entropy % 2**32)
+    if not settings["workers"]:
+        settings["workers"] = os.cpu_count() or 1
+    if settings["sampler"] not in ("sobol", "lhs"):
+        raise ValueError(
+            f"Unknown sensitivity sampler '{settings['sampler']}', use 'sobol' or 'lhs'"
+        )
+    samples = int(settings["samples"])
+    if samples < 2:
+        raise ValueError("sensitivity samples must be at least 2")
+    if settings["sampler"] == "sobol" and samples & (samples - 1):
+        samples = 1 << samples.bit_length()
+        log.warning(f"Rounded sensitivity samples up to {samples} for the Sobol sequence")
+    settings["samples"] = samples
+    return settings
+
+
+def _range_spec(value: float, relative: float) -> dict[str, Any]:
+    low, high = sorted((value * (1 - relative), value * (1 + relative)))
+    return {"value": value, "distribution": "uniform", "minimum": low, "maximum": high}
+
+
+def sensitivity_factors(
+    model: ParameterModel, settings: dict[str, Any]
+) -> list[dict[str, Any]]:
+    """
+    Parameters to vary: those with a distribution, plus (with
+    ``default_range``) every other non-overridden model default that a
+    formula uses. ``settings["parameters"]`` optionally restricts the list to
+    global names or ``"process name/parameter"`` keys.
+
+    Each factor is a dict with ``name``, ``scope`` ("global" or the process
+    name), ``process`` (index into ``model.processes`` or None), ``spec``
+    and ``source`` ("distribution" or "default_range").
+    """
+    used = model.formula_names()
+    relative = settings["default_range"]
+    wanted = set(settings["parameters"] or [])
+
+    def factor(name, value, spec, scope, process):
+        if spec is not None:
+            source = "distribution"
+        elif relative and value and name.lower() in used:
+            spec, source = _range_spec(value, relative), "default_range"
+        else:
+            return None
+        key = name if process is None else f"{scope}/{name}"
+        if wanted and key not in wanted:
+            return None
+        return {
+            "name": name, "scope": scope, "process": process,
+            "spec": spec, "source": source,
+        }
+
+    factors = [
+        factor(name, value, model.global_specs.get(name), "global", None)
+        for name, value in sorted(model.global_values.items())
+        if name not in model.fixed_globals
+    ]
+    for k, process in enumerate(model.processes):
+        for name in sorted(set(process["specs"]) | set(process["defaults"])):
+            factors.append(
+                factor(
+                    name, process["values"].get(name),
+                    process["specs"].get(name), process["name"], k,
+                )
+            )
+    factors = [f for f in factors if f is not None]
+    dropped = model.dropped_parameters()
+    unused = [
+        key for key in (
+            f["name"] if f["process"] is None else f"{f['scope']}/{f['name']}"
+            for f in factors
+        )
+        if key in dropped
+    ]
+    if unused:
+        log.warning(
+            "Sensitivity parameters that only enter formulas that are zero at "
+            "the default parameters, which stay fixed (indices will be zero): "
+            + ", ".join(unused)
+        )
+    return factors
+
+
+def saltelli_design(
+    n_factors: int, samples: int, sampler: str, seed: int
+) -> np.ndarray:
+    """
+    Unit-hypercube Saltelli design, shape (samples * (n_factors + 2),
+    n_factors): rows of ``A``, then ``B``, then ``AB_i`` for each factor.
+    """
+    if sampler == "sobol":
+        base = qmc.Sobol(d=2 * n_factors, scramble=True, seed=seed).random(samples)
+    else:
+        base = qmc.LatinHypercube(d=2 * n_factors, seed=seed).random(samples)
+    a, b = base[:, :n_factors], base[:, n_factors:]
+    blocks = [a, b]
+    for i in range(n_factors):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    return np.vstack(blocks)
+
+
+def _evaluate_batch(
+    model: ParameterModel,
+    scorer: EntryScorer,
+    factors: list[dict[str, Any]],
+    values: np.ndarray,
+) -> np.ndarray:
+    """Scores for rows of factor values, shape (rows, scenarios)."""
+    global_values = {}
+    process_values = [{} for _ in model.processes]
+    for j, f in enumerate(factors):
+        if f["process"] is None:
+            global_values[f["name"]] = values[:, j]
+        else:
+            process_values[f["process"]][f["name"]] = values[:, j]
+    return scorer(*model.evaluate(len(values), global_values, process_values))
+
+
+def _init_worker(matrices, model, block, factors, store=None) -> None:
+    _WORKER.update(
+        model=model,
+        scorer=EntryScorer(
+            matrices, block, model.varies_technosphere, model.varying_processes(),
+            store,
+        ),
+        factors=factors,
+    )
+
+
+def _run_batch(values: np.ndarray) -> np.ndarray:
+    return _evaluate_batch(_WORKER["model"], _WORKER["scorer"], _WORKER["factors"], values)
+
+
+def evaluate_design(
+    matrices,
+    model,
+    block,
+    factors,
+    values: np.ndarray,
+    settings: dict[str, Any],
+    store: BackgroundStore | None = None,
+) -> np.ndarray:
+    """
+    Scores of every design row, shape (rows, scenarios), in row order.
+    ``store`` provides background inventories (``wmlci.background``).
+
+    Workers are spawned, so scripts calling this with more than one worker
+    need an ``if __name__ == "__main__":`` guard.
+    """
+    size = settings["batch_size"]
+    batches = [values[i:i + size] for i in range(0, len(values), size)]
+    workers = min(settings["workers"], len(batches))
+    if workers == 1:
+        _init_worker(matrices, model, block, factors, store)
+        return np.vstack([_run_batch(batch) for batch in batches])
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(matrices, model, block, factors, store),
+    ) as pool:
+        return np.vstack(list(pool.map(_run_batch, batches)))
+
+
+def sobol_indices(
+    scores: np.ndarray, n_factors: int, samples: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    First- and total-order indices from Saltelli design scores, each of
+    shape (factors, scenarios); NaN for scenarios with no variance.
+    """
+    # centered scores: the first-order estimator's variance grows with the mean
+    scores = scores - scores[:2 * samples].mean(axis=0)
+    f_a, f_b = scores[:samples], scores[samples:2 * samples]
+    f_ab = scores[2 * samples:].reshape(n_factors, samples, -1)
+    variance = np.var(np.vstack([f_a, f_b]), axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(variance > 0, variance, np.nan)
+        first = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+        total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance
+    return first, total
+
+
+def bootstrap_intervals(
+    scores: np.ndarray, n_factors: int, samples: int, settings: dict[str, Any]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Confidence half-widths of the indices from resampled base rows."""
+    rng = np.random.default_rng(settings["seed"])
+    blocks = scores.reshape(n_factors + 2, samples, -1)
+    first, total = [], []
+    for _ in range(settings["bootstrap"]):
+        rows = rng.integers(0, samples, samples)
+        s1, st = sobol_indices(
+            blocks[:, rows].reshape(-1, scores.shape[1]), n_factors, samples
+        )
+        first.append(s1)
+        total.append(st)
+    z = norm.ppf(0.5 + settings["confidence"] / 2)
+    with warnings.catch_warnings():
+        # scenarios without variance have all-NaN indices
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return (
+            z * np.nanstd(first, axis=0, ddof=1),
+            z * np.nanstd(total, axis=0, ddof=1),
+        )
+
+
+def summarize_indices(
+    factors, processes, first, total, first_conf, total_conf, settings, method
+) -> pd.DataFrame:
+    """One row per scenario and parameter, most influential (total order) first."""
+    rows = []
+    for j, (activity, product, process_settings) in enumerate(processes):
+        for i, f in enumerate(factors):
+            rows.append({
+                "process": activity["name"],
+                "functional_unit": functional_unit_label(
+                    product.get("name", ""), process_settings["functional_unit"]
+                ),
+                "method": str(method),
+                "parameter": f["name"],
+                "scope": f["scope"],
+                "source": f["source"],
+                "distribution": f["spec"]["distribution"],
+                "value": f["spec"]["value"],
+                "samples": settings["samples"],
+                "S1": float(first[i, j]),
+                "S1_conf": float(first_conf[i, j]),
+                "ST": float(total[i, j]),
+                "ST_conf": float(total_conf[i, j]),
+            })
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        summary = summary.sort_values(
+            ["process", "ST"], ascending=[True, False], kind="stable"
+        ).reset_index(drop=True)
+    return summary
+
+
+def run_sensitivity(
+    method_name: str,
+    samples: int | None = None,
+    seed: int | None = None,
+    workers: int | None = None,
+    default_range: float | None = None,
+    trace: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Sobol sensitivity indices of every configured scenario of a method YAML.
+
+    Parameters
+    ----------
+    method_name
+        Stem of a file in ``wmlci/methods/``.
+    samples, seed, workers, default_range
+        Override the ``sensitivity`` settings of the method YAML.
+    trace
+        Optional Chrome trace output path (see ``wmlci.trace``).
+
+    Returns
+    -------
+    dict
+        config, settings, factors, index DataFrame and output path.
+    """
+    with trace_run(trace):
+        with span("run_sensitivity", method=method_name):
+            config = load_method_config(method_name)
+            settings = sensitivity_settings(
+                config, samples=samples, seed=seed, workers=workers,
+                default_range=default_range,
+            )
+            method = tuple(config["lcia_method"])
+            matrices, model, processes, block = prepare_parameter_model(config)
+            factors = sensitivity_factors(model, settings)
+            if not factors:
+                raise ValueError(
+                    "No parameters to vary; add a 'distribution' to model "
+                    "defaults or set sensitivity default_range"
+                )
+            n, k = settings["samples"], len(factors)
+            design = saltelli_design(k, n, settings["sampler"], settings["seed"])
+            values = np.column_stack(
+                [parameter_ppf(f["spec"], design[:, i]) for i, f in enumerate(factors)]
+            )
+            log.info(
+                f"Sensitivity: {k} parameters, {len(values)} runs of "
+                f"{len(processes)} scenarios on {settings['workers']} workers "
+                f"({settings['sampler']}, seed {settings['seed']})"
+            )
+            with span("evaluate", runs=len(values)):
+                scores = evaluate_design(
+                    matrices, model, block, factors, values, settings,
+                    BackgroundStore.from_config(config),
+                )
+            first, total = sobol_indices(scores, k, n)
+            first_conf, total_conf = bootstrap_intervals(scores, k, n, settings)
+            summary = summarize_indices(
+                factors, processes, first, total, first_conf, total_conf,
+                settings, method,
+            )
+
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get(
+                "sensitivity_csv", "lcia_results_sensitivity.csv"
+            )
+            summary.to_csv(path, index=False)
+            log.info(f"Sensitivity indices written to {path}")
+
+    print("\nMost influential parameters (total-order index):")
+    print(
+        summary.groupby("process", sort=False).head(5)[
+            ["process", "parameter", "scope", "S1", "ST"]
+        ].to_string(index=False)
+    )
+    return {
+        "method": method_name,
+        "config": config,
+        "settings": settings,
+        "factors": factors,
+        "summary": summary,
+        "path": str(path),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.sensitivity",
+        description="Sobol sensitivity analysis of WMLCI model parameters.",
+    )
+    parser.add_argument("method", nargs="?", default="v16")
+    parser.add_argument("--samples", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--default-range", type=float)
+    args = parser.parse_args()
+    run_sensitivity(
+        args.method, args.samples, args.seed, args.workers, args.default_range
+    )
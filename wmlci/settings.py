@@ -1,11 +1,19 @@
+"""
+Package paths and metadata.
+
+Importing this module is cheap and has no side effects: it only builds
+paths. Data directories are created where files are written (``ensure_dir``),
+so the package also imports from a read-only install. The esupy ``paths`` object and the version metadata
+(``PKG_VERSION_NUMBER``, ``GIT_HASH_LONG``, ``GIT_HASH``, which run ``git``)
+are module attributes computed on first access, so config loading, CLI help
+and worker start-up do not pay for them.
+"""
+
+import functools
 import os
 import subprocess
-import tomllib
-from importlib.metadata import version
 from pathlib import Path
 
-from esupy.processed_data_mgmt import Paths, mkdir_if_missing
-
 MODULEPATH = Path(__file__).resolve().parent
 
 datapath = MODULEPATH / "data"
@@ -19,18 +27,11 @@ resultspath = datapath / "results"
 logoutputpath = datapath / "logs"
 error_logs_path = datapath / "error_logs"
 
-# "Paths()" are a class defined in esupy
-paths = Paths()
-paths.local_path = datapath
 
-# ensure directories exist
-for d in [
-    source_data_path,
-    resultspath,
-    logoutputpath,
-    error_logs_path,
-]:
-    mkdir_if_missing(d)
+def ensure_dir(path: Path) -> Path:
+    """Create directory ``path`` (and its parents) if missing; return it."""
+    path.mkdir(parents=True, exist_ok=True)
+    return path
 
 
 def return_pkg_version(MODULEPATH: Path, package_name: str) -> str:
@@ -61,9 +62,13 @@ def return_pkg_version(MODULEPATH: Path, package_name: str) -> str:
         pass
 
     # else return installed package version
+    from importlib.metadata import version
+
     try:
         return version(package_name)
     except Exception:
+        import tomllib
+
         with (MODULEPATH.parent / 'pyproject.toml').open('rb') as f:
             return tomllib.load(f)['project']['version']
 
@@ -90,9 +95,37 @@ def get_git_hash(MODULEPATH: Path, length: str = 'short') -> str | None:
 
 # metadata
 PKG = 'wmlci'
-PKG_VERSION_NUMBER = return_pkg_version(MODULEPATH, PKG)
-GIT_HASH_LONG = os.environ.get('GITHUB_SHA') or get_git_hash(MODULEPATH, 'long')
-GIT_HASH = GIT_HASH_LONG[:7] if GIT_HASH_LONG else None
 
 # Common declaration of write format for package data products
 WRITE_FORMAT = "csv"  # todo: change to parquet?
+
+
+def _esupy_paths():
+    # "Paths()" are a class defined in esupy
+    from esupy.processed_data_mgmt import Paths
+
+    paths = Paths()
+    paths.local_path = datapath
+    return paths
+
+
+@functools.cache
+def _git_hash_long() -> str | None:
+    return os.environ.get('GITHUB_SHA') or get_git_hash(MODULEPATH, 'long')
+
+
+_LAZY = {
+    'paths': _esupy_paths,
+    'PKG_VERSION_NUMBER': lambda: return_pkg_version(MODULEPATH, PKG),
+    'GIT_HASH_LONG': _git_hash_long,
+    'GIT_HASH': lambda: _git_hash_long()[:7] if _git_hash_long() else None,
+}
+
+
+def __getattr__(name):
+    """Compute ``paths`` and the version metadata on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _LAZY[name]()
+    globals()[name] = value
+    return value
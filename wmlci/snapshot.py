@@ -0,0 +1,246 @@
+"""
+Snapshots of fully imported Brightway projects.
+
+A snapshot is a compressed archive of a project directory (inventory and
+biosphere database, LCIA methods, processed datapackages) taken after
+``run_bw_lca`` has imported a method's sources. Snapshots are keyed by the
+source names, versions and data hashes plus the inputs that change
+imported amounts (parameter overrides, model defaults, strategy set,
+technosphere updates), so workers can restore or clone an identical project
+instead of re-importing it. The data hash of a source version is the tree
+hash recorded in its metadata JSON when it was extracted.
+
+Snapshots are written to ``wmlci/data/snapshots/`` unless the
+``WMLCI_SNAPSHOT_DIR`` environment variable points to a shared directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import bw2data as bd
+from bw2data.project import ProjectDataset
+from bw2data.utils import safe_filename
+
+from wmlci import settings
+from wmlci.extract.extract_common import jsonld_source_dir, load_extract_yaml
+from wmlci.extract.integrity import hash_tree, metadata_path
+from wmlci.linking import configured_updates
+from wmlci.log import log
+from wmlci.settings import datapath, extractpath, model_defaults_path, source_data_path
+
+SNAPSHOT_ENV_VAR = "WMLCI_SNAPSHOT_DIR"
+
+# project subdirectories that are not needed to run calculations
+_EXCLUDE = {"backups"}
+
+
+def snapshot_dir() -> Path:
+    """Directory holding snapshots; created if missing."""
+    path = Path(os.environ.get(SNAPSHOT_ENV_VAR) or datapath / "snapshots")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _source_version(name: str, version: str | None) -> str | None:
+    """Configured version, falling back to the extract yaml version."""
+    if version or not (extractpath / f"{name}.yaml").exists():
+        return version
+    return load_extract_yaml(name).get("version")
+
+
+def _source_hash(name: str, version: str | None) -> str | None:
+    """
+    Tree hash of the local data of a source version: the one recorded in its
+    metadata JSON (``wmlci.extract.integrity``), else hashed now. None when
+    the source is not downloaded.
+    """
+    directory = jsonld_source_dir(name, version)
+    if not directory.exists():
+        return None
+    # API downloads unzip into their version directory, next to the metadata
+    root = directory if directory.parent == source_data_path else directory.parent
+    meta_path = metadata_path(root)
+    if meta_path is not None:
+        recorded = json.loads(meta_path.read_text(encoding="utf-8")).get("integrity")
+        if recorded:
+            return recorded["tree"]
+    return hash_tree(root)["tree"]
+
+
+def snapshot_inputs(config: dict[str, Any]) -> dict[str, Any]:
+    """Everything that determines the contents of an imported project."""
+    defaults = {
+        p.name: hashlib.sha256(p.read_bytes()).hexdigest()
+        for p in sorted(model_defaults_path.glob("*.yaml"))
+    }
+    updates = configured_updates(config)
+    sources = {
+        (config["inventory_source"], config.get("inventory_source_version")),
+        (config["lcia_input"], config.get("lcia_input_version")),
+    }
+    sources.update(
+        (spec["data_source"], spec.get("data_version"))
+        for update in updates.values()
+        for spec in (update.get("technosphere_exchanges") or {}).values()
+    )
+    return {
+        "wmlci_version": settings.PKG_VERSION_NUMBER,
+        "inventory_source": config["inventory_source"],
+        "inventory_source_version": _source_version(
+            config["inventory_source"], config.get("inventory_source_version")
+        ),
+        "inventory_database": config["inventory_database"],
+        "lcia_input": config["lcia_input"],
+        "lcia_input_version": _source_version(
+            config["lcia_input"], config.get("lcia_input_version")
+        ),
+        "lcia_db_name": config["lcia_db_name"],
+        "strategy_set": config.get("strategy_set", "wmlci"),
+        "global_parameter_overrides": config.get("global_parameter_overrides") or {},
+        "process_parameter_overrides": config.get("process_parameter_overrides") or {},
+        "model_defaults": defaults,
+        "technosphere_updates": updates,
+        # the data itself, so a re-extracted or edited version gets a new key
+        "source_hashes": {
+            f"{name} {version or ''}".rstrip(): _source_hash(name, version)
+            for name, version in sorted(sources, key=lambda s: (s[0], s[1] or ""))
+        },
+    }
+
+
+def snapshot_key(config: dict[str, Any]) -> str:
+    """Short content hash of ``snapshot_inputs``."""
+    payload = json.dumps(snapshot_inputs(config), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_path(config: dict[str, Any]) -> Path:
+    """Archive path of the snapshot for a method config."""
+    name = safe_filename(config["bw_project_name"], add_hash=False)
+    return snapshot_dir() / f"{name}-{snapshot_key(config)}.tar.gz"
+
+
+def create_snapshot(config: dict[str, Any], project_name: str | None = None) -> Path:
+    """
+    Archive an imported project as the snapshot for ``config``.
+
+    Parameters
+    ----------
+    config : dict
+        Method config used to import the project.
+    project_name : str, optional
+        Project to archive; defaults to ``config["bw_project_name"]``.
+
+    Returns
+    -------
+    Path
+        Snapshot archive; a JSON sidecar records the snapshot inputs.
+    """
+    project_name = project_name or config["bw_project_name"]
+    if project_name not in bd.projects:
+        raise ValueError(f"Project {project_name} does not exist")
+    current = bd.projects.current
+    bd.projects.set_current(project_name)
+    project_dir = bd.projects.dir
+    if current != project_name:
+        bd.projects.set_current(current)
+
+    fp = snapshot_path(config)
+    # write to a temporary name so concurrent readers never see partial files
+    tmp = fp.with_name(f".{fp.name}.{os.getpid()}")
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        for child in sorted(project_dir.iterdir()):
+            if child.name not in _EXCLUDE:
+                tar.add(child, arcname=child.name)
+    os.replace(tmp, fp)
+    fp.with_suffix("").with_suffix(".json").write_text(
+        json.dumps(
+            {
+                "project": project_name,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "inputs": snapshot_inputs(config),
+            },
+            indent=2,
+            default=str,
+        )
+    )
+    log.info(
+        f"Saved snapshot of project '{project_name}' to {fp} "
+        f"({fp.stat().st_size / 1e6:.1f} MB)"
+    )
+    return fp
+
+
+def restore_snapshot(
+    fp: str | Path,
+    project_name: str,
+    overwrite: bool = False,
+    switch: bool = True,
+) -> str:
+    """
+    Restore a snapshot archive as project ``project_name``.
+
+    The archive is extracted straight into the new project directory before
+    the project is registered, so no imported data is re-processed. Use a
+    new name per worker to clone one snapshot into many projects.
+    """
+    fp = Path(fp)
+    if not fp.is_file():
+        raise FileNotFoundError(f"Snapshot not found: {fp}")
+    if project_name in bd.projects:
+        if not overwrite:
+            raise ValueError(
+                f"Project {project_name} already exists, set overwrite=True "
+                "to replace it"
+            )
+        if bd.projects.current == project_name:
+            bd.projects.set_current("default")
+        bd.projects.delete_project(project_name, delete_dir=True)
+
+    project_dir = bd.projects._base_data_dir / safe_filename(project_name)
+    if project_dir.exists():
+        shutil.rmtree(project_dir)
+    # extract next to the target, then move into place in one step
+    tmp = Path(tempfile.mkdtemp(dir=bd.projects._base_data_dir))
+    try:
+        with tarfile.open(fp, "r:gz") as tar:
+            tar.extractall(tmp, filter="data")
+        tmp.rename(project_dir)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    ProjectDataset.create(data={"25": True}, name=project_name, full_hash=False)
+
+    current = bd.projects.current
+    bd.projects.set_current(project_name)
+    if not switch:
+        bd.projects.set_current(current)
+    log.info(f"Restored project '{project_name}' from snapshot {fp}")
+    return project_name
+
+
+def clone_snapshot(config: dict[str, Any], project_name: str) -> str:
+    """Restore the snapshot for ``config`` under a new project name."""
+    return restore_snapshot(snapshot_path(config), project_name, overwrite=True)
+
+
+def restore_snapshot_for_config(config: dict[str, Any]) -> bool:
+    """
+    Restore ``config["bw_project_name"]`` from its snapshot if one exists.
+    Returns False when there is no snapshot for the current inputs.
+    """
+    fp = snapshot_path(config)
+    if not fp.exists():
+        log.info(f"No project snapshot at {fp}, importing sources")
+        return False
+    restore_snapshot(fp, config["bw_project_name"], overwrite=True)
+    return True
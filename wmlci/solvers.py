@@ -0,0 +1,362 @@
+"""
+Sparse linear solvers for technosphere systems.
+
+``Factorization`` factorizes a square technosphere matrix once and reuses it
+for any number of demand vectors, using PARDISO (``pypardiso``) when it is
+installed and SuperLU (``scipy.sparse.linalg.splu``) otherwise.
+
+Supply chains are mostly acyclic: only recycling loops and some energy
+loops create cycles. ``analyze_structure`` pairs every row with a column
+(a structural matching), finds the strongly connected components of the
+resulting graph and orders them into levels of a block-triangular form.
+``BlockTriangularFactorization`` then solves singleton blocks by
+substitution, a whole level at a time, and factorizes only the cyclic
+blocks, with SuperLU, UMFPACK (``scikits.umfpack``) or PARDISO by block
+size. ``factorize`` picks it over a general factorization when most of the
+matrix is acyclic.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components, maximum_bipartite_matching
+from scipy.sparse.linalg import splu
+
+from wmlci.log import log
+
+try:
+    from pypardiso import PyPardisoSolver
+except ImportError:  # pypardiso has no wheels for ARM
+    PyPardisoSolver = None
+
+try:
+    from scikits.umfpack import splu as umfpack_splu
+except ImportError:
+    umfpack_splu = None
+
+# cyclic blocks up to this size use SuperLU, larger ones UMFPACK up to
+# LARGE_BLOCK, then PARDISO (when installed)
+SMALL_BLOCK = 200
+LARGE_BLOCK = 5000
+# PyPardisoSolver internals Factorization.refactor uses to skip the
+# symbolic analysis (pypardiso 0.4)
+_PARDISO_INTERNALS = (
+    "_hash_csr_matrix", "size_limit_storage", "factorized_A", "set_phase", "_call_pardiso"
+)
+# factorize() uses the block-triangular solver up to this share of rows in
+# cyclic blocks
+MAX_CYCLIC_SHARE = 0.5
+
+
+class Factorization:
+    """
+    Factorized square sparse matrix.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse matrix
+        Square, nonsingular matrix (e.g. the technosphere matrix A).
+    backend : str, optional
+        'pardiso', 'umfpack' or 'splu'; defaults to 'pardiso' when pypardiso
+        is available.
+    """
+
+    def __init__(self, matrix, backend: str | None = None) -> None:
+        if matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Matrix must be square, got shape {matrix.shape}")
+        self.backend = backend or ("pardiso" if PyPardisoSolver else "splu")
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self._transpose: Factorization | None = None
+        if self.backend == "pardiso":
+            if PyPardisoSolver is None:
+                raise ImportError("pypardiso is not installed")
+            self._solver = PyPardisoSolver()
+            self._solver.factorize(self.matrix)
+        elif self.backend == "umfpack":
+            if umfpack_splu is None:
+                raise ImportError("scikit-umfpack is not installed")
+            self._lu = umfpack_splu(self.matrix.tocsc())
+        elif self.backend == "splu":
+            self._lu = splu(self.matrix.tocsc())
+        else:
+            raise ValueError(f"Unknown solver backend '{self.backend}'")
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.matrix.shape
+
+    def solve(self, b: np.ndarray) -> np.ndarray:
+        """Solve ``A x = b`` for a vector or a (n, k) block of right-hand sides."""
+        b = np.asarray(b, dtype=np.float64)
+        if self.backend == "pardiso":
+            return self._solver.solve(self.matrix, b)
+        if self.backend == "umfpack" and b.ndim == 2:
+            return np.column_stack([self._lu.solve(col) for col in b.T])
+        return self._lu.solve(b)
+
+    def refactor(self, matrix) -> None:
+        """
+        Factorize new values with the sparsity pattern of the current matrix.
+
+        PARDISO reuses its symbolic analysis and only redoes the numerical
+        factorization (through pypardiso internals, when they are present);
+        SuperLU factorizes from scratch.
+        """
+        matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        if not (
+            matrix.shape == self.shape
+            and np.array_equal(matrix.indptr, self.matrix.indptr)
+            and np.array_equal(matrix.indices, self.matrix.indices)
+        ):
+            raise ValueError("refactor needs the sparsity pattern of the factorized matrix")
+        self.matrix = matrix
+        self._transpose = None
+        if self.backend == "splu":
+            self._lu = splu(matrix.tocsc())
+            return
+        if self.backend == "umfpack":
+            self._lu = umfpack_splu(matrix.tocsc())
+            return
+        solver = self._solver
+        if not all(hasattr(solver, name) for name in _PARDISO_INTERNALS):
+            # pypardiso internals changed; factorize from scratch
+            solver.factorize(matrix)
+            return
+        solver.factorized_A = (
+            solver._hash_csr_matrix(matrix)
+            if matrix.nnz > solver.size_limit_storage
+            else matrix.copy()
+        )
+        solver.set_phase(22)
+        solver._call_pardiso(matrix, np.zeros((matrix.shape[0], 1)))
+
+    def solve_transpose(self, b: np.ndarray) -> np.ndarray:
+        """Solve ``A^T x = b``, e.g. for adjoint (row-wise) sensitivities."""
+        b = np.asarray(b, dtype=np.float64)
+        if self.backend == "splu":
+            return self._lu.solve(b, trans="T")
+        if self._transpose is None:
+            self._transpose = Factorization(self.matrix.T, backend=self.backend)
+        return self._transpose.solve(b)
+
+
+def block_backend(size: int) -> str:
+    """Solver backend for a cyclic block of ``size`` rows."""
+    if size <= SMALL_BLOCK:
+        return "splu"
+    if size <= LARGE_BLOCK and umfpack_splu is not None:
+        return "umfpack"
+    if PyPardisoSolver is not None:
+        return "pardiso"
+    return "umfpack" if umfpack_splu is not None else "splu"
+
+
+class MatrixStructure:
+    """
+    Block-triangular structure of a square sparse matrix.
+
+    Attributes
+    ----------
+    matching : np.ndarray
+        Column paired with each row; ``A[:, matching]`` has a structurally
+        nonzero diagonal.
+    labels : np.ndarray
+        Strongly connected component (block) of each row of ``A[:, matching]``.
+    levels : np.ndarray
+        Level of each block: a block only depends on blocks of lower levels.
+    sizes : np.ndarray
+        Rows per block.
+    """
+
+    def __init__(self, shape, nnz, matching, labels, levels, sizes) -> None:
+        self.shape = shape
+        self.nnz = nnz
+        self.matching = matching
+        self.labels = labels
+        self.levels = levels
+        self.sizes = sizes
+
+    @property
+    def n_levels(self) -> int:
+        return int(self.levels.max()) + 1 if len(self.levels) else 0
+
+    @property
+    def cyclic_blocks(self) -> np.ndarray:
+        return np.flatnonzero(self.sizes > 1)
+
+    @property
+    def cyclic_share(self) -> float:
+        """Share of rows in cyclic blocks (0 for an acyclic matrix)."""
+        return float(self.sizes[self.sizes > 1].sum() / max(self.shape[0], 1))
+
+    @property
+    def strategy(self) -> str:
+        return "block-triangular" if self.cyclic_share <= MAX_CYCLIC_SHARE else "general"
+
+    def __repr__(self) -> str:
+        cyclic = self.sizes[self.sizes > 1]
+        backends = {}
+        for size in cyclic:
+            backend = block_backend(int(size))
+            backends[backend] = backends.get(backend, 0) + 1
+        return (
+            f"MatrixStructure({self.shape[0]} x {self.shape[1]}, {self.nnz} nonzeros, "
+            f"{len(self.sizes)} blocks in {self.n_levels} levels, "
+            f"{len(cyclic)} cyclic blocks (largest {int(cyclic.max()) if len(cyclic) else 0}, "
+            f"{self.cyclic_share:.1%} of rows, backends {backends}), "
+            f"strategy {self.strategy})"
+        )
+
+
+def analyze_structure(matrix) -> MatrixStructure:
+    """
+    Pair rows with columns, find the strongly connected components of the
+    permuted matrix and order them into dependency levels.
+
+    Raises
+    ------
+    ValueError
+        If the matrix is not square or structurally singular.
+    """
+    csr = sparse.csr_matrix(matrix)
+    if csr.shape[0] != csr.shape[1]:
+        raise ValueError(f"Matrix must be square, got shape {csr.shape}")
+    matching = maximum_bipartite_matching(csr, perm_type="column")
+    if (matching < 0).any():
+        raise ValueError("Matrix is structurally singular")
+    permuted = csr[:, matching].tocoo()
+    n_blocks, labels = connected_components(
+        permuted, directed=True, connection="strong"
+    )
+    off = labels[permuted.row] != labels[permuted.col]
+    dependent, dependency = labels[permuted.row[off]], labels[permuted.col[off]]
+    levels = np.zeros(n_blocks, dtype=np.int64)
+    # longest path in the block DAG: one relaxation per level
+    while True:
+        updated = levels.copy()
+        np.maximum.at(updated, dependent, levels[dependency] + 1)
+        if np.array_equal(updated, levels):
+            break
+        levels = updated
+    return MatrixStructure(
+        csr.shape, csr.nnz, matching, labels, levels,
+        np.bincount(labels, minlength=n_blocks),
+    )
+
+
+class BlockTriangularFactorization:
+    """
+    Factorization of a square sparse matrix in block-triangular form.
+
+    Rows are solved a level at a time: singleton blocks by substitution with
+    the solutions of lower levels, cyclic blocks with their own
+    ``Factorization`` (backend by ``block_backend``).
+
+    Parameters
+    ----------
+    matrix : scipy.sparse matrix
+        Square, nonsingular matrix.
+    structure : MatrixStructure, optional
+        Result of ``analyze_structure(matrix)``, computed when not given.
+    """
+
+    def __init__(self, matrix, structure: MatrixStructure | None = None) -> None:
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.structure = structure or analyze_structure(self.matrix)
+        s = self.structure
+        permuted = self.matrix[:, s.matching].tocoo()
+        same = s.labels[permuted.row] == s.labels[permuted.col]
+        n = self.shape[0]
+        self._off = sparse.csr_matrix(
+            (permuted.data[~same], (permuted.row[~same], permuted.col[~same])),
+            shape=(n, n),
+        )
+        inner = sparse.csr_matrix(
+            (permuted.data[same], (permuted.row[same], permuted.col[same])),
+            shape=(n, n),
+        )
+        row_levels = s.levels[s.labels]
+        order = np.argsort(row_levels, kind="stable")
+        bounds = np.searchsorted(row_levels[order], np.arange(s.n_levels + 1))
+        singleton = s.sizes[s.labels] == 1
+        diagonal = inner.diagonal()
+        self._levels = []
+        for level in range(s.n_levels):
+            rows = order[bounds[level]:bounds[level + 1]]
+            singles = np.flatnonzero(singleton[rows])
+            if np.any(diagonal[rows[singles]] == 0):
+                raise ValueError("Matrix is singular (zero pivot in an acyclic row)")
+            cyclic = []
+            for label in np.unique(s.labels[rows[~singleton[rows]]]):
+                positions = np.flatnonzero(s.labels[rows] == label)
+                block = rows[positions]
+                cyclic.append((
+                    positions,
+                    Factorization(inner[block][:, block], backend=block_backend(len(block))),
+                ))
+            self._levels.append((rows, singles, diagonal[rows[singles]], cyclic))
+        self._off_rows = [self._off[rows] for rows, _, _, _ in self._levels]
+        self._off_rows_transpose = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.matrix.shape
+
+    def _sweep(self, rhs: np.ndarray, transpose: bool) -> np.ndarray:
+        """Solve level by level: upwards for ``A``, downwards for ``A^T``."""
+        if transpose and self._off_rows_transpose is None:
+            off = self._off.T.tocsr()
+            self._off_rows_transpose = [off[rows] for rows, _, _, _ in self._levels]
+        off_rows = self._off_rows_transpose if transpose else self._off_rows
+        x = np.zeros_like(rhs)
+        levels = list(zip(self._levels, off_rows))
+        for (rows, singles, diagonal, cyclic), off in levels[::-1] if transpose else levels:
+            r = rhs[rows] - off @ x
+            x[rows[singles]] = (r[singles].T / diagonal).T
+            for positions, factorization in cyclic:
+                solve = factorization.solve_transpose if transpose else factorization.solve
+                x[rows[positions]] = solve(r[positions]).reshape(r[positions].shape)
+        return x
+
+    def solve(self, b: np.ndarray) -> np.ndarray:
+        """Solve ``A x = b`` for a vector or a (n, k) block of right-hand sides."""
+        b = np.asarray(b, dtype=np.float64)
+        permuted = self._sweep(b, transpose=False)
+        x = np.empty_like(permuted)
+        x[self.structure.matching] = permuted
+        return x
+
+    def solve_transpose(self, b: np.ndarray) -> np.ndarray:
+        """Solve ``A^T x = b``."""
+        b = np.asarray(b, dtype=np.float64)
+        return self._sweep(b[self.structure.matching], transpose=True)
+
+    def refactor(self, matrix) -> None:
+        """Factorize new values with the sparsity pattern of the current matrix."""
+        matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        if not (
+            matrix.shape == self.shape
+            and np.array_equal(matrix.indptr, self.matrix.indptr)
+            and np.array_equal(matrix.indices, self.matrix.indices)
+        ):
+            raise ValueError("refactor needs the sparsity pattern of the factorized matrix")
+        self.__init__(matrix, self.structure)
+
+
+def factorize(
+    matrix, backend: str | None = None
+) -> Factorization | BlockTriangularFactorization:
+    """
+    Factorize ``matrix`` once for repeated solves.
+
+    Without a ``backend``, the structure is analyzed first and mostly
+    acyclic matrices get a ``BlockTriangularFactorization``.
+    """
+    if backend is not None:
+        return Factorization(matrix, backend=backend)
+    structure = analyze_structure(matrix)
+    log.info(f"Solver selection: {structure}")
+    if structure.strategy == "block-triangular":
+        return BlockTriangularFactorization(matrix, structure)
+    return Factorization(matrix)
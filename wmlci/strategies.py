@@ -0,0 +1,153 @@
+"""
+WMLCI strategy set for bw2io JSON-LD imports.
+
+``JSONLDImporter.strategies`` is bw2io's generic list for any openLCA export.
+After ``clean_JSONLD_sourceData`` some of those steps are redundant, so the
+WMLCI set declares which strategies run, which are skipped and why, and which
+only run when the data needs them. ``check_strategy_equivalence`` compares
+the database written by both lists.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Callable
+
+from bw2io.strategies.json_ld_allocation import allocation_needed
+
+from wmlci.jsonld_loader import apply_strategies, strategy_name
+from wmlci.log import log
+
+# strategies run for WMLCI inventories, in JSONLDImporter order
+WMLCI_STRATEGIES = [
+    "json_ld_allocate_datasets",
+    "json_ld_convert_unit_to_reference_unit",
+    "json_ld_get_activities_list_from_rawdata",
+    "json_ld_add_products_as_activities",
+    "json_ld_add_activity_unit",
+    "json_ld_rename_metadata_fields",
+    "json_ld_location_name",
+    "json_ld_remove_fields",
+    "json_ld_fix_process_type",
+    "json_ld_label_exchange_type",
+    "json_ld_prepare_exchange_fields_for_linking",
+    "add_database_name",
+    "link_iterable_by_fields",
+    "normalize_units",
+]
+
+# bw2io strategies that never change a WMLCI database, with the reason
+SKIPPED_STRATEGIES = {
+    "json_ld_get_normalized_exchange_locations": (
+        "only rewrites exchange flow references, which "
+        "json_ld_prepare_exchange_fields_for_linking drops; exchange "
+        "locations are set by replace_exchange_locations"
+    ),
+    "json_ld_get_normalized_exchange_units": (
+        "normalize_units normalizes the same exchange units at the end"
+    ),
+}
+
+
+def _needs_allocation(data: dict[str, Any]) -> bool:
+    # split_multi_product_processes and remove_process_allocation_factors
+    # leave allocation factors only on processes that could not be split
+    return any(allocation_needed(ds) for ds in data["processes"].values())
+
+
+# strategies that only run when their precondition holds on the cleaned data
+CONDITIONAL_STRATEGIES: dict[str, Callable[[dict[str, Any]], bool]] = {
+    "json_ld_allocate_datasets": _needs_allocation,
+}
+
+
+def wmlci_strategies(jsonld) -> list:
+    """
+    Select the WMLCI strategy set from a JSONLDImporter's strategy list,
+    keeping bw2io's bound arguments (products, biosphere database, ...).
+
+    Raises ValueError if bw2io declares a strategy this module does not
+    account for, so new upstream steps are not dropped silently.
+    """
+    unknown = {
+        strategy_name(s) for s in jsonld.strategies
+    } - set(WMLCI_STRATEGIES) - set(SKIPPED_STRATEGIES)
+    if unknown:
+        raise ValueError(
+            f"bw2io strategies not declared in the WMLCI strategy set: "
+            f"{sorted(unknown)}"
+        )
+
+    selected = []
+    for strategy in jsonld.strategies:
+        name = strategy_name(strategy)
+        if name in SKIPPED_STRATEGIES:
+            log.debug(f"Skipping {name}: {SKIPPED_STRATEGIES[name]}")
+            continue
+        precondition = CONDITIONAL_STRATEGIES.get(name)
+        if precondition is not None and not precondition(jsonld.data):
+            log.info(f"Skipping {name}: not needed for this inventory")
+            continue
+        selected.append(strategy)
+    return selected
+
+
+def select_strategies(jsonld, strategy_set: str = "wmlci") -> list:
+    """Strategies for ``strategy_set``: 'wmlci' (default) or 'bw2io'."""
+    if strategy_set == "bw2io":
+        return list(jsonld.strategies)
+    if strategy_set == "wmlci":
+        return wmlci_strategies(jsonld)
+    raise ValueError(
+        f"Unknown strategy_set '{strategy_set}', use 'wmlci' or 'bw2io'"
+    )
+
+
+def check_strategy_equivalence(jsonld) -> bool:
+    """
+    Apply the bw2io default strategies and the WMLCI set to copies of a
+    cleaned importer and compare the resulting datasets.
+
+    Parameters
+    ----------
+    jsonld : bw2io.importers.json_ld.JSONLDImporter
+        Importer after ``clean_JSONLD_sourceData``; it is not modified.
+
+    Returns
+    -------
+    bool
+        True if both lists produce identical datasets.
+    """
+    reference = copy.deepcopy(jsonld)
+    lean = copy.deepcopy(jsonld)
+    apply_strategies(reference, reference.strategies)
+    apply_strategies(lean, wmlci_strategies(lean))
+
+    expected = {ds["code"]: ds for ds in reference.data}
+    actual = {ds["code"]: ds for ds in lean.data}
+    differences = sorted(set(expected) ^ set(actual))
+    differences += sorted(
+        code for code in set(expected) & set(actual)
+        if expected[code] != actual[code]
+    )
+    if differences:
+        log.warning(
+            f"WMLCI strategy set differs from bw2io defaults for "
+            f"{len(differences)} datasets, e.g. {differences[:5]}"
+        )
+        return False
+    log.info(
+        f"WMLCI strategy set matches bw2io defaults for {len(expected)} datasets"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+
+    from wmlci.lca import prepare_inventory
+    from wmlci.method_config import load_method_config
+
+    method = sys.argv[1] if len(sys.argv) > 1 else "wmlci_pilot"
+    ok = check_strategy_equivalence(prepare_inventory(load_method_config(method)))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,250 @@
+"""
+Opt-in tracing of WMLCI runs as Chrome trace event JSON.
+
+Spans are recorded as complete ("X") events with process and thread ids, so
+nesting and concurrency are visible when the trace file is opened in
+``chrome://tracing``, https://ui.perfetto.dev or https://www.speedscope.app.
+
+Tracing is off unless a tracer is started, either with
+``run_bw_lca(..., trace=path)`` or by setting the ``WMLCI_TRACE`` environment
+variable to an output path. ``WMLCI_TRACE_SAMPLE_INTERVAL`` (seconds) adds a
+sampling profiler that writes collapsed stacks next to the trace, which can be
+rendered as a flamegraph (flamegraph.pl, speedscope, inferno).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Iterator
+
+from wmlci.log import log
+
+TRACE_ENV_VAR = "WMLCI_TRACE"
+SAMPLE_ENV_VAR = "WMLCI_TRACE_SAMPLE_INTERVAL"
+
+_active: Tracer | None = None
+
+
+class StackSampler:
+    """
+    Sampling profiler hook: periodically records the call stack of the traced
+    thread and writes the counts as collapsed stacks (``frame;frame;frame n``).
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = float(interval)
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target: int | None = None
+
+    def start(self, tracer: Tracer) -> None:
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="wmlci-stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({Path(code.co_filename).name}:"
+                    f"{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, tracer: Tracer) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if tracer.path is None or not self.stacks:
+            return
+        folded = tracer.path.with_suffix(".folded")
+        with folded.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        log.info(
+            f"Wrote {sum(self.stacks.values())} stack samples to {folded}"
+        )
+
+
+class Tracer:
+    """
+    Collect nested spans and write them as Chrome trace event JSON.
+
+    ``path`` may be None to keep events in memory only (e.g. for benchmarks
+    that read stage durations back with ``stage_durations``).
+    ``hooks`` are profiler objects with ``start(tracer)`` and ``stop(tracer)``
+    methods, such as ``StackSampler``.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        hooks: list[Any] | None = None,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.hooks = list(hooks or [])
+        self.events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.perf_counter()
+        self.pid = os.getpid()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args: Any) -> Iterator[None]:
+        stack = self._stack()
+        stack.append(name)
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            end = self._now_us()
+            stack.pop()
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": end - start,
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+                "args": {"depth": len(stack), **args},
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def instant(self, name: str, cat: str = "mark", **args: Any) -> None:
+        with self._lock:
+            self.events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "i",
+                "s": "t",
+                "ts": self._now_us(),
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+
+    def start(self) -> None:
+        for hook in self.hooks:
+            hook.start(self)
+
+    def stop(self) -> None:
+        for hook in self.hooks:
+            hook.stop(self)
+        if self.path is not None:
+            self.write()
+        self.log_summary()
+
+    def write(self) -> Path:
+        """Write the trace file; thread names are added as metadata events."""
+        meta = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": t.ident,
+                "args": {"name": t.name},
+            }
+            for t in threading.enumerate()
+        ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, f
+            )
+        log.info(f"Wrote {len(self.events)} trace events to {self.path}")
+        return self.path
+
+    def stage_durations(self, cat: str | None = None) -> dict[str, float]:
+        """Total seconds per span name, optionally limited to one category."""
+        totals: dict[str, float] = {}
+        for e in self.events:
+            if e["ph"] != "X" or (cat is not None and e["cat"] != cat):
+                continue
+            totals[e["name"]] = totals.get(e["name"], 0.0) + e["dur"] / 1e6
+        return totals
+
+    def log_summary(self) -> None:
+        """Log durations of the top-level pipeline stages."""
+        top = [e for e in self.events if e["ph"] == "X" and e["args"]["depth"] <= 1]
+        if not top:
+            return
+        lines = [
+            f"  {'  ' * e['args']['depth']}{e['name']}: {e['dur'] / 1e6:.2f} s"
+            for e in sorted(top, key=lambda e: e["ts"])
+        ]
+        log.info("Stage timings:\n" + "\n".join(lines))
+
+
+def span(name: str, cat: str = "stage", **args: Any):
+    """Span context manager on the active tracer; no-op when tracing is off."""
+    if _active is None:
+        return nullcontext()
+    return _active.span(name, cat, **args)
+
+
+def active_tracer() -> Tracer | None:
+    return _active
+
+
+@contextmanager
+def trace_run(
+    path: str | Path | None = None,
+    sample_interval: float | None = None,
+    tracer: Tracer | None = None,
+) -> Iterator[Tracer | None]:
+    """
+    Activate a tracer for the duration of a run.
+
+    Falls back to the ``WMLCI_TRACE`` and ``WMLCI_TRACE_SAMPLE_INTERVAL``
+    environment variables; yields None (tracing off) if neither a path nor a
+    tracer is given. Nested calls reuse the already active tracer.
+    """
+    global _active
+    if _active is not None:
+        yield _active
+        return
+
+    path = path or os.environ.get(TRACE_ENV_VAR)
+    if tracer is None and not path:
+        yield None
+        return
+    if sample_interval is None and os.environ.get(SAMPLE_ENV_VAR):
+        sample_interval = float(os.environ[SAMPLE_ENV_VAR])
+    if tracer is None:
+        hooks = [StackSampler(sample_interval)] if sample_interval else []
+        tracer = Tracer(path, hooks=hooks)
+
+    _active = tracer
+    tracer.start()
+    try:
+        yield tracer
+    finally:
+        _active = None
+        tracer.stop()
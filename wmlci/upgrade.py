@@ -0,0 +1,639 @@
+"""
+Incremental upgrades of an imported inventory to a new source release.
+
+``diff_releases`` content-hashes every JSON-LD entity of two releases of a
+source (``lastChange`` and ``version`` stamps excluded) and classifies them
+as added, removed or changed. Hashes are kept per release in
+``wmlci/data/release_manifests/`` so each release is only read once.
+
+``run_upgrade`` then moves a method's Brightway database to the new release
+without re-importing it: the new release goes through the usual WMLCI
+preparation and bw2io strategies in memory, and only the nodes whose
+prepared datasets differ from the written ones (node hashes saved next to
+the processed datapackage by ``wmlci.lca.write_inventory``) are deleted,
+inserted or replaced in SQLite. The processed datapackage is patched the
+same way: entries of replaced and removed nodes are dropped and entries of
+the new datasets appended. Changed nodes keep their ids.
+
+WMLCI cleaning works on the whole graph (FEDEFL remapping, removal of
+impact-free processes), so a changed entity can change nodes it does not
+contain; comparing prepared datasets catches those. A human-readable change
+report (Markdown) lists the entity changes, exchange by exchange for
+processes, and the nodes written.
+
+Usage::
+
+    python -m wmlci.upgrade wmlci_pilot 1.2026-09.0
+    python -m wmlci.upgrade wmlci_pilot 1.2026-09.0 --from 1.2026-06.0 --report-only
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+import bw2data as bd
+import numpy as np
+from bw2data import databases, geomapping
+from bw2data.backends import sqlite3_lci_db
+from bw2data.backends.schema import ActivityDataset, ExchangeDataset
+from bw2data.backends.utils import dict_as_activitydataset, dict_as_exchangedataset
+from bw2data.errors import InvalidExchange, UntypedExchange
+from bw2data.search import IndexManager
+from bw2data.utils import get_geocollection, safe_filename, set_correct_process_type
+from bw_processing import UNCERTAINTY_DTYPE, clean_datapackage_name
+
+from wmlci.bulk_writer import (
+    _ACTIVITY_COLUMNS,
+    _EXCHANGE_COLUMNS,
+    _insert_rows,
+    _validate,
+    bulk_pragmas,
+    matrix_entries,
+    write_processed,
+)
+from wmlci.extract.extract_common import (
+    extract_source_data,
+    jsonld_source_dir,
+    load_extract_yaml,
+)
+from wmlci.log import log
+from wmlci.method_config import load_method_config
+from wmlci.settings import datapath, ensure_dir, extractpath, resultspath
+from wmlci.trace import span, trace_run
+
+release_manifest_path = datapath / "release_manifests"
+
+# entity fields that change with every export, not with content
+_VOLATILE = ("lastChange", "version")
+# dataset fields that depend on where a release is extracted
+_NODE_VOLATILE = ("filename",)
+
+# SQLite bound-parameter chunk for IN (...) queries
+_CHUNK = 500
+
+
+def _hash(obj: Any) -> str:
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def entity_hash(entity: dict[str, Any]) -> str:
+    """Content hash of a JSON-LD entity, ignoring export stamps."""
+    return _hash({k: v for k, v in entity.items() if k not in _VOLATILE})
+
+
+def _chunks(items: list, size: int = _CHUNK) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def release_dir(source: str, version: str | None) -> Path:
+    """JSON-LD directory of a source release, extracted if missing."""
+    path = jsonld_source_dir(source, version=version)
+    if not path.exists() and (extractpath / f"{source}.yaml").exists():
+        extract_source_data(source, version=version)
+    if not path.exists():
+        raise FileNotFoundError(f"No JSON-LD for {source} {version} at {path}")
+    return path
+
+
+def release_manifest(source: str, version: str | None) -> dict[str, Any]:
+    """
+    Entity hashes (``{category: {@id: hash}}``) and names (``{@id: name}``)
+    of a source release, read from ``release_manifests/`` or computed from
+    the release's JSON-LD and saved.
+    """
+    name = safe_filename(f"{source}-{version or 'unversioned'}", add_hash=False)
+    path = release_manifest_path / f"{name}.json"
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    directory = release_dir(source, version)
+    hashes: dict[str, dict[str, str]] = {}
+    names: dict[str, str] = {}
+    with span("hash release", source=source, version=version):
+        for category in sorted(p for p in directory.iterdir() if p.is_dir()):
+            entities = hashes.setdefault(category.name, {})
+            for file in sorted(category.glob("*.json")):
+                entity = json.loads(file.read_bytes())
+                code = entity.get("@id", file.stem)
+                entities[code] = entity_hash(entity)
+                if entity.get("name"):
+                    names[code] = entity["name"]
+    manifest = {
+        "source": source,
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "hashes": hashes,
+        "names": names,
+    }
+    release_manifest_path.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    log.info(
+        f"Hashed {sum(map(len, hashes.values()))} entities of {source} {version}"
+    )
+    return manifest
+
+
+class ReleaseDiff:
+    """
+    Entities added, removed and changed between two releases of a source.
+
+    Attributes
+    ----------
+    added, removed, changed : dict
+        ``{category: sorted @ids}`` for categories with changes.
+    names : dict
+        ``{@id: name}`` over both releases.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        old_version: str | None,
+        new_version: str | None,
+        old: dict[str, dict[str, str]],
+        new: dict[str, dict[str, str]],
+        names: dict[str, str],
+    ) -> None:
+        self.source = source
+        self.old_version = old_version
+        self.new_version = new_version
+        self.names = names
+        self.added: dict[str, list[str]] = {}
+        self.removed: dict[str, list[str]] = {}
+        self.changed: dict[str, list[str]] = {}
+        for category in sorted(set(old) | set(new)):
+            before, after = old.get(category, {}), new.get(category, {})
+            for target, codes in (
+                (self.added, set(after) - set(before)),
+                (self.removed, set(before) - set(after)),
+                (self.changed, {c for c in set(before) & set(after) if before[c] != after[c]}),
+            ):
+                if codes:
+                    target[category] = sorted(codes)
+
+    def __repr__(self) -> str:
+        added, removed, changed = (
+            sum(map(len, d.values())) for d in (self.added, self.removed, self.changed)
+        )
+        return (
+            f"ReleaseDiff({self.source!r}, {self.old_version} -> {self.new_version}: "
+            f"{added} added, {removed} removed, {changed} changed)"
+        )
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def counts(self) -> list[tuple[str, int, int, int]]:
+        """(category, added, removed, changed) for categories with changes."""
+        categories = sorted(set(self.added) | set(self.removed) | set(self.changed))
+        return [
+            (
+                category,
+                len(self.added.get(category, [])),
+                len(self.removed.get(category, [])),
+                len(self.changed.get(category, [])),
+            )
+            for category in categories
+        ]
+
+
+def diff_releases(
+    source: str, old_version: str | None, new_version: str | None
+) -> ReleaseDiff:
+    """Classify the entities of two releases of ``source``."""
+    old = release_manifest(source, old_version)
+    new = release_manifest(source, new_version)
+    diff = ReleaseDiff(
+        source, old_version, new_version, old["hashes"], new["hashes"],
+        {**old["names"], **new["names"]},
+    )
+    log.info(f"{diff}")
+    return diff
+
+
+def _exchange_changes(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """Readable exchange changes of a process between two releases."""
+
+    def keyed(process):
+        return {
+            (exc["flow"].get("@id"), bool(exc.get("isInput")), exc.get("internalId")): exc
+            for exc in process.get("exchanges", [])
+        }
+
+    def name(exc):
+        direction = "input" if exc.get("isInput") else "output"
+        return f"{direction} '{exc['flow'].get('name')}'"
+
+    def label(exc):
+        unit = (exc.get("unit") or {}).get("name", "")
+        return f"{name(exc)} {exc.get('amount')} {unit}".rstrip()
+
+    before, after = keyed(old), keyed(new)
+    lines = [f"+ {label(after[k])}" for k in after.keys() - before.keys()]
+    lines += [f"- {label(before[k])}" for k in before.keys() - after.keys()]
+    for k in before.keys() & after.keys():
+        a, b = before[k], after[k]
+        if entity_hash(a) == entity_hash(b):
+            continue
+        if a.get("amount") != b.get("amount"):
+            lines.append(f"~ {name(a)} amount {a.get('amount')} -> {b.get('amount')}")
+        else:
+            fields = sorted(
+                f for f in set(a) | set(b) if _hash(a.get(f)) != _hash(b.get(f))
+            )
+            lines.append(f"~ {label(b)}: {', '.join(fields)}")
+    return sorted(lines, key=lambda line: line[2:])
+
+
+def _entity_changes(
+    category: str, code: str, old_dir: Path | None, new_dir: Path | None
+) -> list[str]:
+    """Changed fields (and exchanges, for processes) of one entity."""
+    paths = [
+        d / category / f"{code}.json" if d is not None else None
+        for d in (old_dir, new_dir)
+    ]
+    if not all(p is not None and p.exists() for p in paths):
+        return []
+    old, new = (json.loads(p.read_bytes()) for p in paths)
+    fields = sorted(
+        f for f in (set(old) | set(new)) - set(_VOLATILE) - {"exchanges"}
+        if _hash(old.get(f)) != _hash(new.get(f))
+    )
+    lines = [f"fields: {', '.join(fields)}"] if fields else []
+    if category == "processes":
+        lines += _exchange_changes(old, new)
+    return lines
+
+
+def change_report(diff: ReleaseDiff, nodes: dict[str, Any] | None = None) -> str:
+    """
+    Markdown report of a release diff and, when applied, of the database
+    nodes written (``apply_node_delta`` result).
+    """
+    old_dir, new_dir = (
+        jsonld_source_dir(diff.source, version=v)
+        for v in (diff.old_version, diff.new_version)
+    )
+    old_dir = old_dir if old_dir.exists() else None
+    new_dir = new_dir if new_dir.exists() else None
+    lines = [
+        f"# {diff.source}: {diff.old_version} -> {diff.new_version}",
+        "",
+        f"Generated {datetime.now().isoformat(timespec='seconds')}.",
+        "",
+    ]
+    if diff.empty:
+        lines += ["No entity changes.", ""]
+    else:
+        lines += [
+            "| category | added | removed | changed |",
+            "| --- | ---: | ---: | ---: |",
+            *(f"| {c} | {a} | {r} | {ch} |" for c, a, r, ch in diff.counts()),
+            "",
+        ]
+    for category, *_ in diff.counts():
+        lines += [f"## {category}", ""]
+        for title, codes in (
+            ("Added", diff.added.get(category, [])),
+            ("Removed", diff.removed.get(category, [])),
+            ("Changed", diff.changed.get(category, [])),
+        ):
+            if not codes:
+                continue
+            lines += [f"### {title}", ""]
+            for code in sorted(codes, key=lambda c: diff.names.get(c, c)):
+                lines.append(f"- {diff.names.get(code, code)} (`{code}`)")
+                if title == "Changed":
+                    lines += [
+                        f"  - {line}"
+                        for line in _entity_changes(category, code, old_dir, new_dir)
+                    ]
+            lines.append("")
+    if nodes is not None:
+        lines += [
+            f"## Database '{nodes['database']}'",
+            "",
+            f"- {len(nodes['added'])} nodes added, {len(nodes['changed'])} replaced, "
+            f"{len(nodes['removed'])} removed, {nodes['unchanged']} unchanged",
+            f"- written in {nodes['seconds']:.2f} seconds",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def node_hashes(data: list[dict]) -> dict[str, str]:
+    """Content hash per code of linked importer datasets."""
+    return {
+        ds["code"]: _hash({k: v for k, v in ds.items() if k not in _NODE_VOLATILE})
+        for ds in data
+    }
+
+
+def _node_manifest_path(db: bd.Database) -> Path:
+    stem = Path(db.filename_processed()).stem
+    return Path(db.dirpath_processed()) / f"{stem}.nodes.json"
+
+
+def save_node_hashes(
+    db_name: str, hashes: dict[str, str], config: dict[str, Any]
+) -> None:
+    """Save the node hashes of a written inventory next to its datapackage."""
+    db = bd.Database(db_name)
+    _node_manifest_path(db).write_text(
+        json.dumps({
+            "database": db_name,
+            "inventory_source": config.get("inventory_source"),
+            "inventory_source_version": config.get("inventory_source_version"),
+            "written": datetime.now().isoformat(timespec="seconds"),
+            "nodes": hashes,
+        }),
+        encoding="utf-8",
+    )
+
+
+def load_node_hashes(db_name: str) -> dict[str, Any] | None:
+    """Node manifest saved by ``save_node_hashes``, or None."""
+    path = _node_manifest_path(bd.Database(db_name))
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _vector(dp, name: str, flip: bool = False) -> dict[str, np.ndarray]:
+    """Arrays of a persistent vector of a processed datapackage."""
+    prefix = clean_datapackage_name(name)
+    indices = dp.get_resource(f"{prefix}.indices")[0]
+    vector = {
+        "rows": np.asarray(indices["row"], dtype=np.int64),
+        "cols": np.asarray(indices["col"], dtype=np.int64),
+        "amounts": np.asarray(dp.get_resource(f"{prefix}.data")[0], dtype=np.float64),
+    }
+    if name.endswith("geomapping matrix"):
+        return vector
+    names = {resource["name"] for resource in dp.resources}
+    if f"{prefix}.distributions" in names:
+        vector["uncertainty"] = np.array(dp.get_resource(f"{prefix}.distributions")[0])
+    else:
+        # vectors without uncertainty are stored without distributions
+        vector["uncertainty"] = np.zeros(len(indices), dtype=UNCERTAINTY_DTYPE)
+        vector["uncertainty"]["loc"] = vector["amounts"]
+        for field in ("scale", "shape", "minimum", "maximum"):
+            vector["uncertainty"][field] = np.nan
+    if flip:
+        vector["flip"] = np.asarray(dp.get_resource(f"{prefix}.flip")[0], dtype=bool)
+    return vector
+
+
+def _patch(
+    existing: dict[str, np.ndarray], added: dict[str, np.ndarray], stale: np.ndarray, by: str
+) -> dict[str, np.ndarray]:
+    keep = ~np.isin(existing[by], stale)
+    return {
+        key: np.concatenate([existing[key][keep], added[key]])
+        for key in added
+    }
+
+
+def apply_node_delta(jsonld, config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Write the datasets of a linked importer that differ from the database's
+    node manifest, and patch its processed datapackage.
+
+    Without a node manifest (databases written before manifests existed)
+    the database is written in full once.
+
+    Returns
+    -------
+    dict
+        database name, codes ``added``, ``changed`` and ``removed``, count
+        of ``unchanged`` nodes and ``seconds`` taken.
+    """
+    from wmlci.lca import save_inventory
+
+    db_name = jsonld.db_name
+    start = time.perf_counter()
+    data = [set_correct_process_type(ds) for ds in jsonld.data]
+    _validate(data, db_name)
+    hashes = node_hashes(data)
+    manifest = load_node_hashes(db_name)
+    if manifest is None:
+        log.warning(f"No node manifest for '{db_name}'; writing the database in full")
+        save_inventory(jsonld, config)
+        return {
+            "database": db_name, "added": sorted(hashes), "changed": [],
+            "removed": [], "unchanged": 0, "seconds": time.perf_counter() - start,
+        }
+    previous = manifest["nodes"]
+    if manifest.get("inventory_source_version") not in (
+        None, config.get("inventory_source_version")
+    ):
+        log.info(
+            f"Upgrading '{db_name}' from {manifest['inventory_source_version']} "
+            f"to {config.get('inventory_source_version')}"
+        )
+    added = sorted(set(hashes) - set(previous))
+    removed = sorted(set(previous) - set(hashes))
+    changed = sorted(c for c in set(hashes) & set(previous) if hashes[c] != previous[c])
+    result = {
+        "database": db_name, "added": added, "changed": changed, "removed": removed,
+        "unchanged": len(hashes) - len(added) - len(changed),
+    }
+    if not (added or changed or removed):
+        save_node_hashes(db_name, hashes, config)
+        log.info(f"'{db_name}' is up to date")
+        return {**result, "seconds": time.perf_counter() - start}
+
+    db = bd.Database(db_name)
+    dp = db.datapackage()
+    ids = {
+        code: node_id
+        for node_id, code in ActivityDataset.select(ActivityDataset.id, ActivityDataset.code)
+        .where(ActivityDataset.database == db_name)
+        .tuples()
+    }
+    stale = np.array([ids[c] for c in changed + removed if c in ids], dtype=np.int64)
+    by_code = {ds["code"]: ds for ds in data}
+    written = [by_code[c] for c in sorted(set(added) | set(changed))]
+
+    activities, exchanges = [], []
+    for ds in written:
+        row = dict_as_activitydataset(
+            {k: v for k, v in ds.items() if k != "exchanges"},
+            add_snowflake_id=True,
+        )
+        # replaced nodes keep their ids, so unchanged columns stay valid
+        row["id"] = ids.get(ds["code"], row["id"])
+        ids[ds["code"]] = row["id"]
+        activities.append(row)
+        for exc in ds.get("exchanges", []):
+            if "input" not in exc or "amount" not in exc:
+                raise InvalidExchange
+            if "type" not in exc:
+                raise UntypedExchange
+            exc.setdefault("output", (db_name, ds["code"]))
+            exchanges.append(dict_as_exchangedataset(exc))
+    for code in removed:
+        ids.pop(code, None)
+
+    db._drop_indices()
+    try:
+        with bulk_pragmas(), sqlite3_lci_db.transaction():
+            for chunk in _chunks(changed + removed):
+                ExchangeDataset.delete().where(
+                    (ExchangeDataset.output_database == db_name)
+                    & (ExchangeDataset.output_code << chunk)
+                ).execute()
+                ActivityDataset.delete().where(
+                    (ActivityDataset.database == db_name)
+                    & (ActivityDataset.code << chunk)
+                ).execute()
+            _insert_rows(ActivityDataset._meta.table_name, _ACTIVITY_COLUMNS, activities)
+            _insert_rows(ExchangeDataset._meta.table_name, _EXCHANGE_COLUMNS, exchanges)
+            for chunk in _chunks(removed):
+                dangling = ExchangeDataset.select().where(
+                    (ExchangeDataset.input_database == db_name)
+                    & (ExchangeDataset.input_code << chunk)
+                ).count()
+                if dangling:
+                    raise ValueError(
+                        f"{dangling} unchanged exchanges use removed nodes of "
+                        f"'{db_name}'; re-import the database"
+                    )
+    finally:
+        db._add_indices()
+
+    # patch the processed datapackage: drop columns of replaced and removed
+    # nodes, append the entries of the written datasets
+    technosphere, biosphere, geo, dependents = matrix_entries(
+        db, written, {(db_name, code): node_id for code, node_id in ids.items()}
+    )
+    write_processed(
+        db,
+        _patch(_vector(dp, db_name + " technosphere matrix", flip=True), technosphere, stale, "cols"),
+        _patch(_vector(dp, db_name + " biosphere matrix"), biosphere, stale, "cols"),
+        _patch(_vector(dp, db_name + " inventory geomapping matrix"), geo, stale, "rows"),
+        set(db.metadata.get("depends") or []) | dependents,
+    )
+
+    databases[db_name]["number"] = len(ids)
+    geocollections = set(databases[db_name].get("geocollections") or [])
+    geocollections.update(
+        get_geocollection(ds.get("location")) for ds in written if ds.get("location")
+    )
+    geocollections.discard(None)
+    databases[db_name]["geocollections"] = sorted(geocollections)
+    databases.set_modified(db_name)
+    databases.flush()
+    geomapping.add({ds["location"] for ds in written if ds.get("location")})
+    if databases[db_name].get("searchable"):
+        index = IndexManager(db.filename)
+        for code in changed + removed:
+            index.delete_dataset({"database": db_name, "code": code})
+        index.add_datasets(written)
+    save_node_hashes(db_name, hashes, config)
+
+    result["seconds"] = time.perf_counter() - start
+    log.info(
+        f"Upgraded '{db_name}': {len(added)} nodes added, {len(changed)} replaced, "
+        f"{len(removed)} removed in {result['seconds']:.2f} seconds"
+    )
+    return result
+
+
+def run_upgrade(
+    method_name: str,
+    new_version: str,
+    old_version: str | None = None,
+    apply: bool = True,
+    trace: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Diff a method's inventory source against a new release, apply the
+    changes to its Brightway database and write a change report.
+
+    Parameters
+    ----------
+    method_name
+        Stem of a file in ``wmlci/methods/``.
+    new_version
+        Release to upgrade to.
+    old_version
+        Release the database was imported from. Defaults to the method's
+        ``inventory_source_version`` or the extract yaml version.
+    apply
+        False only diffs the releases and writes the report.
+
+    Returns
+    -------
+    dict
+        diff (``ReleaseDiff``), nodes (``apply_node_delta`` result or None)
+        and report path.
+    """
+    with trace_run(trace):
+        with span("run_upgrade", method=method_name, version=new_version):
+            config = load_method_config(method_name)
+            source = config["inventory_source"]
+            if old_version is None:
+                old_version = config.get("inventory_source_version")
+            if old_version is None and (extractpath / f"{source}.yaml").exists():
+                old_version = load_extract_yaml(source).get("version")
+            diff = diff_releases(source, old_version, new_version)
+
+            nodes = None
+            if apply and not diff.empty:
+                from wmlci.lca import link_inventory, prepare_inventory
+
+                bd.projects.set_current(config["bw_project_name"])
+                if config["inventory_database"] not in bd.databases:
+                    raise ValueError(
+                        f"Database '{config['inventory_database']}' not in project "
+                        f"'{config['bw_project_name']}'; run run_bw_lca first"
+                    )
+                upgraded = {**config, "inventory_source_version": new_version}
+                jsonld = prepare_inventory(upgraded)
+                link_inventory(jsonld, upgraded)
+                with span("apply node delta"):
+                    nodes = apply_node_delta(jsonld, upgraded)
+
+            out = config.get("output_files", {})
+            path = ensure_dir(resultspath) / out.get(
+                "upgrade_report",
+                safe_filename(f"{source}_{old_version}_to_{new_version}_changes", add_hash=False)
+                + ".md",
+            )
+            path.write_text(change_report(diff, nodes), encoding="utf-8")
+            log.info(f"Change report written to {path}")
+
+    if nodes is not None:
+        log.info(
+            f"Set inventory_source_version: {new_version} in the {method_name} "
+            "method YAML to use the upgraded database"
+        )
+    return {"diff": diff, "nodes": nodes, "report": str(path)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmlci.upgrade",
+        description="Upgrade a method's inventory database to a new source release.",
+    )
+    parser.add_argument("method")
+    parser.add_argument("version", help="source release to upgrade to")
+    parser.add_argument("--from", dest="old_version", help="release currently imported")
+    parser.add_argument(
+        "--report-only", action="store_true", help="diff releases without changing the database"
+    )
+    args = parser.parse_args()
+    result = run_upgrade(args.method, args.version, args.old_version, not args.report_only)
+    print(result["diff"])
+    print(f"Change report: {result['report']}")
@@ -70,7 +70,12 @@ from bw2io.strategies.special import *
 import multifunctional
 
 from wmlci.settings import source_data_path
-from wmlci.jsonld_loader import *
+from wmlci.jsonld_loader import load_JSONLD_sourceData
+from wmlci.editImporter import (
+    apply_opposite_direction_approach,
+    correct_jsonld_input_key,
+)
+from wmlci.errorLogging import clean_all_locations
 
 ## Project Initiation ##
 
@@ -0,0 +1,180 @@
+"""
+Incremental what-if queries on a factorized technosphere.
+
+Changing technosphere exchanges in ``k`` process columns is a rank-``k``
+update ``A' = A + D E^T`` (``D`` holds the column changes, ``E`` selects the
+columns). The Sherman-Morrison-Woodbury identity gives the new supply from
+the existing factorization of ``A``::
+
+    s' = s - Z (I + E^T Z)^-1 E^T s,   s = A^-1 f,   Z = A^-1 D
+
+which costs one block solve with ``k + 1`` right-hand sides and a ``k x k``
+dense solve. Biosphere changes only change the characterized direct impact
+per process. When the ``k x k`` capacitance matrix is ill-conditioned, or
+the updated supply does not satisfy ``A' s' = f``, the query falls back to
+factorizing ``A'``.
+
+Example::
+
+    matrices = build_matrices(jsonld, jsonldlcia, method)
+    what_if = WhatIf(matrices)
+    what_if.query(
+        {product_code: 907.18},
+        technosphere={(electricity_code, combustion_code): -0.1},
+    )
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+from scipy import sparse
+
+from wmlci.log import log
+from wmlci.matrices import InventoryMatrices
+from wmlci.solvers import factorize
+
+
+class WhatIf:
+    """
+    What-if queries against one ``InventoryMatrices``.
+
+    Parameters
+    ----------
+    matrices : wmlci.matrices.InventoryMatrices
+        Its technosphere is factorized on construction and reused.
+    max_rank : int
+        Updates touching more process columns are solved by refactorizing.
+    max_condition : float
+        Largest ratio of ``1 + |E^T Z|`` to the smallest singular value of
+        the capacitance matrix ``I + E^T Z`` still trusted.
+    rtol : float
+        Relative residual ``|A' s' - f| / |f|`` above which the update is
+        recomputed by refactorizing.
+    """
+
+    def __init__(
+        self,
+        matrices: InventoryMatrices,
+        max_rank: int = 50,
+        max_condition: float = 1e10,
+        rtol: float = 1e-8,
+    ) -> None:
+        self.matrices = matrices
+        self.max_rank = max_rank
+        self.max_condition = max_condition
+        self.rtol = rtol
+        self.impact = matrices.characterized_biosphere
+        # factorize up front so queries only solve
+        self.factorization = matrices.factorization
+
+    def _demand(self, demand: dict[str, float]) -> np.ndarray:
+        f = np.zeros(len(self.matrices.products))
+        for code, amount in demand.items():
+            f[self.matrices.products[code]] += amount
+        return f
+
+    def _technosphere_update(
+        self, changes: dict[tuple[str, str], float]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Changed columns and the dense change of each, shape (products, k)."""
+        columns = sorted({self.matrices.processes[process] for _, process in changes})
+        position = {col: k for k, col in enumerate(columns)}
+        delta = np.zeros((len(self.matrices.products), len(columns)))
+        technosphere = self.matrices.technosphere
+        for (product, process), value in changes.items():
+            i = self.matrices.products[product]
+            j = self.matrices.processes[process]
+            delta[i, position[j]] += value - technosphere[i, j]
+        return np.asarray(columns, dtype=int), delta
+
+    def _impact(self, changes: dict[tuple[str, str], float]) -> np.ndarray:
+        """Characterized direct impact per process after biosphere changes."""
+        impact = self.impact.copy()
+        biosphere = self.matrices.biosphere
+        for (flow, process), value in changes.items():
+            r = self.matrices.flows[flow]
+            j = self.matrices.processes[process]
+            impact[j] += self.matrices.characterization[r] * (value - biosphere[r, j])
+        return impact
+
+    def _refactor(self, columns, delta, f) -> np.ndarray:
+        select = sparse.csr_matrix(
+            (np.ones(len(columns)), (np.arange(len(columns)), columns)),
+            shape=(len(columns), len(self.matrices.processes)),
+        )
+        updated = self.matrices.technosphere + sparse.csc_matrix(delta) @ select
+        return factorize(updated).solve(f)
+
+    def query(
+        self,
+        demand: dict[str, float],
+        technosphere: dict[tuple[str, str], float] | None = None,
+        biosphere: dict[tuple[str, str], float] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Score of ``demand`` with some matrix entries set to new values.
+
+        Parameters
+        ----------
+        demand
+            ``{product @id: amount}``.
+        technosphere
+            ``{(product @id, process @id): new A entry}``; inputs are
+            negative, as in the matrix.
+        biosphere
+            ``{(flow @id, process @id): new B entry}``.
+
+        Returns
+        -------
+        dict
+            ``score``, ``base_score``, ``supply``, the ``rank`` of the
+            technosphere update and the ``solver`` used ("base", "woodbury"
+            or "refactor").
+        """
+        f = self._demand(demand)
+        factorization = self.factorization
+        impact = self._impact(biosphere or {})
+        if not technosphere:
+            base = factorization.solve(f)
+            return {
+                "score": float(impact @ base),
+                "base_score": float(self.impact @ base),
+                "supply": base,
+                "rank": 0,
+                "solver": "base",
+            }
+
+        columns, delta = self._technosphere_update(technosphere)
+        rank = len(columns)
+        solver = "woodbury"
+        supply = None
+        if rank > self.max_rank:
+            base = factorization.solve(f)
+        else:
+            solved = factorization.solve(np.column_stack([f, delta]))
+            base, z = solved[:, 0], solved[:, 1:]
+            capacitance = np.eye(rank) + z[columns]
+            # near-singular when I and E^T Z largely cancel
+            finite = np.isfinite(capacitance).all()
+            smallest = np.linalg.svd(capacitance, compute_uv=False)[-1] if finite else 0
+            scale = 1 + np.linalg.norm(z[columns], 2) if finite else 1
+            if smallest * self.max_condition > scale:
+                supply = base - z @ np.linalg.solve(capacitance, base[columns])
+                residual = (
+                    self.matrices.technosphere @ supply + delta @ supply[columns] - f
+                )
+                if np.linalg.norm(residual) > self.rtol * max(np.linalg.norm(f), 1e-300):
+                    log.debug(f"What-if residual too large for rank-{rank} update")
+                    supply = None
+        if supply is None:
+            solver = "refactor"
+            supply = self._refactor(columns, delta, f)
+        return {
+            "score": float(impact @ supply),
+            "base_score": float(self.impact @ base),
+            "supply": supply,
+            "rank": rank,
+            "solver": solver,
+        }